@@ -1,17 +1,23 @@
 from flask import Flask, render_template, request, jsonify, send_file, Response
+from urllib.parse import quote
 from werkzeug.utils import secure_filename
 import os
 import yaml
 import shutil
-import threading
 import queue
 import json
 import time
-from workflow import run_workflow, get_mapping_step, run_summary_step
+import zlib
+import io
+import csv
+from workflow import (run_workflow, get_mapping_step, run_summary_step, plan_summary_step, export_lock,
+                      export_results_step, ensure_export, result_version, update_summary_columns_step)
 from src.config_loader import get_config
 from src.pdf_processor import get_pdf_files
 from src.logger import logger
-from src.task_manager import task_manager
+from src.task_manager import task_manager, JobConflictError, ListenerLimitError
+from src.export_formats import get_exporter
+from src.summary_fields import SECTION_FIELDS
 
 app = Flask(__name__)
 
@@ -27,7 +33,21 @@ CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
 
 @app.route('/events')
 def events():
-    return Response(task_manager.listen(), mimetype='text/event-stream')
+    """
+    SSE 事件流；?job_id= 时只推送该作业的事件。
+    重连时根据 Last-Event-ID 请求头（或 ?last_event_id=）回放错过的事件
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        stream = task_manager.listen(request.args.get('job_id'), last_event_id)
+    except ListenerLimitError as e:
+        logger.warning(str(e))
+        response = jsonify({"status": "error", "message": str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/health')
@@ -36,13 +56,18 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": time.time(),
-        "service": "ScholarFlow"
+        "service": "ScholarFlow",
+        "sse": task_manager.announcer.metrics()
     })
 
 
 @app.route('/get-progress')
 def get_progress():
-    return jsonify(task_manager.get_progress())
+    job_id = request.args.get('job_id')
+    progress = task_manager.get_progress(job_id)
+    if progress is None:
+        return jsonify({"status": "error", "message": "作业不存在"}), 404
+    return jsonify(progress)
 
 @app.route('/')
 def index():
@@ -160,6 +185,10 @@ def upload_pdfs():
         logger.error(f"Error uploading PDFs: {e}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)})
 
+def _job_conflict(e):
+    """同类作业正在运行时的响应"""
+    return jsonify({"status": "busy", "message": str(e), "job_id": e.job.id}), 409
+
 @app.route('/run-mapping', methods=['POST'])
 def run_mapping_api():
     # 1. 预处理请求数据
@@ -167,47 +196,63 @@ def run_mapping_api():
     reference_list = request.form.get('reference_list', '').replace('\r\n', '\n')
     
     # 2. 定义后台任务
-    def background_task():
+    def background_task(job):
+        progress = task_manager.progress_callback(job.id)
         try:
-            task_manager.update_progress(0, 0, "正在保存配置...")
+            progress(0, 0, "正在保存配置...")
             with open(TOPIC_FILE, 'w', encoding='utf-8', newline='') as f:
                 f.write(research_topic)
             with open(REF_FILE, 'w', encoding='utf-8', newline='') as f:
                 f.write(reference_list)
 
-            task_manager.update_progress(0, 1, "正在分析文献映射关系 (这可能需要几分钟)...")
+            progress(0, 1, "正在分析文献映射关系 (这可能需要几分钟)...")
             logger.info("Starting literature mapping...")
             
             mapping, error = get_mapping_step()
             
             if error:
                 logger.warning(f"Mapping step returned error: {error}")
-                task_manager.announce_error('mapping_result', error)
-                task_manager.update_progress(0, 0, f"映射失败: {error}")
+                task_manager.announce_error('mapping_result', error, job.id)
+                progress(0, 0, f"映射失败: {error}")
+                task_manager.fail_job(job.id, error)
             else:
                 logger.info("Literature mapping completed successfully")
-                task_manager.update_progress(1, 1, "映射完成")
-                task_manager.announce_event('mapping_result', {"status": "success", "mapping": mapping})
+                progress(1, 1, "映射完成")
+                task_manager.announce_event('mapping_result', {"status": "success", "mapping": mapping}, job.id)
+                return {"matched": sum(1 for ref in mapping.values() if ref), "total": len(mapping)}
 
         except Exception as e:
             logger.error(f"Error in background mapping: {e}", exc_info=True)
-            task_manager.announce_error('mapping_result', str(e))
+            task_manager.announce_error('mapping_result', str(e), job.id)
+            task_manager.fail_job(job.id, str(e))
 
-    # 3. 启动线程并立即响应
-    thread = threading.Thread(target=background_task)
-    thread.daemon = True
-    thread.start()
+    # 3. 启动作业并立即响应
+    try:
+        job = task_manager.run_job("mapping", background_task)
+    except JobConflictError as e:
+        return _job_conflict(e)
     
-    return jsonify({"status": "started", "message": "Backend processing started"})
+    return jsonify({"status": "started", "message": "Backend processing started", "job_id": job.id})
+
+@app.route('/plan-summary', methods=['GET'])
+def plan_summary_api():
+    """预估待总结文献的 Token 用量、耗时、费用与建议并发数"""
+    try:
+        plan = plan_summary_step()
+        return jsonify({"status": "success", "plan": plan})
+    except Exception as e:
+        logger.error(f"Error in plan_summary: {e}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)})
 
 @app.route('/run-summary', methods=['POST'])
 def run_summary_api():
     
-    def background_task():
+    def background_task(job):
+        progress = task_manager.progress_callback(job.id)
         try:
             logger.info("Starting summary generation...")
-            # 执行总结步骤，传入进度回调
-            success, message, stats = run_summary_step(progress_callback=task_manager.update_progress)
+            # 执行总结步骤，传入作业的进度回调
+            success, message, stats = run_summary_step(progress_callback=progress)
             
             if success:
                 logger.info(f"Summary generation completed: {message}")
@@ -217,21 +262,102 @@ def run_summary_api():
                     "stats": stats,
                     "download_url": "/download"
                 }
-                task_manager.announce_event('summary_result', result_data)
-                task_manager.update_progress(100, 100, "所有任务已完成")
+                task_manager.announce_event('summary_result', result_data, job.id)
+                progress(100, 100, "所有任务已完成")
+                return {"message": message, "stats": stats}
             else:
                 logger.warning(f"Summary generation failed: {message}")
-                task_manager.announce_error('summary_result', message)
+                task_manager.announce_error('summary_result', message, job.id)
+                task_manager.fail_job(job.id, message)
                 
         except Exception as e:
             logger.error(f"Error in background summary: {e}", exc_info=True)
-            task_manager.announce_error('summary_result', str(e))
+            task_manager.announce_error('summary_result', str(e), job.id)
+            task_manager.fail_job(job.id, str(e))
+
+    try:
+        job = task_manager.run_job("summary", background_task)
+    except JobConflictError as e:
+        return _job_conflict(e)
+    
+    return jsonify({"status": "started", "message": "Backend processing started", "job_id": job.id})
+
 
-    thread = threading.Thread(target=background_task)
-    thread.daemon = True
-    thread.start()
+@app.route('/export', methods=['POST'])
+def export_api():
+    """在后台重新导出结果（?format= 指定格式，默认按 export.formats），完成后通过 SSE 的 export_result 事件通知"""
+    fmt = request.args.get('format')
+    if fmt:
+        try:
+            get_exporter(fmt)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except RuntimeError as e:
+            # 格式所需的可选依赖未安装，与 /download 一致
+            return jsonify({"status": "error", "message": str(e)}), 501
+    # 同一时间只允许一个导出任务（export_lock 由导出步骤持有）
+    if export_lock.locked():
+        return jsonify({"status": "busy", "message": "已有导出任务正在进行"}), 409
+    
+    def background_task(job):
+        try:
+            logger.info("Starting result export...")
+            count = export_results_step([fmt] if fmt else None)
+            task_manager.announce_event('export_result', {
+                "status": "success",
+                "message": f"导出完成，共 {count} 条记录",
+                "count": count,
+                "download_url": f"/download?format={fmt}" if fmt else "/download"
+            }, job.id)
+            return {"count": count, "format": fmt}
+        except Exception as e:
+            logger.error(f"Error in background export: {e}", exc_info=True)
+            task_manager.announce_error('export_result', str(e), job.id)
+            task_manager.fail_job(job.id, str(e))
+
+    try:
+        job = task_manager.run_job("export", background_task)
+    except JobConflictError as e:
+        return _job_conflict(e)
     
-    return jsonify({"status": "started", "message": "Backend processing started"})
+    return jsonify({"status": "started", "message": "Export started", "job_id": job.id})
+
+
+# 列表接口 limit 参数的上限
+MAX_LIST_LIMIT = 1000
+
+def _limit_arg(default):
+    """
+    解析查询参数 limit：未提供时取默认值，超过 MAX_LIST_LIMIT 时截断
+
+    Raises:
+        ValueError: limit 不是正整数
+    """
+    raw = request.args.get('limit', '').strip()
+    if not raw:
+        return default
+    if not raw.isdigit() or int(raw) < 1:
+        raise ValueError(f"limit 必须是正整数: {raw}")
+    return min(int(raw), MAX_LIST_LIMIT)
+
+
+@app.route('/jobs')
+def list_jobs():
+    """作业列表：进行中的作业在前，其后为最近结束的作业"""
+    try:
+        limit = _limit_arg(50)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "jobs": task_manager.list_jobs(limit)})
+
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """查询单个作业的状态、进度与结果"""
+    job = task_manager.get_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "作业不存在"}), 404
+    return jsonify({"status": "success", "job": job})
 
 
 @app.route('/run-workflow', methods=['POST'])
@@ -277,15 +403,123 @@ def run_workflow_api():
         logger.error(f"Error in run_workflow_api: {e}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/summaries')
+def query_summaries():
+    """
+    按结构化字段查询总结
+    
+    参数：method_type 按研究类型筛选；q 关键词（在 search_in 列中检索，默认 findings）；
+    columns 返回的列（逗号分隔，默认 reference,method_type）；limit 最多返回的行数
+    （默认全部，JSON 结果的 total 为筛选出的总行数）；format=csv 时以 CSV 返回
+    """
+    try:
+        limit = _limit_arg(None)
+        store = update_summary_columns_step()
+        if store is None:
+            return jsonify({"status": "success", "count": 0, "total": 0, "rows": [], "method_types": {}})
+        columns = [c.strip() for c in request.args.get('columns', 'reference,method_type').split(',') if c.strip()]
+        search_in = request.args.get('search_in', 'findings')
+        rows = store.filter_rows(method_type=request.args.get('method_type'),
+                                 keyword=request.args.get('q'), keyword_column=search_in)
+        total = len(rows)
+        data = store.select(columns, rows[:limit])
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in query_summaries: {e}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
+    
+    if request.args.get('format') == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for row in data:
+            writer.writerow(['' if row[c] is None else row[c] for c in columns])
+        return Response('\ufeff' + buffer.getvalue(), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename="summaries.csv"'})
+    return jsonify({
+        "status": "success",
+        "count": len(data),
+        "total": total,
+        "rows": data,
+        "method_types": store.method_type_counts(),
+        "fields": list(SECTION_FIELDS)
+    })
+
+# 已压缩的格式不再 gzip
+COMPRESSIBLE_FORMATS = {"csv", "markdown"}
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+def _gzip_stream(path):
+    """按块读取文件并以 gzip 编码流式输出"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.flush()
+
 @app.route('/download')
 def download_result():
-    if os.path.exists(RESULT_CSV):
-        return send_file(
-            os.path.abspath(RESULT_CSV),
-            as_attachment=True,
-            download_name="文献综述结果.csv"
-        )
-    return "文件不存在", 404
+    """
+    下载结果文件，?format= 可选 csv（默认）、xlsx、parquet、markdown
+    
+    按需导出当前结果；ETag 由结果版本计算，未变化时返回 304；
+    客户端支持时对较大的文本格式以 gzip 流式传输，gzip 响应使用单独的 ETag（版本加 -gzip 后缀）
+    """
+    fmt = request.args.get('format', 'csv')
+    try:
+        exporter = get_exporter(fmt)
+    except ValueError as e:
+        return str(e), 400
+    except RuntimeError as e:
+        return str(e), 501
+    
+    compressible = exporter.name in COMPRESSIBLE_FORMATS and 'gzip' in request.accept_encodings
+    etag = result_version(exporter.name)
+    if etag:
+        # 同一版本是否 gzip 只取决于文件大小，客户端持有任一编码的 ETag 都说明其缓存仍有效
+        for tag in ([f"{etag}-gzip"] if compressible else []) + [etag]:
+            if request.if_none_match.contains(tag):
+                response = Response(status=304)
+                response.set_etag(tag)
+                response.vary.add('Accept-Encoding')
+                return response
+    
+    try:
+        path = ensure_export(exporter.name)
+    except Exception as e:
+        logger.error(f"Error exporting {exporter.name}: {e}", exc_info=True)
+        return f"导出失败: {e}", 500
+    
+    if not path or not os.path.exists(path):
+        return "文件不存在", 404
+    
+    download_name = f"文献综述结果{exporter.extension}"
+    gzip_min_bytes = get_config("export.gzip_min_bytes", 256 * 1024)
+    if compressible and os.path.getsize(path) >= gzip_min_bytes:
+        response = Response(_gzip_stream(path), mimetype=exporter.mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Content-Disposition'] = (
+            f"attachment; filename=\"result{exporter.extension}\"; filename*=UTF-8''{quote(download_name)}")
+        response.vary.add('Accept-Encoding')
+        if etag:
+            response.set_etag(f"{etag}-gzip")
+        return response
+    
+    response = send_file(
+        os.path.abspath(path),
+        mimetype=exporter.mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        etag=etag or True
+    )
+    response.vary.add('Accept-Encoding')
+    return response
 
 if __name__ == '__main__':
     logger.info("Starting ScholarFlow Flask server on port 18690...")
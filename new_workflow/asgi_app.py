@@ -0,0 +1,65 @@
+# new_workflow/asgi_app.py
+"""
+ASGI 服务入口
+/events 由异步 SSE 端点处理，空闲连接只是一个挂起的协程，不再每个连接占用一个线程，
+单进程即可保持数千个长期打开的事件流；其余路由原样交给 Flask 应用（a2wsgi 在线程池中执行）。
+
+启动：python asgi_app.py，或 uvicorn asgi_app:app --port 18690
+"""
+try:
+    from a2wsgi import WSGIMiddleware
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Mount, Route
+except ImportError as e:
+    raise ImportError("ASGI 模式需要安装 starlette、uvicorn 和 a2wsgi：pip install starlette uvicorn a2wsgi") from e
+
+from app import app as flask_app
+from src.config_loader import get_config
+from src.logger import logger
+from src.task_manager import task_manager, ListenerLimitError
+from src.utils import raise_open_file_limit
+
+# 异步连接不占用线程，连接数上限可以远高于 Flask 模式
+task_manager.announcer.max_listeners = get_config("tasks.max_async_listeners", 10000)
+
+
+class EventsEndpoint:
+    """
+    异步 SSE 端点，参数与 Flask 的 /events 相同（?job_id=、Last-Event-ID）
+
+    以原始 ASGI 应用实现，确保客户端断开、响应被取消或从未开始发送时都会注销监听者
+    """
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        last_event_id = request.headers.get('last-event-id') or request.query_params.get('last_event_id')
+        try:
+            stream = task_manager.listen_async(request.query_params.get('job_id'), last_event_id)
+        except ListenerLimitError as e:
+            logger.warning(str(e))
+            response = JSONResponse({"status": "error", "message": str(e)}, status_code=503,
+                                    headers={'Retry-After': '5'})
+            await response(scope, receive, send)
+            return
+        response = StreamingResponse(stream, media_type='text/event-stream',
+                                     headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        try:
+            await response(scope, receive, send)
+        finally:
+            stream.close()
+
+
+app = Starlette(routes=[
+    Route('/events', EventsEndpoint()),
+    Mount('/', WSGIMiddleware(flask_app)),
+])
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    limit = raise_open_file_limit()
+    logger.info(f"Starting ScholarFlow ASGI server on port 18690 (open file limit: {limit})...")
+    uvicorn.run(app, host="127.0.0.1", port=18690, log_level="warning")
@@ -0,0 +1,111 @@
+# new_workflow/src/alignment_decisions.py
+"""
+大模型对齐决策缓存
+按 (PDF 内容哈希, 参考文献归一化哈希) 记录大模型做出的匹配/不匹配判断及作出判断的模型，
+不同项目处理重叠文献时直接复用已有判断，避免重复调用大模型
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from .fuzzy_matcher import reference_hash, reference_key, split_references
+from .logger import logger
+from .utils import atomic_write_json
+
+# 缓存格式变化时递增
+_DECISIONS_VERSION = 1
+
+
+class AlignmentDecisionCache:
+    """
+    对齐决策缓存
+
+    结构：{PDF SHA-1: {参考文献哈希: {"match": bool, "model": 模型标识, "time": 时间戳}}}
+    - match 为 True：大模型判定该 PDF 对应这条参考文献
+    - match 为 False：该参考文献曾作为候选给出，但大模型判定不对应
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._decisions: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == _DECISIONS_VERSION:
+                self._decisions = data.get("decisions", {})
+        except Exception as e:
+            logger.warning(f"读取对齐决策缓存失败，将重新记录: {e}")
+
+    def __len__(self) -> int:
+        return len(self._decisions)
+
+    def matched_reference(self, sha1: str, references_by_hash: Dict[str, str]) -> Optional[str]:
+        """
+        查找已判定与该 PDF 对应的参考文献
+
+        Args:
+            sha1: PDF 内容哈希
+            references_by_hash: 当前可用的参考文献 {参考文献哈希: 参考文献}
+
+        Returns:
+            已判定对应的参考文献（原字符串），没有时返回 None
+        """
+        for ref_hash, entry in self._decisions.get(sha1, {}).items():
+            if entry.get("match") and ref_hash in references_by_hash:
+                return references_by_hash[ref_hash]
+        return None
+
+    def rejected(self, sha1: str) -> Set[str]:
+        """已判定与该 PDF 不对应的参考文献哈希集合"""
+        return {h for h, entry in self._decisions.get(sha1, {}).items() if not entry.get("match")}
+
+    def record(self, sha1: str, candidates: List[str], chosen: Optional[str], model: str) -> bool:
+        """
+        记录一次大模型判断：选中的候选记为匹配，其余候选记为不匹配
+
+        Args:
+            sha1: PDF 内容哈希
+            candidates: 提供给大模型的候选参考文献
+            chosen: 大模型选中的参考文献（None 表示候选中没有对应项）
+            model: 作出判断的模型标识
+
+        Returns:
+            是否已记录（选中项不在候选中时无法确定判断，不记录）
+        """
+        # 去除大模型可能附带的编号后再比较
+        stripped = split_references(chosen) if isinstance(chosen, str) else []
+        chosen_key = reference_key(stripped[0]) if stripped else None
+        if chosen_key is not None and chosen_key not in {reference_key(c) for c in candidates}:
+            return False
+        now = int(time.time())
+        with self._lock:
+            decisions = self._decisions.setdefault(sha1, {})
+            for candidate in candidates:
+                decisions[reference_hash(candidate)] = {
+                    "match": reference_key(candidate) == chosen_key,
+                    "model": model,
+                    "time": now,
+                }
+            self._dirty = True
+        return True
+
+    def save(self):
+        """有新记录时原子写回磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": _DECISIONS_VERSION, "decisions": self._decisions}
+            self._dirty = False
+        try:
+            atomic_write_json(self.path, data, indent=None)
+        except Exception as e:
+            logger.warning(f"保存对齐决策缓存失败: {e}")
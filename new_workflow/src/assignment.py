@@ -0,0 +1,463 @@
+# new_workflow/src/assignment.py
+"""
+文献-参考文献最优分配模块
+用 NumPy 向量化计算 PDF 文件与参考文献的相似度矩阵，并求解一对一最优分配，
+为每个匹配对给出置信度，低置信度的匹配交给大模型裁决
+"""
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .logger import logger
+
+try:
+    import numpy as np  # optional
+    _HAS_NUMPY = True
+except Exception:
+    _HAS_NUMPY = False
+
+try:
+    from scipy.optimize import linear_sum_assignment as _scipy_lsa  # optional
+    _HAS_SCIPY = True
+except Exception:
+    _HAS_SCIPY = False
+
+# n-gram 哈希特征维度（哈希冲突只会轻微高估重叠度）
+_FEATURE_DIM = 4096
+# 每次相乘的文件行数与参考文献行数：特征平时只保存列号，相乘时按块展开为稠密矩阵，
+# 展开部分的内存与文件数、参考文献数无关
+_BLOCK_ROWS = 512
+_BLOCK_COLS = 2048
+# 不超过该长度的作者键（如 li、wu）按词元精确比较；char_ngrams 对短键只返回键本身，无法做包含度比较
+_SHORT_KEY_LEN = 3
+# 未安装 scipy 时，内置匈牙利算法求解的连通分量规模上限（更大的分量按得分贪心分配）
+_MAX_HUNGARIAN_SIZE = 500
+
+
+@dataclass
+class Assignment:
+    """单个匹配对"""
+    row: int            # 文件序号
+    col: int            # 参考文献序号
+    score: float        # 相似度得分（0~1）
+    margin: float       # 与该文件次优候选的得分差
+
+
+@dataclass
+class SparseScores:
+    """稀疏得分矩阵：只保存每个文件候选参考文献的得分，未列出的组合视为 0"""
+    shape: Tuple[int, int]
+    columns: List[List[int]]    # 每个文件的候选参考文献序号
+    values: List[List[float]]   # 与 columns 一一对应的得分
+
+    def row_items(self, row: int) -> List[Tuple[int, float]]:
+        """某个文件的 (参考文献序号, 得分) 列表，得分降序、同分按序号"""
+        return sorted(zip(self.columns[row], self.values[row]), key=lambda item: (-item[1], item[0]))
+
+
+def _hashed_features(keys_grams: Sequence[set]) -> List["np.ndarray"]:
+    """将每个 n-gram 集合映射为去重后的哈希特征列号（稀疏表示）"""
+    return [np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) % _FEATURE_DIM for g in grams),
+                                  dtype=np.int64, count=len(grams)))
+            for grams in keys_grams]
+
+
+def _dense_block(features: List["np.ndarray"], start: int, stop: int) -> "np.ndarray":
+    """将 features[start:stop] 展开为二值稠密矩阵"""
+    block = features[start:stop]
+    matrix = np.zeros((len(block), _FEATURE_DIM), dtype=np.float32)
+    lengths = [len(cols) for cols in block]
+    if sum(lengths):
+        matrix[np.repeat(np.arange(len(block)), lengths), np.concatenate(block)] = 1.0
+    return matrix
+
+
+def _containment(query_features: List["np.ndarray"], ref_features: List["np.ndarray"]) -> "np.ndarray":
+    """计算包含度矩阵：查询 n-gram 中出现在参考文献里的比例"""
+    sizes = np.array([max(len(cols), 1) for cols in query_features], dtype=np.float32)[:, None]
+    result = np.empty((len(query_features), len(ref_features)), dtype=np.float32)
+    for ref_start in range(0, len(ref_features), _BLOCK_COLS):
+        ref_t = _dense_block(ref_features, ref_start, ref_start + _BLOCK_COLS).T
+        for start in range(0, len(query_features), _BLOCK_ROWS):
+            block = _dense_block(query_features, start, start + _BLOCK_ROWS)
+            result[start:start + _BLOCK_ROWS, ref_start:ref_start + _BLOCK_COLS] = \
+                (block @ ref_t) / sizes[start:start + _BLOCK_ROWS]
+    return result
+
+
+def _short_key(grams: Set[str]) -> Optional[str]:
+    """n-gram 集合来自短键（char_ngrams 对短键返回键本身）时返回该键"""
+    if len(grams) == 1:
+        key = next(iter(grams))
+        if len(key) <= _SHORT_KEY_LEN:
+            return key
+    return None
+
+
+def similarity_matrix(query_titles: List[Set[str]], query_authors: List[List[Set[str]]],
+                      query_years: List[Optional[str]], ref_titles: List[Set[str]],
+                      ref_authors: List[Set[str]], ref_years: List[Set[str]],
+                      ref_author_tokens: Optional[List[Set[str]]] = None,
+                      columns: Optional[Sequence[Sequence[int]]] = None):
+    """
+    计算文件与参考文献的相似度矩阵：标题 n-gram 包含度，作者、年份命中各加 0.25，
+    再按文件可用信息的权重归一化
+
+    作者的 n-gram 全部出现在参考文献作者字段中即视为命中；提供 ref_author_tokens 时，
+    短作者键（如 li）改为与参考文献作者的词元精确比较。
+    安装 NumPy 时以哈希特征矩阵分块相乘向量化计算，否则逐对计算。
+    提供 columns 时只计算每个文件候选参考文献的得分，返回 SparseScores
+
+    Args:
+        query_titles: 每个文件标题的 n-gram 集合
+        query_authors: 每个文件各作者的 n-gram 集合列表
+        query_years: 每个文件的年份
+        ref_titles: 每条参考文献标题的 n-gram 集合
+        ref_authors: 每条参考文献作者字段的 n-gram 集合
+        ref_years: 每条参考文献的年份集合
+        ref_author_tokens: 每条参考文献作者字段的词元集合（可选，见 fuzzy_matcher.author_tokens）
+        columns: 每个文件的候选参考文献序号（可选，如 LSH 召回结果）
+
+    Returns:
+        (文件数, 参考文献数) 得分矩阵（NumPy float32 数组；未安装 NumPy 时为嵌套列表；
+        提供 columns 时为 SparseScores）
+    """
+    if columns is not None:
+        return _shortlist_similarity(columns, query_titles, query_authors, query_years, ref_titles, ref_authors,
+                                     ref_years, ref_author_tokens)
+    if not _HAS_NUMPY:
+        return _similarity_lists(query_titles, query_authors, query_years, ref_titles, ref_authors, ref_years,
+                                 ref_author_tokens)
+
+    n_files, n_refs = len(query_titles), len(ref_titles)
+    if not n_files or not n_refs:
+        return np.zeros((n_files, n_refs), dtype=np.float32)
+
+    scores = _containment(_hashed_features(query_titles), _hashed_features(ref_titles))
+    scores[[i for i, grams in enumerate(query_titles) if not grams]] = 0.0
+
+    # 作者：任一作者的 n-gram 全部出现在参考文献作者字段中即视为命中，短作者键按词元比较
+    author_rows, owners, short_keys = [], [], []
+    for i, authors in enumerate(query_authors):
+        for grams in authors:
+            if not grams:
+                continue
+            key = _short_key(grams) if ref_author_tokens is not None else None
+            if key is not None:
+                short_keys.append((i, key))
+            else:
+                author_rows.append(grams)
+                owners.append(i)
+    author_hit = np.zeros((n_files, n_refs), dtype=np.float32)
+    if author_rows:
+        hits = (_containment(_hashed_features(author_rows), _hashed_features(ref_authors)) >= 0.999)
+        np.maximum.at(author_hit, np.asarray(owners), hits.astype(np.float32))
+    if short_keys:
+        wanted = {key for _, key in short_keys}
+        postings: Dict[str, List[int]] = {}
+        for j, tokens in enumerate(ref_author_tokens):
+            for token in wanted.intersection(tokens):
+                postings.setdefault(token, []).append(j)
+        for i, key in short_keys:
+            author_hit[i, postings.get(key, [])] = 1.0
+
+    # 年份：独热编码后相乘
+    year_vocab = {y: j for j, y in enumerate(sorted({y for ys in ref_years for y in ys}))}
+    year_hit = np.zeros((n_files, n_refs), dtype=np.float32)
+    if year_vocab:
+        ref_onehot = np.zeros((n_refs, len(year_vocab)), dtype=np.float32)
+        for j, ys in enumerate(ref_years):
+            ref_onehot[j, [year_vocab[y] for y in ys]] = 1.0
+        query_onehot = np.zeros((n_files, len(year_vocab)), dtype=np.float32)
+        for i, year in enumerate(query_years):
+            if year in year_vocab:
+                query_onehot[i, year_vocab[year]] = 1.0
+        year_hit = np.minimum(query_onehot @ ref_onehot.T, 1.0)
+
+    weights = np.array([1.0 + 0.25 * bool(authors) + 0.25 * bool(year)
+                        for authors, year in zip(query_authors, query_years)], dtype=np.float32)[:, None]
+    scores += 0.25 * author_hit + 0.25 * year_hit
+    scores /= weights
+    return scores
+
+
+def _shortlist_similarity(columns, query_titles, query_authors, query_years, ref_titles, ref_authors, ref_years,
+                          ref_author_tokens=None) -> SparseScores:
+    """按文件分块，每块只对块内候选参考文献的并集计算得分，内存与参考文献总数无关"""
+    result_columns: List[List[int]] = []
+    result_values: List[List[float]] = []
+    for start in range(0, len(query_titles), _BLOCK_ROWS):
+        stop = start + _BLOCK_ROWS
+        block_columns = [sorted(set(cols)) for cols in columns[start:stop]]
+        union = sorted({j for cols in block_columns for j in cols})
+        position = {j: k for k, j in enumerate(union)}
+
+        def pick(values):
+            return [values[j] for j in union]
+
+        block = similarity_matrix(query_titles[start:stop], query_authors[start:stop], query_years[start:stop],
+                                  pick(ref_titles), pick(ref_authors), pick(ref_years),
+                                  pick(ref_author_tokens) if ref_author_tokens is not None else None)
+        for i, cols in enumerate(block_columns):
+            result_columns.append(cols)
+            result_values.append([float(block[i][position[j]]) for j in cols])
+    return SparseScores(shape=(len(query_titles), len(ref_titles)), columns=result_columns, values=result_values)
+
+
+def _similarity_lists(query_titles, query_authors, query_years, ref_titles, ref_authors, ref_years,
+                      ref_author_tokens=None):
+    """未安装 NumPy 时逐对计算相似度"""
+
+    def author_hit(grams, j):
+        key = _short_key(grams) if ref_author_tokens is not None else None
+        return key in ref_author_tokens[j] if key is not None else grams <= ref_authors[j]
+
+    matrix = []
+    for title, authors, year in zip(query_titles, query_authors, query_years):
+        weights = 1.0 + 0.25 * bool(authors) + 0.25 * bool(year)
+        row = []
+        for j in range(len(ref_titles)):
+            total = len(title & ref_titles[j]) / len(title) if title else 0.0
+            if authors:
+                total += 0.25 * any(grams and author_hit(grams, j) for grams in authors)
+            if year:
+                total += 0.25 * (year in ref_years[j])
+            row.append(total / weights)
+        matrix.append(row)
+    return matrix
+
+
+def _hungarian(cost: "np.ndarray") -> List[Tuple[int, int]]:
+    """
+    最短增广路径匈牙利算法（行数 <= 列数），求最小代价完美匹配
+    内层对列的松弛操作向量化，复杂度 O(n^2 m)
+    """
+    n, m = cost.shape
+    inf = np.inf
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)      # p[j]：分配给第 j 列的行（1 起始，0 表示未分配）
+    way = np.zeros(m + 1, dtype=np.int64)
+    padded = np.zeros((n + 1, m + 1))
+    padded[1:, 1:] = cost
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            free[0] = False
+            cur = padded[i0] - u[i0] - v
+            improve = free & (cur < minv)
+            minv[improve] = cur[improve]
+            way[improve] = j0
+            candidates = np.where(free, minv, inf)
+            j1 = int(np.argmin(candidates))
+            delta = candidates[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    return [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j] != 0]
+
+
+def _greedy_pairs(scores: "np.ndarray", min_score: float) -> List[Tuple[int, int]]:
+    """按得分从高到低贪心分配（同分按行、列序号），每行每列只分配一次"""
+    rows, cols = np.nonzero(scores >= min_score)
+    order = np.lexsort((cols, rows, -scores[rows, cols]))
+    used_rows, used_cols, pairs = set(), set(), []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            pairs.append((r, c))
+    return pairs
+
+
+def _solve_dense(scores: "np.ndarray", min_score: float) -> List[Tuple[int, int]]:
+    """求解得分最大的一对一分配"""
+    if _HAS_SCIPY:
+        rows, cols = _scipy_lsa(scores, maximize=True)
+        return list(zip(rows.tolist(), cols.tolist()))
+    if min(scores.shape) > _MAX_HUNGARIAN_SIZE:
+        # 内置匈牙利算法的外层循环在 Python 中执行，分量过大时改为贪心分配
+        logger.debug(f"分配子问题规模 {scores.shape[0]}x{scores.shape[1]} 超出上限且未安装 scipy，按得分贪心分配")
+        return _greedy_pairs(scores, min_score)
+    if scores.shape[0] <= scores.shape[1]:
+        return _hungarian(-scores.astype(np.float64))
+    return [(r, c) for c, r in _hungarian(-scores.T.astype(np.float64))]
+
+
+def _components(edges: List[Tuple[int, int]], n_rows: int) -> List[Tuple[List[int], List[int]]]:
+    """按候选边划分二分图连通分量，各分量独立求解"""
+    parent: Dict[int, int] = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for r, c in edges:
+        a, b = find(r), find(n_rows + c)
+        if a != b:
+            parent[a] = b
+
+    groups: Dict[int, Tuple[set, set]] = {}
+    for r, c in edges:
+        rows, cols = groups.setdefault(find(r), (set(), set()))
+        rows.add(r)
+        cols.add(c)
+    return [(sorted(rows), sorted(cols)) for rows, cols in groups.values()]
+
+
+def _candidate_edges(scores: "np.ndarray", min_score: float, top_k: int) -> List[Tuple[int, int]]:
+    """每个文件只保留得分不低于下限的前 top_k 个参考文献作为候选边，使图保持稀疏"""
+    k = min(top_k, scores.shape[1])
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    rows = np.repeat(np.arange(scores.shape[0]), top.shape[1])
+    cols = top.reshape(-1)
+    keep = scores[rows, cols] >= min_score
+    return list(zip(rows[keep].tolist(), cols[keep].tolist()))
+
+
+def optimal_assignment(scores, min_score: float = 0.3, top_k: int = 10) -> List[Assignment]:
+    """
+    求解文件与参考文献的一对一最优分配（总得分最大）
+
+    每个文件只考虑得分不低于 min_score 的前 top_k 个参考文献，稀疏候选图按连通分量
+    拆分后分别求解，可扩展到数千 × 数千规模。优先使用 scipy 的 linear_sum_assignment，
+    未安装时使用内置匈牙利算法（分量超过 _MAX_HUNGARIAN_SIZE 时按得分贪心分配）；
+    未安装 NumPy 时退化为按得分贪心分配
+
+    Args:
+        scores: (文件数, 参考文献数) 得分矩阵（NumPy 数组、嵌套列表或 SparseScores）
+        min_score: 参与分配的最低得分
+        top_k: 每个文件参与分配的候选参考文献数
+
+    Returns:
+        匹配对列表（按文件序号排序）
+    """
+    if isinstance(scores, SparseScores):
+        return _sparse_assignment(scores, min_score, top_k)
+    if not _HAS_NUMPY:
+        return _greedy_assignment(scores, min_score)
+
+    scores = np.asarray(scores, dtype=np.float32)
+    if scores.size == 0:
+        return []
+
+    # 各文件的最优、次优得分，用于计算置信度间隔
+    if scores.shape[1] > 1:
+        top2 = -np.partition(-scores, 1, axis=1)[:, :2]
+    else:
+        top2 = np.hstack([scores, np.zeros_like(scores)])
+
+    pairs = _solve_components(_candidate_edges(scores, min_score, top_k), scores.shape[0],
+                              lambda rows, cols: scores[np.ix_(rows, cols)], min_score)
+    return [_assignment(r, c, float(scores[r, c]), top2[r]) for r, c in sorted(pairs)]
+
+
+def _solve_components(edges: List[Tuple[int, int]], n_rows: int, submatrix, min_score: float) -> List[Tuple[int, int]]:
+    """按连通分量分别求解；submatrix(rows, cols) 返回分量内的得分矩阵"""
+    pairs = []
+    for rows, cols in _components(edges, n_rows):
+        if len(rows) == 1 and len(cols) == 1:
+            pairs.append((rows[0], cols[0]))
+            continue
+        # 非候选组合置为 0，求解后剔除
+        sub = np.asarray(submatrix(rows, cols), dtype=np.float32)
+        sub = np.where(sub >= min_score, sub, 0.0)
+        for r, c in _solve_dense(sub, min_score):
+            if sub[r, c] >= min_score:
+                pairs.append((rows[r], cols[c]))
+    return pairs
+
+
+def _assignment(row: int, col: int, score: float, top2: Sequence[float]) -> Assignment:
+    """由文件的最优、次优得分计算置信度间隔：分配到的不是该文件的最优候选时间隔为负"""
+    other = top2[1] if score >= top2[0] else top2[0]
+    return Assignment(row=row, col=col, score=round(score, 4), margin=round(score - float(other), 4))
+
+
+def _sparse_assignment(scores: SparseScores, min_score: float, top_k: int) -> List[Assignment]:
+    """稀疏得分矩阵的一对一分配：候选边只来自各文件已计算得分的参考文献"""
+    lookup: Dict[Tuple[int, int], float] = {}
+    edges, top2 = [], []
+    for r in range(scores.shape[0]):
+        items = scores.row_items(r)
+        lookup.update(((r, c), s) for c, s in items)
+        edges.extend((r, c) for c, s in items[:top_k] if s >= min_score)
+        top2.append(([s for _, s in items[:2]] + [0.0, 0.0])[:2])
+
+    if _HAS_NUMPY:
+        pairs = _solve_components(edges, scores.shape[0],
+                                  lambda rows, cols: [[lookup.get((r, c), 0.0) for c in cols] for r in rows],
+                                  min_score)
+    else:
+        pairs = _greedy_items([(lookup[edge], edge[0], edge[1]) for edge in edges])
+    return [_assignment(r, c, lookup[(r, c)], top2[r]) for r, c in sorted(pairs)]
+
+
+def _greedy_items(items: List[Tuple[float, int, int]]) -> List[Tuple[int, int]]:
+    """(得分, 行, 列) 按得分从高到低贪心分配（同分按行、列序号），每行每列只分配一次"""
+    used_rows, used_cols, pairs = set(), set(), []
+    for _, r, c in sorted(items, key=lambda x: (-x[0], x[1], x[2])):
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            pairs.append((r, c))
+    return pairs
+
+
+def _greedy_assignment(scores, min_score: float) -> List[Assignment]:
+    """未安装 NumPy 时的贪心分配：按得分从高到低，每个文件和参考文献只分配一次"""
+    rows = [list(row) for row in scores]
+    pairs = _greedy_items([(s, r, c) for r, row in enumerate(rows) for c, s in enumerate(row) if s >= min_score])
+    result = []
+    for r, c in sorted(pairs):
+        others = sorted((s for j, s in enumerate(rows[r]) if j != c), reverse=True)
+        result.append(Assignment(row=r, col=c, score=round(rows[r][c], 4),
+                                 margin=round(rows[r][c] - (others[0] if others else 0.0), 4)))
+    return result
+
+
+def top_columns(scores, row: int, k: int, exclude: Optional[set] = None) -> List[int]:
+    """
+    返回某个文件得分最高的 k 个参考文献序号（得分降序，同分按序号）
+
+    Args:
+        scores: similarity_matrix 返回的得分矩阵（SparseScores 只在已计算得分的参考文献中选取）
+        row: 文件序号
+        k: 返回数量
+        exclude: 需要排除的参考文献序号
+    """
+    exclude = exclude or set()
+    if isinstance(scores, SparseScores):
+        return [j for j, _ in scores.row_items(row) if j not in exclude][:k]
+    if _HAS_NUMPY and isinstance(scores, np.ndarray):
+        order = np.argsort(-scores[row], kind="stable")
+        result = []
+        for j in order.tolist():
+            if j not in exclude:
+                result.append(j)
+                if len(result) >= k:
+                    break
+        return result
+    values = scores[row]
+    return sorted((j for j in range(len(values)) if j not in exclude), key=lambda j: (-values[j], j))[:k]
@@ -0,0 +1,258 @@
+# new_workflow/src/export_formats.py
+"""
+结果导出格式
+每种格式是一个导出器：逐条接收已排序的总结记录并写入文件，不在内存中保留全部结果。
+内置 CSV、XLSX（单元格自动换行）、Parquet（含元数据与耗时）和 Markdown 综述文档，
+可通过 register_exporter 注册新的格式
+"""
+import abc
+import csv
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import openpyxl  # optional
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    from openpyxl.styles import Alignment, Font
+    _HAS_OPENPYXL = True
+except Exception:
+    _HAS_OPENPYXL = False
+
+try:
+    import pyarrow as pa  # optional
+    import pyarrow.parquet as pq
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+# Excel 单元格最多容纳的字符数
+_XLSX_CELL_LIMIT = 32767
+_TRUNCATED = "…（内容过长已截断，完整内容见 CSV 或 Markdown 导出）"
+# Parquet 每批写入的记录数
+_PARQUET_BATCH = 1000
+_MD_HEADING = re.compile(r'^(#{1,6})(?=\s)', re.MULTILINE)
+
+
+def _text(value: Any) -> str:
+    return '' if value is None else str(value)
+
+
+class Exporter(abc.ABC):
+    """导出器基类"""
+    name = ""
+    extension = ""
+    mimetype = "application/octet-stream"
+    requirement: Optional[str] = None   # 依赖的可选第三方包
+
+    def available(self) -> bool:
+        return True
+
+    @abc.abstractmethod
+    def write(self, records: Iterable[Dict[str, Any]], output_path: str) -> int:
+        """
+        将记录写入文件
+
+        Args:
+            records: 已排序的总结记录
+            output_path: 输出文件路径
+
+        Returns:
+            写入的记录数
+        """
+
+
+class CsvExporter(Exporter):
+    """reference, summary 两列的 CSV（UTF-8 BOM，Excel 可直接打开）"""
+    name = "csv"
+    extension = ".csv"
+    mimetype = "text/csv"
+    header = ('reference', 'summary')
+
+    @staticmethod
+    def row(record: Dict[str, Any]) -> List[str]:
+        return [_text(record.get('reference')).strip(), _text(record.get('summary'))]
+
+    def write(self, records, output_path):
+        count = 0
+        with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.header)
+            for r in records:
+                writer.writerow(self.row(r))
+                count += 1
+        return count
+
+
+class XlsxExporter(Exporter):
+    """XLSX 工作簿：总结列自动换行，超长内容按 Excel 单元格上限截断"""
+    name = "xlsx"
+    extension = ".xlsx"
+    mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    requirement = "openpyxl"
+
+    def available(self):
+        return _HAS_OPENPYXL
+
+    @staticmethod
+    def _cell(sheet, value: str, wrap: bool = True, bold: bool = False):
+        # XML 不允许的控制字符（如 \x0b）会使 openpyxl 抛出 IllegalCharacterError
+        value = ILLEGAL_CHARACTERS_RE.sub('', value)
+        if len(value) > _XLSX_CELL_LIMIT:
+            value = value[:_XLSX_CELL_LIMIT - len(_TRUNCATED)] + _TRUNCATED
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.alignment = Alignment(wrap_text=wrap, vertical="top")
+        if bold:
+            cell.font = Font(bold=True)
+        return cell
+
+    def write(self, records, output_path):
+        # write_only 模式逐行写入，内存占用与行数无关
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("文献综述")
+        sheet.freeze_panes = "A2"
+        for column, width in zip("ABC", (50, 100, 30)):
+            sheet.column_dimensions[column].width = width
+        sheet.append([self._cell(sheet, title, wrap=False, bold=True)
+                      for title in ('reference', 'summary', 'file_name')])
+        count = 0
+        for r in records:
+            sheet.append([self._cell(sheet, _text(r.get('reference')).strip()),
+                          self._cell(sheet, _text(r.get('summary'))),
+                          self._cell(sheet, _text(r.get('file_name')), wrap=False)])
+            count += 1
+        workbook.save(output_path)
+        return count
+
+
+class ParquetExporter(Exporter):
+    """列式 Parquet：包含参考文献、总结以及文件名、输入方式、耗时等元数据"""
+    name = "parquet"
+    extension = ".parquet"
+    mimetype = "application/vnd.apache.parquet"
+    requirement = "pyarrow"
+
+    def available(self):
+        return _HAS_PYARROW
+
+    @staticmethod
+    def _schema():
+        return pa.schema([
+            ("reference", pa.string()),
+            ("summary", pa.string()),
+            ("file_name", pa.string()),
+            ("file_path", pa.string()),
+            ("input_mode", pa.string()),
+            ("window_count", pa.int32()),
+            ("elapsed_time", pa.float64()),
+            ("file_index", pa.int32()),
+        ], metadata={"generator": "ScholarFlow", "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+    @staticmethod
+    def _number(value: Any, cast):
+        try:
+            return None if value is None else cast(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _flush(self, writer, schema, rows: List[Dict[str, Any]]):
+        columns = {field.name: [] for field in schema}
+        for r in rows:
+            columns["reference"].append(_text(r.get("reference")).strip())
+            columns["summary"].append(_text(r.get("summary")))
+            for key in ("file_name", "file_path", "input_mode"):
+                columns[key].append(None if r.get(key) is None else str(r.get(key)))
+            columns["window_count"].append(self._number(r.get("window_count"), int))
+            columns["elapsed_time"].append(self._number(r.get("elapsed_time"), float))
+            columns["file_index"].append(self._number(r.get("file_index"), int))
+        writer.write_table(pa.table(columns, schema=schema))
+
+    def write(self, records, output_path):
+        schema = self._schema()
+        count = 0
+        rows: List[Dict[str, Any]] = []
+        with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+            for r in records:
+                rows.append(r)
+                count += 1
+                if len(rows) >= _PARQUET_BATCH:
+                    self._flush(writer, schema, rows)
+                    rows = []
+            if rows:
+                self._flush(writer, schema, rows)
+        return count
+
+
+class MarkdownExporter(Exporter):
+    """单个 Markdown 综述文档：每篇文献一节，节内保留总结原有的 Markdown 结构"""
+    name = "markdown"
+    extension = ".md"
+    mimetype = "text/markdown"
+
+    @staticmethod
+    def _demote(summary: str) -> str:
+        # 总结中的标题降两级，使其位于文献小节之下
+        return _MD_HEADING.sub(lambda m: '#' * min(6, len(m.group(1)) + 2), summary)
+
+    def write(self, records, output_path):
+        count = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write("# 文献综述结果\n")
+            for r in records:
+                count += 1
+                f.write(f"\n## {count}. {_text(r.get('reference')).strip()}\n\n")
+                if r.get('file_name'):
+                    f.write(f"> 文件：{r['file_name']}\n\n")
+                f.write(self._demote(_text(r.get('summary')).strip()))
+                f.write("\n")
+        return count
+
+
+_EXPORTERS: Dict[str, Exporter] = {}
+
+
+def register_exporter(exporter: Exporter):
+    """注册导出器（同名覆盖）"""
+    _EXPORTERS[exporter.name] = exporter
+
+
+for _exporter in (CsvExporter(), XlsxExporter(), ParquetExporter(), MarkdownExporter()):
+    register_exporter(_exporter)
+
+
+def export_formats() -> List[str]:
+    """已注册的导出格式"""
+    return list(_EXPORTERS)
+
+
+def get_exporter(fmt: str) -> Exporter:
+    """
+    按名称获取导出器
+
+    Args:
+        fmt: 导出格式名称（md 视为 markdown）
+
+    Returns:
+        导出器
+
+    Raises:
+        ValueError: 未知格式
+        RuntimeError: 格式依赖的第三方包未安装
+    """
+    fmt = (fmt or "csv").lower()
+    exporter = _EXPORTERS.get("markdown" if fmt == "md" else fmt)
+    if exporter is None:
+        raise ValueError(f"不支持的导出格式: {fmt}（可选: {', '.join(_EXPORTERS)}）")
+    if not exporter.available():
+        raise RuntimeError(f"导出 {exporter.name} 需要安装 {exporter.requirement}")
+    return exporter
+
+
+def export_output_path(csv_path: str, fmt: str) -> str:
+    """由 CSV 结果路径推出其他格式的输出路径（同名不同扩展名）"""
+    exporter = get_exporter(fmt)
+    if exporter.name == "csv":
+        return csv_path
+    return os.path.splitext(csv_path)[0] + exporter.extension
@@ -0,0 +1,225 @@
+# new_workflow/src/export_index.py
+"""
+增量维护的排序导出索引
+持久化 CSV 中每一行的排序键（含预先计算的拼音）、记录指纹和字节长度。
+总结结果变化时，新增或修改的行按排序键二分插入，删除的行直接移除，
+CSV 只从第一处变化的位置开始重新生成，之前的内容按字节原样复制
+"""
+import bisect
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .export_formats import CsvExporter
+from .logger import logger
+from .utils import atomic_write_json
+
+# 索引格式变化时递增
+_INDEX_VERSION = 2
+_BOM = "\ufeff".encode("utf-8")
+# 复制 CSV 未变化部分时每次读写的字节数
+_COPY_SIZE = 1 << 20
+
+# 索引行：[排序键类别, 排序键文本, 输入序号, 记录标识, 记录指纹, CSV 行字节数]
+# 输入序号是记录在总结结果中的位置，与完整导出一样用于排序键相同时的先后顺序
+_Row = List[Any]
+
+
+def _row_key(row: _Row) -> Tuple[int, str, int]:
+    return row[0], row[1], row[2]
+
+
+def _record_id(record: Dict[str, Any]) -> str:
+    """记录标识：文件名（缺失时使用参考文献）"""
+    return str(record.get('file_name') or record.get('reference'))
+
+
+def _csv_bytes(values: List[str]) -> bytes:
+    """按 CsvExporter 的写法序列化一行 CSV"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _record_bytes(record: Dict[str, Any]) -> bytes:
+    return _csv_bytes(CsvExporter.row(record))
+
+
+def _digest(record: Dict[str, Any]) -> str:
+    return hashlib.sha1(_record_bytes(record)).hexdigest()
+
+
+def _file_stat(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class SortedExportIndex:
+    """
+    排序导出索引
+
+    rows 按 (排序键类别, 排序键文本, 输入序号) 有序，与完整导出的排序条目一致
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows: List[_Row] = []
+        self.header_length = 0
+        self.csv_stat: Optional[List[int]] = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == _INDEX_VERSION:
+                self.rows = data["rows"]
+                self.header_length = data["header_length"]
+                self.csv_stat = data.get("csv_stat")
+        except Exception as e:
+            logger.warning(f"读取导出索引失败，将重新生成 CSV: {e}")
+            self.rows, self.csv_stat = [], None
+
+    def save(self):
+        atomic_write_json(self.path, {
+            "version": _INDEX_VERSION,
+            "header_length": self.header_length,
+            "csv_stat": self.csv_stat,
+            "rows": self.rows,
+        }, indent=None)
+
+    def matches(self, csv_path: str) -> bool:
+        """索引是否与磁盘上的 CSV 一致（CSV 被外部修改或上次写入中断时返回 False）"""
+        return self.csv_stat is not None and self.csv_stat == _file_stat(csv_path)
+
+    def rebuild(self, sorted_items: Iterable[Tuple[int, str, int, Dict[str, Any]]], csv_path: str) -> int:
+        """
+        完整重写 CSV 并重建索引
+
+        Args:
+            sorted_items: 已排序的 (排序键类别, 排序键文本, 输入序号, 记录)
+            csv_path: 输出 CSV 路径
+
+        Returns:
+            写入的记录数
+        """
+        os.makedirs(os.path.dirname(csv_path) or '.', exist_ok=True)
+        tmp_path = f"{csv_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        header = _BOM + _csv_bytes(list(CsvExporter.header))
+        rows: List[_Row] = []
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                for category, text, seq, record in sorted_items:
+                    data = _record_bytes(record)
+                    f.write(data)
+                    rows.append([category, text, seq, _record_id(record),
+                                 hashlib.sha1(data).hexdigest(), len(data)])
+            os.replace(tmp_path, csv_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.rows = rows
+        self.header_length = len(header)
+        self.csv_stat = _file_stat(csv_path)
+        self.save()
+        return len(rows)
+
+    def diff(self, records: Iterable[Any]) -> Tuple[Dict[str, Dict[str, Any]], set, Dict[str, int]]:
+        """
+        比较当前总结结果与索引
+
+        Args:
+            records: 总结结果记录（可以是生成器）
+
+        Returns:
+            (新增或内容变化的记录 {标识: 记录}, 已删除或内容变化的记录标识,
+            当前有效记录的输入序号 {标识: 序号})；结果中存在重复标识时抛出 ValueError
+        """
+        indexed = {row[3]: row[4] for row in self.rows}
+        changed: Dict[str, Dict[str, Any]] = {}
+        positions: Dict[str, int] = {}
+        for seq, record in enumerate(records):
+            if not isinstance(record, dict) or 'reference' not in record:
+                continue
+            record_id = _record_id(record)
+            if record_id in positions:
+                raise ValueError(f"总结结果中存在重复记录: {record_id}")
+            positions[record_id] = seq
+            if indexed.get(record_id) != _digest(record):
+                changed[record_id] = record
+        removed = {record_id for record_id in indexed if record_id not in positions or record_id in changed}
+        return changed, removed, positions
+
+    def apply(self, changed: Dict[str, Dict[str, Any]], removed: set,
+              sort_keys: Dict[str, Tuple[int, str]], positions: Dict[str, int], csv_path: str) -> int:
+        """
+        将变化合并进索引，并从第一处变化的位置开始重新生成 CSV
+
+        Args:
+            changed: 新增或内容变化的记录 {标识: 记录}
+            removed: 需要移除的记录标识（内容变化的记录也包含在内）
+            sort_keys: changed 中每条记录的排序键
+            positions: 当前有效记录的输入序号（见 diff）
+            csv_path: CSV 路径
+
+        Returns:
+            重写的行数；未变化记录的相对顺序被改变（总结结果被重新排列）或 CSV 与索引不一致时
+            抛出 ValueError，此时索引与 CSV 均保持不变
+        """
+        old_rows = self.rows
+        # 删除记录后其后记录的输入序号随之前移，未变化的行使用当前序号，才能与新插入的行正确比较
+        rows = [row[:2] + [positions[row[3]]] + row[3:] for row in old_rows if row[3] not in removed]
+        if any(_row_key(a) > _row_key(b) for a, b in zip(rows, rows[1:])):
+            raise ValueError("总结结果中记录的先后顺序已变化")
+        start = next((i for i, row in enumerate(old_rows) if row[3] in removed), len(old_rows))
+        new_bytes: Dict[str, bytes] = {}
+        for record_id, record in changed.items():
+            category, text = sort_keys[record_id]
+            seq = positions[record_id]
+            data = _record_bytes(record)
+            new_bytes[record_id] = data
+            position = bisect.bisect_left(rows, (category, text, seq), key=_row_key)
+            rows.insert(position, [category, text, seq, record_id, hashlib.sha1(data).hexdigest(), len(data)])
+            start = min(start, position)
+
+        offset = self.header_length + sum(row[5] for row in old_rows[:start])
+        # 写入临时文件后原子替换，下载中的读取方始终看到完整的文件：
+        # 变化位置之前的字节原样复制，之后未变化的行从旧 CSV 顺序复制，只有新行需要重新生成
+        tmp_path = f"{csv_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(csv_path, "rb") as src, open(tmp_path, "wb") as dst:
+                remaining = offset
+                while remaining > 0:
+                    chunk = src.read(min(remaining, _COPY_SIZE))
+                    if not chunk:
+                        raise ValueError("CSV 长度与导出索引不一致")
+                    dst.write(chunk)
+                    remaining -= len(chunk)
+                old_tail = iter(old_rows[start:])
+                for row in rows[start:]:
+                    data = new_bytes.get(row[3])
+                    if data is None:
+                        # 未变化的行：跳过旧尾部中已删除的行，直到读到该行
+                        for old_row in old_tail:
+                            data = src.read(old_row[5])
+                            if old_row[3] == row[3]:
+                                break
+                    dst.write(data)
+            os.replace(tmp_path, csv_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.rows = rows
+        self.csv_stat = _file_stat(csv_path)
+        self.save()
+        return len(rows) - start
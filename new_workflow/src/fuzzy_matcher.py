@@ -0,0 +1,265 @@
+# new_workflow/src/fuzzy_matcher.py
+"""
+本地模糊预匹配模块
+在调用大模型之前，基于文件名中的标题、作者和年份与参考文献进行确定性匹配，
+只把无法确定的文件连同候选参考文献交给大模型处理
+"""
+import hashlib
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from .assignment import optimal_assignment, similarity_matrix, top_columns
+from .config_loader import get_config
+from .utils import to_pinyin
+
+# 参考文献行首编号：[1]、1.、1、(1)、（1）（"3.5" 这类小数不视为编号）
+_REF_NUMBERING = re.compile(r'^\s*(\[\s*\d+\s*\]|\(\s*\d+\s*\)|（\s*\d+\s*）|\d+\s*[.、．](?!\d))\s*')
+# 不带分隔符的行首编号（1 Kyle...）：只有全部条目按顺序编号时才去除，避免误删 "2008 年…"、"3 Essays…"
+_BARE_NUMBERING = re.compile(r'^\s*(\d+)\s+')
+# Zotero 风格文件名：作者 - 年份 - 标题
+_ZOTERO_NAME = re.compile(r'^(?P<authors>.+?)\s+-\s+(?P<year>\d{4})\s+-\s+(?P<title>.+)$')
+_YEAR = re.compile(r'(?<!\d)(19|20)\d{2}(?!\d)')
+_CJK = re.compile(r'[\u4e00-\u9fff]')
+# 作者之间的分隔符（含“等”“和”“et al.”等）
+_AUTHOR_SEPARATORS = re.compile(r'\s*(?:,|，|、|;|；|&|\band\b|\bet\s+al\.?|等|和|与)\s*', re.IGNORECASE)
+
+
+@dataclass
+class FileQuery:
+    """从PDF文件名解析出的检索信息"""
+    file_name: str
+    title: str
+    authors: List[str] = field(default_factory=list)
+    year: Optional[str] = None
+
+
+@dataclass
+class PrematchResult:
+    """本地预匹配结果"""
+    matched: Dict[str, str]                 # 确定匹配的 文件名 -> 参考文献
+    unresolved: List[str]                   # 需要交给大模型的文件名
+    candidates: Dict[str, List[str]]        # 未确定文件的候选参考文献（按得分降序）
+    scores: Dict[str, float] = field(default_factory=dict)  # 确定匹配的得分
+    flagged: Dict[str, float] = field(default_factory=dict)  # 最优分配得分不足、需大模型裁决的文件及其得分
+
+
+def split_references(references_text: str) -> List[str]:
+    """
+    将参考文献列表文本拆分为单条参考文献，并去除行首编号
+
+    Args:
+        references_text: 参考文献列表文本（每行一条）
+
+    Returns:
+        去除编号后的参考文献字符串列表（保持原顺序，去重）
+    """
+    lines = [line.strip() for line in references_text.splitlines() if line.strip()]
+    numbering = _BARE_NUMBERING if _sequentially_numbered(lines) else _REF_NUMBERING
+    references = []
+    seen = set()
+    for line in lines:
+        ref = numbering.sub('', line, count=1).strip()
+        if ref and ref not in seen:
+            seen.add(ref)
+            references.append(ref)
+    return references
+
+
+def _sequentially_numbered(lines: List[str]) -> bool:
+    """是否每一行都以不带分隔符的数字开头，且数字逐行加 1（至少两行）"""
+    numbers = []
+    for line in lines:
+        match = _BARE_NUMBERING.match(line)
+        if not match:
+            return False
+        numbers.append(int(match.group(1)))
+    return len(numbers) > 1 and all(b == a + 1 for a, b in zip(numbers, numbers[1:]))
+
+
+def reference_key(reference: str) -> str:
+    """参考文献的归一化键：全角转半角、小写，去除空白和标点（对空格、标点差异不敏感）"""
+    return re.sub(r'[\W_]+', '', unicodedata.normalize('NFKC', reference).lower())
+
+
+def reference_hash(reference: str) -> str:
+    """参考文献归一化键的哈希，用作参考文献指纹"""
+    return hashlib.sha1(reference_key(reference).encode('utf-8')).hexdigest()[:16]
+
+
+def match_key(text: str) -> str:
+    """
+    生成用于模糊比较的归一化键：全角转半角、小写，中文转为拼音，去除空白和标点
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = ''.join(to_pinyin(text))
+    return re.sub(r'[\W_]+', '', text)
+
+
+def char_ngrams(key: str, n: int = 3) -> Set[str]:
+    """提取字符 n-gram 集合（键过短时返回键本身）"""
+    if len(key) <= n:
+        return {key} if key else set()
+    return {key[i:i + n] for i in range(len(key) - n + 1)}
+
+
+def author_tokens(authors: List[str]) -> Set[str]:
+    """
+    作者字段的词元集合：每个单词的归一化键，中文姓名另加姓氏，供短作者键（如 Li、Wu）精确比较
+    """
+    tokens = set()
+    for author in authors:
+        for word in re.split(r'[\W_]+', unicodedata.normalize('NFKC', author).lower()):
+            if not word:
+                continue
+            tokens.add(match_key(word))
+            if _CJK.search(word):
+                syllables = [s for s in to_pinyin(word) if s.strip()]
+                if syllables:
+                    tokens.add(match_key(syllables[0]))
+    return tokens
+
+
+def author_surname(author: str) -> str:
+    """英文作者只保留姓氏（最后一个单词），中文作者保留全名"""
+    words = author.strip().split()
+    return words[-1] if len(words) > 1 and words[-1].isascii() else author.strip()
+
+
+def parse_pdf_filename(file_name: str) -> FileQuery:
+    """
+    解析PDF文件名中的作者、年份和标题
+
+    支持 Zotero 风格命名（如 `Easley 等 - 2012 - Flow Toxicity...pdf`、`张涛 和 邵群 - 2017 - 标题.pdf`），
+    其他文件名整体视为标题
+
+    Args:
+        file_name: PDF文件名
+
+    Returns:
+        FileQuery: 解析结果
+    """
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    stem = unicodedata.normalize('NFKC', stem).replace('_', ' ').strip()
+
+    match = _ZOTERO_NAME.match(stem)
+    if match:
+        authors = [a for a in _AUTHOR_SEPARATORS.split(match.group('authors')) if a and a.strip()]
+        return FileQuery(file_name=file_name, title=match.group('title').strip(),
+                         authors=[author_surname(a) for a in authors], year=match.group('year'))
+
+    year_match = _YEAR.search(stem)
+    return FileQuery(file_name=file_name, title=stem, year=year_match.group(0) if year_match else None)
+
+
+class ReferenceCandidates:
+    """预先计算参考文献的归一化特征，供多个文件重复比较"""
+
+    def __init__(self, references: List[str], records: Optional[List] = None):
+        """
+        Args:
+            references: 参考文献列表（已去除编号）
+            records: 与 references 一一对应的结构化记录（ReferenceRecord）；提供时标题只与
+                解析出的标题比较、作者只与作者字段比较，避免期刊名等字段造成误匹配
+        """
+        self.references = references
+        self.keys = [match_key(ref) for ref in references]
+        self.years = [set(m.group(0) for m in _YEAR.finditer(ref)) for ref in references]
+        self.title_keys = list(self.keys)
+        self.author_keys = list(self.keys)
+        tokens: List[Optional[Set[str]]] = [None] * len(references)
+        if records:
+            for i, record in enumerate(records):
+                if record.style == "other":
+                    continue
+                if record.title:
+                    self.title_keys[i] = match_key(record.title)
+                if record.authors:
+                    self.author_keys[i] = match_key(''.join(record.authors))
+                    tokens[i] = author_tokens(record.authors)
+                if record.year:
+                    self.years[i] = {record.year}
+        self.ngrams = [char_ngrams(key) for key in self.title_keys]
+        # 没有解析出作者的参考文献与作者键一致，使用整条参考文献的词元
+        self.author_tokens = [t if t is not None else author_tokens([ref]) for t, ref in zip(tokens, references)]
+
+    def score_matrix(self, queries: List[FileQuery], columns: Optional[List[List[int]]] = None):
+        """
+        一次性计算多个文件与全部参考文献的匹配得分（0~1）
+
+        文件名中的标题常被截断，标题使用 n-gram 包含度而不是 Jaccard；作者、年份命中各加 0.25，
+        再按文件可用信息的权重归一化
+
+        Args:
+            queries: 各文件的检索信息
+            columns: 每个文件的候选参考文献序号（可选，提供时只计算候选的得分）
+
+        Returns:
+            (文件数, 参考文献数) 得分矩阵（提供 columns 时为 SparseScores）
+        """
+        return similarity_matrix(
+            [char_ngrams(match_key(q.title)) for q in queries],
+            [[char_ngrams(match_key(a)) for a in q.authors if match_key(a)] for q in queries],
+            [q.year for q in queries],
+            self.ngrams,
+            [char_ngrams(key) for key in self.author_keys],
+            self.years,
+            self.author_tokens,
+            columns=columns,
+        )
+
+
+def prematch(pdf_files: List[str], references: List[str], records: Optional[List] = None,
+             queries: Optional[Dict[str, FileQuery]] = None,
+             shortlists: Optional[Dict[str, List[int]]] = None) -> PrematchResult:
+    """
+    本地预匹配：对得分矩阵求解一对一最优分配，得分高且明显优于次优候选的匹配直接确定，
+    其余文件生成候选清单（低置信度的分配结果排在候选首位）
+
+    Args:
+        pdf_files: PDF文件路径或文件名列表
+        references: 参考文献列表（已去除编号）
+        records: 参考文献的结构化解析记录（可选，见 reference_parser）
+        queries: 文件名到检索信息的映射（可选，未提供的文件从文件名解析）
+        shortlists: 文件名到候选参考文献序号的映射（可选，如 LSH 召回结果；提供时只为候选计算得分）
+
+    Returns:
+        PrematchResult: 预匹配结果
+    """
+    threshold = get_config("matching.local_threshold", 0.8)
+    margin = get_config("matching.local_margin", 0.1)
+    shortlist_size = get_config("matching.shortlist_size", 5)
+    min_score = get_config("matching.assignment_min_score", 0.3)
+
+    file_names = [os.path.basename(f) for f in pdf_files]
+    index = ReferenceCandidates(references, records)
+    queries = queries or {}
+    columns = [shortlists.get(name, []) for name in file_names] if shortlists is not None else None
+    scores = index.score_matrix([queries.get(name) or parse_pdf_filename(name) for name in file_names], columns)
+
+    # 全局一对一最优分配；得分达到阈值且领先次优候选足够多的匹配直接确定，
+    # 其余（低置信度）匹配作为首选候选交给大模型裁决
+    matched, match_scores, flagged, proposed, used = {}, {}, {}, {}, set()
+    for pair in optimal_assignment(scores, min_score):
+        name = file_names[pair.row]
+        if pair.score >= threshold and pair.margin >= margin:
+            matched[name] = references[pair.col]
+            match_scores[name] = pair.score
+            used.add(pair.col)
+        else:
+            proposed[name] = pair.col
+            flagged[name] = pair.score
+
+    unresolved = [name for name in file_names if name not in matched]
+    candidates = {}
+    for row, name in enumerate(file_names):
+        if name in matched:
+            continue
+        order = top_columns(scores, row, shortlist_size, used)
+        if name in proposed:
+            order = [proposed[name]] + [j for j in order if j != proposed[name]][:shortlist_size - 1]
+        candidates[name] = [references[j] for j in order]
+    return PrematchResult(matched=matched, unresolved=unresolved, candidates=candidates,
+                          scores=match_scores, flagged=flagged)
@@ -22,6 +22,17 @@ PROXY_URL = get_config("proxy.url", "")
 if PROXY_URL:
     os.environ["HTTP_PROXY"] = PROXY_URL
     os.environ["HTTPS_PROXY"] = PROXY_URL
+def _drop_unsupported_json_mode(request_params: dict, error: Exception) -> bool:
+    """
+    接口拒绝 JSON 模式时从请求参数中移除 response_format，返回 True 表示应立即以普通文本输出重试
+    （只发生一次，不计入重试次数）
+    """
+    if "response_format" in request_params and "response_format" in str(error):
+        request_params.pop("response_format")
+        return True
+    return False
+
+
 @dataclass
 class ChatResponse:
     """统一的返回结果对象"""
@@ -143,14 +154,22 @@ class LLMClient:
 
     # ==================== 统一接口 ====================
     
-    def generate(self, prompt: str, file_path: Union[str, List[str], None] = None) -> str:
+    def generate(self, prompt: str, file_path: Union[str, List[str], None] = None,
+                 response_schema: Optional[dict] = None) -> str:
         """
         统一生成接口（同步），自动根据 provider 调用对应方法
         
         注意: gemini_web 提供商需要使用 generate_async() 方法
+        
+        Args:
+            prompt: 提示词
+            file_path: 文件路径（单个或列表）
+            response_schema: 期望的 JSON 输出结构（OpenAPI 风格的 schema 字典，可选）。
+                gemini 使用原生结构化输出，openai/zhipu 使用 JSON 模式，
+                gemini_web 不支持，仍依赖提示词约束
         """
         if self.provider == "gemini":
-            return self.generate_with_gemini(prompt, file_path)
+            return self.generate_with_gemini(prompt, file_path, response_schema)
         elif self.provider == "gemini_web":
             # 对于 gemini_web，在同步环境中运行异步代码
             # 检查是否已有事件循环在运行
@@ -168,9 +187,9 @@ class LLMClient:
             else:
                 return asyncio.run(self.generate_async(prompt, file_path))
         elif self.provider == "openai":
-            return self.generate_with_openai(prompt, file_path)
+            return self.generate_with_openai(prompt, file_path, response_schema)
         elif self.provider == "zhipu":
-            return self.generate_with_zhipu(prompt, file_path)
+            return self.generate_with_zhipu(prompt, file_path, response_schema)
 
     async def generate_async(
         self, 
@@ -334,8 +353,9 @@ class LLMClient:
 
     # ==================== 其他提供商方法 (保持不变) ====================
 
-    def generate_with_gemini(self, prompt: str, file_path: Union[str, List[str], None] = None) -> str:
-        """使用 Gemini API 生成内容。"""
+    def generate_with_gemini(self, prompt: str, file_path: Union[str, List[str], None] = None,
+                             response_schema: Optional[dict] = None) -> str:
+        """使用 Gemini API 生成内容。提供 response_schema 时启用原生结构化 JSON 输出。"""
         file_paths = self._normalize_file_paths(file_path)
         
         for attempt in range(self.max_retries):
@@ -382,6 +402,8 @@ class LLMClient:
                 config = types.GenerateContentConfig(
                     temperature=self.temperature,
                     thinking_config=types.ThinkingConfig(thinking_budget=-1),
+                    **({"response_mime_type": "application/json", "response_schema": response_schema}
+                       if response_schema else {}),
                 )
 
                 try:
@@ -401,9 +423,11 @@ class LLMClient:
                     continue
                 return f"LLM Generation Error after {self.max_retries} attempts: {e}"
 
-    def generate_with_openai(self, prompt: str, file_path: Union[str, List[str], None] = None) -> str:
-        """使用标准 OpenAI 聊天接口生成内容，支持 OpenRouter。"""
+    def generate_with_openai(self, prompt: str, file_path: Union[str, List[str], None] = None,
+                             response_schema: Optional[dict] = None) -> str:
+        """使用标准 OpenAI 聊天接口生成内容，支持 OpenRouter。提供 response_schema 时启用 JSON 模式。"""
         from .pdf_to_markdown import convert_pdf_to_markdown
+        from .prompts import wrap_document_text
 
         file_paths = self._normalize_file_paths(file_path)
         content = [{"type": "text", "text": prompt}]
@@ -432,70 +456,84 @@ class LLMClient:
             elif file_ext == '.pdf':
                 try:
                     markdown_text = convert_pdf_to_markdown(fp)
-                    content[0]["text"] += f"\n\n--- [File: {os.path.basename(fp)} 内容开始] ---\n{markdown_text}\n--- [内容结束] ---"
+                    content[0]["text"] += wrap_document_text(os.path.basename(fp), markdown_text)
                 except Exception as e:
                     return f"Error parsing PDF {fp}: {e}"
             else:
                 return f"Error: OpenAI 接口暂不支持直接上传 {file_ext} 类型文件。"
 
-        for attempt in range(self.max_retries):
+        request_params = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": content}],
+            "temperature": self.temperature,
+        }
+        if response_schema:
+            request_params["response_format"] = {"type": "json_object"}
+        
+        attempt = 0
+        while True:
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": content}],
-                    temperature=self.temperature,
-                )
-                return response.choices[0].message.content
+                response = self.client.chat.completions.create(**request_params)
+                return response.choices[0].message.content or ""
             
             except Exception as e:
-                if attempt < self.max_retries - 1:
-                    time.sleep(2 ** attempt)
+                if _drop_unsupported_json_mode(request_params, e):
+                    continue
+                attempt += 1
+                if attempt < self.max_retries:
+                    time.sleep(2 ** (attempt - 1))
                     continue
                 return f"OpenAI Generation Error after {self.max_retries} attempts: {e}"
                 
-    def generate_with_zhipu(self, prompt: str, file_path: Union[str, List[str], None] = None) -> str:
-        """使用智谱AI API 生成内容，支持多模态输入。"""
+    def generate_with_zhipu(self, prompt: str, file_path: Union[str, List[str], None] = None,
+                            response_schema: Optional[dict] = None) -> str:
+        """使用智谱AI API 生成内容，支持多模态输入。提供 response_schema 时启用 JSON 模式。"""
         from .pdf_to_markdown import convert_pdf_to_markdown
+        from .prompts import wrap_document_text
 
         file_paths = self._normalize_file_paths(file_path)
         
-        for attempt in range(self.max_retries):
+        # 文件内容只在重试循环外准备一次，避免每次重试重复转换 PDF 和重复拼接提示词
+        content_parts = []
+        for fp in file_paths:
+            if not os.path.exists(fp):
+                return f"Error: File not found: {fp}"
+            
+            file_ext = os.path.splitext(fp)[1].lower()
+            
+            if file_ext in self.IMAGE_EXTENSIONS:
+                try:
+                    with open(fp, "rb") as f:
+                        file_data = base64.b64encode(f.read()).decode("utf-8")
+                except Exception as e:
+                    return f"Error encoding image {fp}: {e}"
+                content_parts.append({
+                    "type": "image_url",
+                    "image_url": {"url": file_data}
+                })
+            elif file_ext == '.pdf':
+                try:
+                    markdown_text = convert_pdf_to_markdown(fp)
+                    prompt += wrap_document_text(os.path.basename(fp), markdown_text)
+                except Exception as e:
+                    return f"Error parsing PDF {fp}: {e}"
+                           
+        content_parts.append({"type": "text", "text": prompt})
+        
+        request_params = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": content_parts}],
+            "temperature": self.temperature,
+            "stream": True,
+        }
+        if self.enable_thinking:
+            request_params["thinking"] = {"type": "enabled"}
+        if response_schema:
+            request_params["response_format"] = {"type": "json_object"}
+        
+        attempt = 0
+        while True:
             try:
-                content_parts = []
-                
-                for fp in file_paths:
-                    if not os.path.exists(fp):
-                        return f"Error: File not found: {fp}"
-                    
-                    file_ext = os.path.splitext(fp)[1].lower()
-                    
-                    if file_ext in self.IMAGE_EXTENSIONS:
-                        with open(fp, "rb") as f:
-                            file_data = base64.b64encode(f.read()).decode("utf-8")
-                        content_parts.append({
-                            "type": "image_url",
-                            "image_url": {"url": file_data}
-                        })
-                    elif file_ext == '.pdf':
-                        try:
-                            markdown_text = convert_pdf_to_markdown(fp)
-                            prompt += f"\n\n--- [File: {os.path.basename(fp)} 内容开始] ---\n{markdown_text}\n--- [内容结束] ---"
-                        except Exception as e:
-                            return f"Error parsing PDF {fp}: {e}"
-                                   
-                content_parts.append({"type": "text", "text": prompt})
-                
-                messages = [{"role": "user", "content": content_parts}]
-                request_params = {
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": self.temperature,
-                    "stream": True,
-                }
-                
-                if self.enable_thinking:
-                    request_params["thinking"] = {"type": "enabled"}
-                
                 response = self.client.chat.completions.create(**request_params)
                 
                 response_text = ""
@@ -511,8 +549,11 @@ class LLMClient:
                 return response_text
                     
             except Exception as e:
-                if attempt < self.max_retries - 1:
-                    time.sleep(2 ** attempt)
+                if _drop_unsupported_json_mode(request_params, e):
+                    continue
+                attempt += 1
+                if attempt < self.max_retries:
+                    time.sleep(2 ** (attempt - 1))
                     continue
                 return f"LLM Generation Error: {e}"
 
@@ -0,0 +1,163 @@
+# new_workflow/src/long_document.py
+"""
+长文献 Map-Reduce 总结模块
+将超出模型上下文的长文档切分为重叠片段，并发提取要点后合并为最终总结
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from .config_loader import get_config
+from .logger import logger
+from .prompts import get_window_prompt, get_reduce_prompt
+from .utils import DiskCache
+
+# 各 LLM 返回的错误文本前缀（包括智谱返回空响应时的提示）
+ERROR_PREFIXES = ("Error", "LLM Generation Error", "OpenAI Generation Error", "Warning: API返回空响应")
+
+
+def is_long_document_enabled() -> bool:
+    """是否启用长文献模式"""
+    return bool(get_config("summary.long_document.enabled", False))
+
+
+def needs_map_reduce(markdown_text: str) -> bool:
+    """判断文档长度是否超过长文献模式的阈值"""
+    threshold = get_config("summary.long_document.threshold_chars", 120000)
+    return len(markdown_text) > threshold
+
+
+def may_need_map_reduce(pages: int) -> bool:
+    """
+    按页数预判文档是否可能超过长文献阈值（无需转换 Markdown）
+
+    每页字符数按 max_chars_per_page 上限估计，页数不足以达到阈值的文档一定不是长文献
+    """
+    threshold = get_config("summary.long_document.threshold_chars", 120000)
+    max_chars_per_page = get_config("summary.long_document.max_chars_per_page", 6000)
+    return pages * max_chars_per_page > threshold
+
+
+def split_into_windows(text: str, window_chars: int, overlap_chars: int) -> List[str]:
+    """
+    将文本切分为带重叠的片段，尽量在段落边界处断开
+
+    Args:
+        text: 原始文本
+        window_chars: 每个片段的最大字符数
+        overlap_chars: 相邻片段的重叠字符数
+
+    Returns:
+        片段文本列表
+    """
+    if window_chars <= 0:
+        raise ValueError("window_chars 必须为正数")
+    overlap_chars = max(0, min(overlap_chars, window_chars // 2))
+
+    windows = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + window_chars, length)
+        if end < length:
+            # 在片段后半部分寻找最近的段落或行边界，避免切断句子
+            boundary = text.rfind("\n\n", start + window_chars // 2, end)
+            if boundary == -1:
+                boundary = text.rfind("\n", start + window_chars // 2, end)
+            if boundary != -1:
+                end = boundary
+        windows.append(text[start:end])
+        if end >= length:
+            break
+        start = max(end - overlap_chars, start + 1)
+    return windows
+
+
+def _cache_get(cache: DiskCache, key: str) -> Optional[str]:
+    value = cache.get(key)
+    return value if isinstance(value, str) else None
+
+
+def _cache_set(cache: DiskCache, key: str, text: str):
+    try:
+        cache.set(key, text)
+    except Exception as e:
+        logger.warning(f"写入片段缓存失败 ({key[:12]}): {e}")
+
+
+def _check_response(text: str, stage: str) -> str:
+    if not text or text.startswith(ERROR_PREFIXES):
+        raise RuntimeError(f"{stage}失败: {text[:200] if text else '空响应'}")
+    return text
+
+
+def summarize_long_document(markdown_text: str, prompt_text: str, file_name: str,
+                            client_factory: Callable[[], object],
+                            model_id: str = "") -> dict:
+    """
+    对长文档执行 Map-Reduce 总结
+
+    Args:
+        markdown_text: 文档的 Markdown 全文
+        prompt_text: 文献总结提示词（由 get_summary_prompt 生成）
+        file_name: 文件名（用于日志）
+        client_factory: 创建 LLMClient 的无参函数，每个工作线程各自创建一个实例
+        model_id: 模型标识（provider/model），参与缓存键计算
+
+    Returns:
+        dict: {"summary": 最终总结, "window_count": 片段数, "cached_windows": 命中缓存的片段数}
+
+    Raises:
+        RuntimeError: 任一片段或合并阶段失败时抛出（已成功的片段会保留在缓存中）
+    """
+    window_chars = get_config("summary.long_document.window_chars", 40000)
+    overlap_chars = get_config("summary.long_document.overlap_chars", 2000)
+    max_workers = get_config("summary.long_document.max_workers", 3)
+    cache = DiskCache(get_config("paths.window_cache", "new_workflow/cache/windows"))
+
+    windows = split_into_windows(markdown_text, window_chars, overlap_chars)
+    total = len(windows)
+    logger.info(f"[长文献] {file_name}: {len(markdown_text)} 字符，切分为 {total} 个片段")
+
+    # 每个工作线程复用同一个客户端，避免每个片段重复初始化
+    local = threading.local()
+
+    def _get_client():
+        if getattr(local, "client", None) is None:
+            local.client = client_factory()
+        return local.client
+
+    keys = [cache.make_key("window", model_id, prompt_text, w) for w in windows]
+    notes: List[Optional[str]] = [_cache_get(cache, k) for k in keys]
+    pending = [i for i, note in enumerate(notes) if note is None]
+    cached_count = total - len(pending)
+    if cached_count:
+        logger.info(f"[长文献] {file_name}: {cached_count}/{total} 个片段命中缓存")
+
+    def _summarize_window(i: int) -> str:
+        prompt = get_window_prompt(prompt_text, windows[i], i + 1, total)
+        note = _check_response(_get_client().generate(prompt=prompt), f"片段 {i + 1}/{total} ")
+        _cache_set(cache, keys[i], note)
+        return note
+
+    if pending:
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+            futures = {executor.submit(_summarize_window, i): i for i in pending}
+            for future, i in futures.items():
+                try:
+                    notes[i] = future.result()
+                except Exception as e:
+                    errors.append(str(e))
+        if errors:
+            raise RuntimeError(f"{len(errors)}/{total} 个片段处理失败: {errors[0]}")
+
+    reduce_key = cache.make_key("reduce", model_id, prompt_text, *notes)
+    summary = _cache_get(cache, reduce_key)
+    if summary is None:
+        summary = _check_response(
+            _get_client().generate(prompt=get_reduce_prompt(prompt_text, notes)), "合并阶段"
+        )
+        _cache_set(cache, reduce_key, summary)
+
+    return {"summary": summary, "window_count": total, "cached_windows": cached_count}
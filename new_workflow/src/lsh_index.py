@@ -0,0 +1,212 @@
+# new_workflow/src/lsh_index.py
+"""
+MinHash/LSH 参考文献候选索引
+对参考文献的标题和作者计算 MinHash 签名并按分段建立 LSH 桶，
+可在数万条参考文献中为每个 PDF 快速召回 top-k 候选；索引持久化到磁盘，
+参考文献文件变化时只为新增条目计算签名
+"""
+import json
+import os
+import zlib
+from typing import Dict, List, Optional, Sequence, Set
+
+from .fuzzy_matcher import char_ngrams, match_key, reference_hash
+from .logger import logger
+from .utils import atomic_write_json
+
+try:
+    import numpy as np  # optional
+    _HAS_NUMPY = True
+except Exception:
+    _HAS_NUMPY = False
+
+# 大于 2^32 的素数，MinHash 置换 (a * x + b) mod P
+_PRIME = 4294967311
+_SEED = 20240501
+# 索引格式或签名算法变化时递增，使旧索引失效
+_INDEX_VERSION = 1
+
+
+def lsh_available() -> bool:
+    """LSH 索引依赖 NumPy"""
+    return _HAS_NUMPY
+
+
+def record_shingles(record) -> Set[str]:
+    """参考文献记录的特征集合：标题和作者的字符 3-gram（未解析出标题时使用整条文本）"""
+    title = record.title if record.style != "other" and record.title else record.raw
+    return char_ngrams(match_key(title)) | char_ngrams(match_key(''.join(record.authors)))
+
+
+def query_shingles(title: str, authors: Sequence[str] = ()) -> Set[str]:
+    """PDF 检索信息的特征集合（与 record_shingles 一致）"""
+    return char_ngrams(match_key(title)) | char_ngrams(match_key(''.join(authors)))
+
+
+class MinHashLSHIndex:
+    """
+    MinHash/LSH 索引
+
+    签名长度 = bands × rows；两条文本在任一分段上签名完全相同即成为候选，
+    Jaccard 相似度为 s 时被召回的概率为 1 - (1 - s^rows)^bands
+    """
+
+    def __init__(self, bands: int = 32, rows: int = 2):
+        if not _HAS_NUMPY:
+            raise RuntimeError("MinHash/LSH 索引需要安装 numpy")
+        self.bands = bands
+        self.rows = rows
+        self.num_perm = bands * rows
+        rng = np.random.RandomState(_SEED)
+        # a < 2^31、x < 2^32，保证 a * x + b 不超出 uint64
+        self._a = rng.randint(1, 2 ** 31 - 1, size=self.num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31 - 1, size=self.num_perm, dtype=np.int64).astype(np.uint64)
+
+        self.references: List[str] = []
+        self.hashes: List[str] = []
+        self.signatures = np.zeros((0, self.num_perm), dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[int]]] = []
+
+    def signature(self, shingles: Set[str]) -> "np.ndarray":
+        """计算特征集合的 MinHash 签名（空集合返回全最大值）"""
+        if not shingles:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                        dtype=np.uint64, count=len(shingles))
+        return ((self._a[:, None] * x[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def _band_keys(self, signature: "np.ndarray") -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _rebuild_buckets(self):
+        self._buckets = [{} for _ in range(self.bands)]
+        for idx, signature in enumerate(self.signatures):
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, []).append(idx)
+
+    def update(self, references: List[str], records: List) -> int:
+        """
+        按新的参考文献列表更新索引：已有条目复用签名，只为新增条目计算签名
+
+        Args:
+            references: 参考文献列表（已去除编号）
+            records: 与 references 一一对应的结构化记录
+
+        Returns:
+            新计算签名的条目数
+        """
+        existing = {h: i for i, h in enumerate(self.hashes)}
+        hashes = [reference_hash(ref) for ref in references]
+        signatures = np.empty((len(references), self.num_perm), dtype=np.uint64)
+        computed = 0
+        for i, (ref_hash, record) in enumerate(zip(hashes, records)):
+            old = existing.get(ref_hash)
+            if old is not None:
+                signatures[i] = self.signatures[old]
+            else:
+                signatures[i] = self.signature(record_shingles(record))
+                computed += 1
+        self.references = list(references)
+        self.hashes = hashes
+        self.signatures = signatures
+        self._rebuild_buckets()
+        return computed
+
+    def query(self, shingles: Set[str], k: int = 20) -> List[int]:
+        """
+        召回与特征集合最相似的 top-k 参考文献
+
+        Args:
+            shingles: 查询的特征集合（见 query_shingles）
+            k: 返回数量
+
+        Returns:
+            参考文献序号列表，按估计的 Jaccard 相似度降序
+        """
+        if not shingles or not self.references:
+            return []
+        signature = self.signature(shingles)
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        if not candidates:
+            return []
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self.signatures[ids] == signature).mean(axis=1)
+        if len(ids) > k:
+            top = np.argpartition(-similarity, k - 1)[:k]
+            ids, similarity = ids[top], similarity[top]
+        order = np.lexsort((ids, -similarity))
+        return ids[order].tolist()
+
+    def save(self, index_dir: str):
+        """将签名保存为 npz，参考文献列表和参数保存为 json"""
+        os.makedirs(index_dir, exist_ok=True)
+        tmp_path = os.path.join(index_dir, f"signatures.{os.getpid()}.tmp.npz")
+        np.savez_compressed(tmp_path, signatures=self.signatures)
+        os.replace(tmp_path, os.path.join(index_dir, "signatures.npz"))
+        atomic_write_json(os.path.join(index_dir, "index.json"), {
+            "version": _INDEX_VERSION,
+            "bands": self.bands,
+            "rows": self.rows,
+            "hashes": self.hashes,
+            "references": self.references,
+        }, indent=None)
+
+    @classmethod
+    def load(cls, index_dir: str, bands: int = 32, rows: int = 2) -> "MinHashLSHIndex":
+        """从磁盘加载索引；不存在、损坏或参数不一致时返回空索引"""
+        index = cls(bands=bands, rows=rows)
+        meta_path = os.path.join(index_dir, "index.json")
+        npz_path = os.path.join(index_dir, "signatures.npz")
+        if not (os.path.exists(meta_path) and os.path.exists(npz_path)):
+            return index
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if (meta.get("version"), meta.get("bands"), meta.get("rows")) != (_INDEX_VERSION, bands, rows):
+                logger.info("LSH 索引参数已变化，将重新构建")
+                return index
+            with np.load(npz_path) as data:
+                signatures = data["signatures"]
+            if signatures.shape != (len(meta["hashes"]), index.num_perm):
+                raise ValueError("签名数量与参考文献数量不一致")
+            index.references = meta["references"]
+            index.hashes = meta["hashes"]
+            index.signatures = signatures
+        except Exception as e:
+            logger.warning(f"读取 LSH 索引失败，将重新构建: {e}")
+        return index
+
+
+def load_or_update_lsh_index(references: List[str], records: List, index_dir: str,
+                             bands: int = 32, rows: int = 2) -> Optional[MinHashLSHIndex]:
+    """
+    加载磁盘上的 LSH 索引并按当前参考文献列表增量更新
+
+    Args:
+        references: 参考文献列表（已去除编号）
+        records: 与 references 一一对应的结构化记录
+        index_dir: 索引目录
+        bands: LSH 分段数
+        rows: 每段的签名行数
+
+    Returns:
+        更新后的索引；未安装 NumPy 时返回 None
+    """
+    if not _HAS_NUMPY:
+        logger.warning("未安装 numpy，无法使用 LSH 候选索引")
+        return None
+    index = MinHashLSHIndex.load(index_dir, bands=bands, rows=rows)
+    unchanged = index.hashes == [reference_hash(ref) for ref in references]
+    if unchanged:
+        index.references = list(references)
+        index._rebuild_buckets()
+        return index
+    computed = index.update(references, records)
+    logger.info(f"LSH 索引已更新: {len(references)} 条参考文献, 新计算 {computed} 条签名")
+    try:
+        index.save(index_dir)
+    except Exception as e:
+        logger.warning(f"保存 LSH 索引失败: {e}")
+    return index
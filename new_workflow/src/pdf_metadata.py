@@ -0,0 +1,303 @@
+# new_workflow/src/pdf_metadata.py
+"""
+PDF 元数据提取模块
+从 PDF 文档信息字典、XMP 元数据和首页文本中提取标题、作者、年份和 DOI，
+按文件内容哈希保存到元数据索引，使文件名不含有效信息的 PDF 也能参与匹配
+"""
+import codecs
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+from .config_loader import get_config
+from .logger import logger
+from .pdf_to_markdown import load_cached_markdown
+from .utils import atomic_write_json, contains_cjk, file_sha1
+
+try:
+    from pdfminer.high_level import extract_text as _pdfminer_extract_text  # optional
+    _HAS_PDFMINER = True
+except Exception:
+    _HAS_PDFMINER = False
+
+# 提取规则变化时递增，使旧索引条目失效
+_EXTRACTOR_VERSION = 1
+# 只分析首页附近的文本
+_FIRST_PAGE_CHARS = 4000
+
+_DOI_TEXT = re.compile(r'\b(10\.\d{4,9}/[^\s"<>，。；;]+)', re.IGNORECASE)
+_YEAR = re.compile(r'(?<!\d)((?:19|20)\d{2})(?!\d)')
+_INFO_LITERAL = rb'/%s\s*\(((?:\\.|[^\\)])*)\)'
+_INFO_HEX = rb'/%s\s*<([0-9A-Fa-f\s]+)>'
+_XMP_TITLE = re.compile(rb'<dc:title>.*?<rdf:li[^>]*>(.*?)</rdf:li>', re.S)
+_XMP_CREATORS = re.compile(rb'<dc:creator>(.*?)</dc:creator>', re.S)
+_XMP_LI = re.compile(rb'<rdf:li[^>]*>(.*?)</rdf:li>', re.S)
+_XMP_DOI = re.compile(rb'<(?:prism:doi|pdfx:doi|crossmark:DOI)>\s*(10\.[^<\s]+)\s*<', re.IGNORECASE)
+# 无意义的文档信息标题（如由 Word 自动生成）
+_JUNK_TITLE = re.compile(r'(^microsoft\s+word|\.docx?$|\.pdf$|^untitled|^pii:|^doi:|^\s*$)', re.IGNORECASE)
+# 首页中不是标题的行：期刊页眉、版权、网址、卷期信息等
+_HEADER_LINE = re.compile(
+    r'(https?://|www\.|doi|issn|vol\.|volume|no\.|©|copyright|journal|received|accepted|published|'
+    r'downloaded|available online|第\s*\d+\s*卷|第\s*\d+\s*期|学报|\d{4}\s*年|收稿日期|文章编号|中图分类号)',
+    re.IGNORECASE)
+_ABSTRACT_LINE = re.compile(r'^\s*(abstract|摘\s*要|关键词|keywords|jel|一、|1\.?\s+introduction|引言)', re.IGNORECASE)
+_AFFILIATION = re.compile(r'(universit|department|school|institute|college|corporation|center|centre|'
+                          r'大学|学院|研究所|研究院|中心|公司|邮编|\d{6})', re.IGNORECASE)
+
+
+@dataclass
+class PdfMetadata:
+    """从 PDF 中提取的元数据"""
+    title: str = ""
+    authors: List[str] = field(default_factory=list)
+    year: Optional[str] = None
+    doi: Optional[str] = None
+    source: str = ""                        # 标题来源：info / xmp / first_page
+
+
+def _decode_pdf_string(raw: bytes, is_hex: bool = False) -> str:
+    """解码 PDF 字符串（字面量或十六进制，支持 UTF-16BE 与 PDFDocEncoding 近似）"""
+    if is_hex:
+        raw = bytes.fromhex(re.sub(rb'\s+', b'', raw).decode('ascii').ljust(2, '0'))
+    else:
+        raw = re.sub(rb'\\([0-7]{1,3})', lambda m: bytes([int(m.group(1), 8) & 0xFF]), raw)
+        raw = re.sub(rb'\\(.)', lambda m: {b'n': b'\n', b'r': b'\r', b't': b'\t'}.get(m.group(1), m.group(1)), raw)
+    if raw.startswith(codecs.BOM_UTF16_BE):
+        return raw[2:].decode('utf-16-be', errors='ignore').strip()
+    if raw.startswith(codecs.BOM_UTF8):
+        return raw[3:].decode('utf-8', errors='ignore').strip()
+    try:
+        return raw.decode('utf-8').strip()
+    except UnicodeDecodeError:
+        return raw.decode('latin-1').strip()
+
+
+def _info_field(data: bytes, name: bytes) -> str:
+    match = re.search(_INFO_LITERAL % name, data)
+    if match:
+        return _decode_pdf_string(match.group(1))
+    match = re.search(_INFO_HEX % name, data)
+    if match:
+        return _decode_pdf_string(match.group(1), is_hex=True)
+    return ""
+
+
+def _xml_text(raw: bytes) -> str:
+    text = raw.decode('utf-8', errors='ignore')
+    return re.sub(r'<[^>]+>', '', text).replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>').strip()
+
+
+def _split_author_field(text: str) -> List[str]:
+    return [a.strip() for a in re.split(r'\s*(?:;|；|,|，|、|&|\band\b)\s*', text) if a.strip()]
+
+
+def read_document_info(pdf_path: str) -> PdfMetadata:
+    """
+    读取 PDF 文档信息字典与 XMP 元数据（无需第三方依赖，只能读取未压缩的对象）
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        PdfMetadata: 提取到的字段（无意义的标题会被忽略）
+    """
+    meta = PdfMetadata()
+    try:
+        with open(pdf_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return meta
+
+    xmp_title = _XMP_TITLE.search(data)
+    title = _xml_text(xmp_title.group(1)) if xmp_title else ""
+    source = "xmp" if title else ""
+    if not title:
+        title, source = _info_field(data, b"Title"), "info"
+    if title and not _JUNK_TITLE.search(title) and len(title) >= 8:
+        meta.title, meta.source = title, source
+
+    creators = _XMP_CREATORS.search(data)
+    if creators:
+        meta.authors = [_xml_text(li) for li in _XMP_LI.findall(creators.group(1)) if _xml_text(li)]
+    if not meta.authors:
+        meta.authors = _split_author_field(_info_field(data, b"Author"))
+
+    # 只信任元数据中的 DOI；正文链接中的 DOI 多为被引文献
+    doi = _XMP_DOI.search(data)
+    info_doi = _info_field(data, b"doi") or _info_field(data, b"DOI")
+    if doi:
+        meta.doi = doi.group(1).decode('ascii', errors='ignore').rstrip('.').lower()
+    elif info_doi.lower().startswith(("10.", "doi:10.")):
+        meta.doi = info_doi.lower().replace("doi:", "").strip().rstrip('.')
+
+    created = re.match(r'(?:D:)?((?:19|20)\d{2})', _info_field(data, b"CreationDate"))
+    meta.year = created.group(1) if created else None
+    return meta
+
+
+def _first_page_text(pdf_path: str) -> str:
+    """首页文本：优先使用 Markdown 缓存，其次用 pdfminer 只解析第一页（不调用大模型）"""
+    try:
+        cached = load_cached_markdown(pdf_path)
+    except Exception:
+        cached = None
+    if cached:
+        return cached[:_FIRST_PAGE_CHARS]
+    if _HAS_PDFMINER:
+        try:
+            return (_pdfminer_extract_text(pdf_path, maxpages=1) or "")[:_FIRST_PAGE_CHARS]
+        except Exception as e:
+            logger.debug(f"pdfminer 解析首页失败 ({os.path.basename(pdf_path)}): {e}")
+    return ""
+
+
+def _normalize_author(name: str) -> str:
+    """去除姓名后的上标、编号；中文姓名去掉字间空格（如“张 涛”），英文姓名合并多余空白"""
+    name = re.sub(r'[\d*∗†‡§¹²³,]+$', '', name.strip())
+    if contains_cjk(name):
+        return re.sub(r'\s+', '', name)
+    return re.sub(r'\s+', ' ', name)
+
+
+def _looks_like_names(line: str) -> bool:
+    """作者行：不含单位、页眉信息，且每个名字都较短"""
+    if _AFFILIATION.search(line) or _HEADER_LINE.search(line) or re.search(r'[。.:：]$', line):
+        return False
+    names = _split_author_field(line)
+    return bool(names) and all(len(n) <= 40 and len(n.split()) <= 5 for n in names)
+
+
+def parse_first_page(text: str) -> PdfMetadata:
+    """
+    从首页文本中解析标题、作者、年份和 DOI
+
+    标题取跳过页眉后的第一个文本块，作者取其后、摘要之前不像单位地址的短行；
+    年份只取 DOI、版权或出版信息中的年份，避免误取正文中被引文献的年份
+
+    Args:
+        text: 首页文本（Markdown 或纯文本）
+
+    Returns:
+        PdfMetadata: 解析结果
+    """
+    meta = PdfMetadata(source="first_page")
+    doi = _DOI_TEXT.search(text)
+    if doi:
+        meta.doi = doi.group(1).rstrip('.').lower()
+
+    blocks = [[re.sub(r'^#+\s*', '', line).strip() for line in b.strip().splitlines() if line.strip()]
+              for b in re.split(r'\n\s*\n', text) if b.strip()]
+    index = 0
+    while index < len(blocks) and (_HEADER_LINE.search(' '.join(blocks[index]))
+                                   or len(' '.join(blocks[index])) < 6):
+        index += 1
+    if index < len(blocks):
+        title = re.sub(r'\s+', ' ', ' '.join(blocks[index])).strip(' *')
+        if len(title) <= 250 and not _ABSTRACT_LINE.match(title):
+            meta.title = title
+            for block in blocks[index + 1:index + 10]:
+                if _ABSTRACT_LINE.match(block[0]) or len(' '.join(block)) > 300:
+                    break
+                for line in block:
+                    if _looks_like_names(line):
+                        meta.authors.extend(_normalize_author(n) for n in _split_author_field(line)
+                                            if len(_normalize_author(n)) > 1)
+
+    year_match = _YEAR.search(meta.doi or "")
+    if not year_match:
+        for line in text.splitlines():
+            if re.search(r'(©|copyright|published|received|accepted|（\s*(19|20)\d{2}\s*）|\d{4}\s*年)', line,
+                         re.IGNORECASE):
+                year_match = _YEAR.search(line)
+                if year_match:
+                    break
+    meta.year = year_match.group(1) if year_match else None
+    return meta
+
+
+def extract_pdf_metadata(pdf_path: str) -> PdfMetadata:
+    """
+    提取单个 PDF 的元数据：标题优先取文档信息/XMP 中有意义的标题，否则取首页解析结果；
+    作者、年份、DOI 依次从各来源补全
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        PdfMetadata: 合并后的元数据
+    """
+    info = read_document_info(pdf_path)
+    page = parse_first_page(_first_page_text(pdf_path))
+    meta = PdfMetadata(
+        title=info.title or page.title,
+        authors=info.authors or page.authors,
+        year=page.year or info.year,
+        doi=info.doi or page.doi,
+        source=info.source if info.title else (page.source if page.title else ""),
+    )
+    return meta
+
+
+def _metadata_index_path() -> str:
+    return get_config("paths.pdf_metadata_index", "new_workflow/cache/pdf_metadata.json")
+
+
+def load_pdf_metadata(pdf_files: List[str], hashes: Optional[Dict[str, str]] = None) -> Dict[str, PdfMetadata]:
+    """
+    获取一批 PDF 的元数据：按文件内容哈希查询元数据索引，未命中的文件并发提取后写回索引
+
+    Args:
+        pdf_files: PDF文件路径列表
+        hashes: 已知的 文件名 -> SHA-1（可选，避免重复计算哈希）
+
+    Returns:
+        文件名到元数据的映射
+    """
+    index_path = _metadata_index_path()
+    index = {}
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == _EXTRACTOR_VERSION:
+                index = data.get("entries", {})
+        except Exception as e:
+            logger.warning(f"读取PDF元数据索引失败，将重新提取: {e}")
+
+    hashes = dict(hashes or {})
+    paths = {}
+    for path in pdf_files:
+        name = os.path.basename(path)
+        paths[name] = path
+        if not hashes.get(name):
+            try:
+                hashes[name] = file_sha1(path)
+            except OSError:
+                continue
+
+    missing = sorted({hashes[name] for name in paths if name in hashes and hashes[name] not in index})
+    if missing:
+        by_hash = {hashes[name]: paths[name] for name in paths if name in hashes}
+        max_workers = max(1, get_config("concurrency.max_workers", 3))
+        logger.info(f"提取PDF元数据: {len(missing)} 个文件, 并发数 {max_workers}")
+
+        def _extract(sha1: str):
+            try:
+                return sha1, asdict(extract_pdf_metadata(by_hash[sha1]))
+            except Exception as e:
+                logger.warning(f"提取PDF元数据失败 ({os.path.basename(by_hash[sha1])}): {e}")
+                return sha1, asdict(PdfMetadata())
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+            for sha1, entry in executor.map(_extract, missing):
+                index[sha1] = entry
+        try:
+            atomic_write_json(index_path, {"version": _EXTRACTOR_VERSION, "entries": index}, indent=None)
+        except Exception as e:
+            logger.warning(f"保存PDF元数据索引失败: {e}")
+
+    return {name: PdfMetadata(**index[hashes[name]]) for name in paths
+            if name in hashes and hashes[name] in index}
@@ -1,8 +1,26 @@
 # new_workflow/src/pdf_processor.py
 """PDF文件处理模块"""
 import os
+import re
 import glob
-from typing import List
+from typing import List, Optional
+
+try:
+    from pdfminer.pdfdocument import PDFDocument  # optional
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+    _HAS_PDFMINER = True
+except Exception:
+    _HAS_PDFMINER = False
+
+# 匹配页面对象（排除页面树节点 /Pages）；空白长度有上限，保证分块扫描时匹配长度有界
+_PAGE_PATTERN = re.compile(rb"/Type\s{0,8}/Page(?![a-zA-Z])")
+# 分块扫描时相邻块之间保留的字节数（大于最长匹配加上前瞻的一个字节）
+_SCAN_OVERLAP = 32
+# 无法解析页数时，按文件大小估算（平均每页字节数）
+_BYTES_PER_PAGE_ESTIMATE = 100 * 1024
+# 回退扫描页面对象时每次读取的字节数
+_SCAN_CHUNK_SIZE = 1024 * 1024
 
 def get_pdf_files(pdf_folder_path: str) -> List[str]:
     """
@@ -21,6 +39,62 @@ def get_pdf_files(pdf_folder_path: str) -> List[str]:
         pdf_files = glob.glob(pattern, recursive=True)
     return pdf_files
 
+def _page_count_from_catalog(f) -> Optional[int]:
+    """用 pdfminer 读取页面树根节点的 /Count（只解析交叉引用和少数几个对象）"""
+    document = PDFDocument(PDFParser(f))
+    pages = resolve1(document.catalog.get("Pages"))
+    count = resolve1(pages.get("Count")) if isinstance(pages, dict) else None
+    return count if isinstance(count, int) and count > 0 else None
+
+
+def _scan_page_objects(f, chunk_size: int = _SCAN_CHUNK_SIZE) -> int:
+    """分块扫描未压缩的页面对象计数（内存占用与文件大小无关）"""
+    count = 0
+    tail = b""
+    while True:
+        chunk = f.read(chunk_size)
+        data = tail + chunk
+        if not chunk:
+            # 文件结束：保留段中剩余的匹配全部计入
+            return count + len(_PAGE_PATTERN.findall(data))
+        # 起点落在保留段之前的匹配已完整位于本块内（包括前瞻字节），其余留给下一块
+        cutoff = max(0, len(data) - _SCAN_OVERLAP)
+        count += sum(1 for m in _PAGE_PATTERN.finditer(data) if m.start() < cutoff)
+        tail = data[cutoff:]
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """
+    统计PDF页数
+    
+    安装 pdfminer 时从交叉引用定位页面树根节点并读取其 /Count；未安装或解析失败时
+    分块扫描页面对象计数（对象流压缩的 PDF 可能扫描不到），仍无法计数时按文件大小估算
+    
+    Args:
+        pdf_path: PDF文件路径
+        
+    Returns:
+        页数（至少为1）
+    """
+    try:
+        size = os.path.getsize(pdf_path)
+        with open(pdf_path, "rb") as f:
+            count = None
+            if _HAS_PDFMINER:
+                try:
+                    count = _page_count_from_catalog(f)
+                except Exception:
+                    # 损坏、加密或结构异常的 PDF（包括递归引用）一律回退到扫描
+                    count = None
+            if not count:
+                f.seek(0)
+                count = _scan_page_objects(f)
+    except OSError:
+        return 1
+    if count == 0:
+        count = size // _BYTES_PER_PAGE_ESTIMATE
+    return max(1, count)
+
 if __name__ == "__main__":
     # 测试代码
     test_folder = "new_workflow/pdfs_zsk"
@@ -4,11 +4,112 @@ PDF转Markdown模块
 支持普通PDF和扫描件PDF的转换
 """
 import os
-from typing import Optional, Tuple
+import re
+import shutil
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
 from .llm_client import LLMClient
 from .logger import logger
 
 
+def get_markdown_cache_path(pdf_path: str) -> str:
+    """
+    获取PDF对应的Markdown缓存文件路径
+    
+    简单的缓存策略：使用 basename.md。更好的做法是 hash 文件内容，但为了性能暂时只用文件名
+    """
+    from .config_loader import get_config
+    cache_dir = get_config("paths.markdown_cache", "new_workflow/cache/markdowns")
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(cache_dir, f"{base_name}.md")
+
+
+def load_cached_markdown(pdf_path: str) -> Optional[str]:
+    """
+    读取PDF对应的Markdown缓存（仅当缓存比PDF新时有效）
+    
+    Returns:
+        缓存的Markdown文本，不存在或已过期时返回None
+    """
+    cache_path = get_markdown_cache_path(pdf_path)
+    if not os.path.exists(cache_path):
+        return None
+    # 检查缓存是否比PDF新
+    if os.path.getmtime(cache_path) <= os.path.getmtime(pdf_path):
+        return None
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+_MARKITDOWN_UNSET = object()
+_markitdown_class = _MARKITDOWN_UNSET
+_markitdown_import_lock = threading.Lock()
+
+
+def _get_markitdown_class():
+    """导入 markitdown（进程内只导入一次），未安装时返回 None"""
+    global _markitdown_class
+    if _markitdown_class is _MARKITDOWN_UNSET:
+        with _markitdown_import_lock:
+            if _markitdown_class is _MARKITDOWN_UNSET:
+                try:
+                    from markitdown import MarkItDown
+                    _markitdown_class = MarkItDown
+                except ImportError:
+                    logger.warning("markitdown 未安装，将仅使用LLM处理。提示: pip install markitdown[pdf]")
+                    _markitdown_class = None
+    return _markitdown_class
+
+
+# 参考文献章节标题
+_REFERENCES_HEADING = re.compile(r'^\s*(#+\s*)?(\*\*)?\s*(references|bibliography|参考文献)\s*(\*\*)?\s*:?\s*$',
+                                 re.IGNORECASE)
+# 仅包含页码的行
+_PAGE_NUMBER_LINE = re.compile(r'^\s*(-\s*)?\d{1,4}(\s*-)?\s*$')
+
+
+def compact_markdown(text: str, drop_references: bool = True) -> str:
+    """
+    压缩Markdown文本以减少发送给LLM的Token
+    
+    - 删除仅包含页码的行和重复出现的页眉页脚
+    - 合并多余的空白和空行
+    - 可选：删除文末的参考文献章节
+    
+    Args:
+        text: Markdown文本
+        drop_references: 是否删除文末的参考文献章节
+        
+    Returns:
+        str: 压缩后的文本
+    """
+    lines = [line.rstrip() for line in text.replace('\r\n', '\n').split('\n')]
+    
+    # 识别页眉页脚：多次重复出现的短行
+    counts = Counter(line.strip() for line in lines if line.strip() and len(line.strip()) < 80)
+    repeated = {line for line, count in counts.items() if count >= 3 and not line.startswith('|')}
+    
+    if drop_references:
+        # 仅在文档后半部分查找参考文献标题，避免误删正文中的同名章节
+        for i in range(len(lines) - 1, len(lines) // 2, -1):
+            if _REFERENCES_HEADING.match(lines[i]):
+                lines = lines[:i]
+                break
+    
+    kept = []
+    for line in lines:
+        stripped = line.strip()
+        if _PAGE_NUMBER_LINE.match(line) or stripped in repeated:
+            continue
+        # 保留行首缩进（列表层级），仅合并行内多余空白
+        body = line.lstrip()
+        kept.append(line[:len(line) - len(body)] + re.sub(r'[ \t]{2,}', ' ', body))
+    
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(kept)).strip()
+
+
 class PDFToMarkdownConverter:
     """
     PDF转Markdown转换器
@@ -25,19 +126,15 @@ class PDFToMarkdownConverter:
         
         Args:
             llm_client: LLM客户端实例，用于处理扫描件PDF
-                       如果为None，将使用默认配置创建
+                       如果为None，将在首次需要LLM处理时使用默认配置创建
         """
-        # 尝试导入 markitdown
-        self.markitdown_available = False
-        try:
-            from markitdown import MarkItDown
-            self.markitdown = MarkItDown()
-            self.markitdown_available = True
-        except ImportError:
-            logger.warning("markitdown 未安装，将仅使用LLM处理。提示: pip install markitdown[pdf]")
-            self.markitdown = None
+        # 尝试导入 markitdown（每个工作线程持有各自的 MarkItDown 实例，首次使用时创建）
+        self._markitdown_class = _get_markitdown_class()
+        self.markitdown_available = self._markitdown_class is not None
+        self._local = threading.local()
         
-        self.llm_client = llm_client or LLMClient(provider="gemini", model="gemini-flash-lite-latest")
+        self._llm_client = llm_client
+        self._llm_lock = threading.Lock()
         
         # 用于识别扫描件的提示词
         self.ocr_prompt = """请提取这个PDF文档中的所有文本内容，并以Markdown格式输出。
@@ -55,6 +152,26 @@ class PDFToMarkdownConverter:
 
 请开始提取："""
     
+    @property
+    def markitdown(self):
+        """当前线程的 MarkItDown 实例（按线程懒加载并复用）"""
+        if not self.markitdown_available:
+            return None
+        instance = getattr(self._local, "markitdown", None)
+        if instance is None:
+            instance = self._markitdown_class()
+            self._local.markitdown = instance
+        return instance
+    
+    @property
+    def llm_client(self) -> LLMClient:
+        """用于扫描件的LLM客户端，仅在首次需要时创建"""
+        if self._llm_client is None:
+            with self._llm_lock:
+                if self._llm_client is None:
+                    self._llm_client = LLMClient(provider="gemini", model="gemini-flash-lite-latest")
+        return self._llm_client
+    
     def convert(self, pdf_path: str, force_llm: bool = False, force_refresh: bool = False) -> Tuple[str, str]:
         """
         将PDF转换为Markdown格式
@@ -75,20 +192,15 @@ class PDFToMarkdownConverter:
             raise ValueError(f"文件不是PDF格式: {pdf_path}")
             
         # 1. 检查缓存
-        from .config_loader import get_config
-        cache_dir = get_config("paths.markdown_cache", "new_workflow/cache/markdowns")
-        # 简单的缓存策略：md5(filepath) or basename.md. 这里简单使用 basename
-        # 更好的做法是 hash 文件内容，但为了性能暂时只用文件名
-        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        cache_path = os.path.join(cache_dir, f"{base_name}.md")
+        cache_path = get_markdown_cache_path(pdf_path)
+        cache_dir = os.path.dirname(cache_path)
         
-        if not force_refresh and os.path.exists(cache_path):
+        if not force_refresh:
             try:
-                # 检查缓存是否比PDF新
-                if os.path.getmtime(cache_path) > os.path.getmtime(pdf_path):
+                cached_text = load_cached_markdown(pdf_path)
+                if cached_text is not None:
                     logger.info(f"[Cache] 命中缓存: {os.path.basename(cache_path)}")
-                    with open(cache_path, 'r', encoding='utf-8') as f:
-                        return f.read(), "cache"
+                    return cached_text, "cache"
             except Exception as e:
                 logger.warning(f"读取缓存失败: {e}, 将重新转换")
         
@@ -201,6 +313,8 @@ class PDFToMarkdownConverter:
         """
         批量转换多个PDF文件 (并发版)
         
+        注意：返回值会在内存中保留所有文档的全文，大批量转换请使用 iter_convert
+        
         Args:
             pdf_paths: PDF文件路径列表
             force_llm: 是否强制使用LLM处理
@@ -247,6 +361,73 @@ class PDFToMarkdownConverter:
         
         return results
     
+    def iter_convert(self, pdf_paths: Iterable[str], force_llm: bool = False,
+                     output_folder: Optional[str] = None,
+                     convert: Optional[Callable[..., Tuple[str, str]]] = None
+                     ) -> Iterator[Tuple[str, Optional[str], bool, Optional[str]]]:
+        """
+        流式批量转换：按完成顺序逐个产出结果，文本直接写入缓存/输出目录，不在内存中累积
+        
+        同时在途的任务数不超过并发数的两倍，因此内存占用与文献总数无关
+        
+        Args:
+            pdf_paths: PDF文件路径（可以是生成器）
+            force_llm: 是否强制使用LLM处理
+            output_folder: 输出文件夹（可选）；为 None 时只写入 Markdown 缓存
+            convert: 单个文件的转换函数（默认 self.convert；ConverterService 传入带单飞保护的版本）
+            
+        Yields:
+            Tuple[str, Optional[str], bool, Optional[str]]: (PDF路径, 使用的方法, 是否成功, Markdown文件路径)
+        """
+        from .config_loader import get_config
+        
+        max_workers = get_config("concurrency.max_workers", 3)
+        max_in_flight = max(1, max_workers) * 2
+        if output_folder:
+            os.makedirs(output_folder, exist_ok=True)
+        convert = convert or self.convert
+        
+        def _process_one(path):
+            try:
+                md_text, method = convert(path, force_llm=force_llm)
+            except Exception as e:
+                logger.error(f"[✗] {os.path.basename(path)} 转换失败: {e}")
+                return path, None, False, None
+            
+            cache_path = get_markdown_cache_path(path)
+            if not output_folder:
+                return path, method, True, cache_path if os.path.exists(cache_path) else None
+            
+            base_name = os.path.splitext(os.path.basename(path))[0]
+            output_path = os.path.join(output_folder, f"{base_name}.md")
+            try:
+                if os.path.exists(cache_path) and os.path.abspath(cache_path) != os.path.abspath(output_path):
+                    shutil.copyfile(cache_path, output_path)
+                else:
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        f.write(md_text)
+            except Exception as e:
+                logger.error(f"[✗] {os.path.basename(path)} 写入输出失败: {e}")
+                return path, method, False, None
+            return path, method, True, output_path
+        
+        path_iter = iter(pdf_paths)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = set()
+            exhausted = False
+            while True:
+                # 补充任务直至在途上限
+                while not exhausted and len(in_flight) < max_in_flight:
+                    try:
+                        in_flight.add(executor.submit(_process_one, next(path_iter)))
+                    except StopIteration:
+                        exhausted = True
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+    
     def save_markdown(self, markdown_text: str, output_path: str):
         """
         保存Markdown文本到文件
@@ -266,6 +447,68 @@ class PDFToMarkdownConverter:
         logger.info(f"[保存] Markdown已保存到: {output_path}")
 
 
+class ConverterService:
+    """
+    进程级PDF转换服务
+    
+    - 共享同一个转换器（MarkItDown 按工作线程复用，LLM 客户端按需创建）
+    - 单飞保护：同一PDF的并发转换请求只执行一次，其余请求等待并共享结果
+    """
+    
+    def __init__(self):
+        self.converter = PDFToMarkdownConverter()
+        self._inflight: Dict[Tuple[str, bool, bool], Future] = {}
+        self._lock = threading.Lock()
+    
+    def convert(self, pdf_path: str, force_llm: bool = False, force_refresh: bool = False) -> Tuple[str, str]:
+        """
+        转换PDF为Markdown，参数与返回值同 PDFToMarkdownConverter.convert
+        """
+        # force_refresh 的请求不能共享可能基于旧缓存的进行中转换
+        key = (os.path.abspath(pdf_path), force_llm, force_refresh)
+        with self._lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_leader:
+            logger.debug(f"[单飞] 等待进行中的转换: {os.path.basename(pdf_path)}")
+            return future.result()
+        
+        try:
+            result = self.converter.convert(pdf_path, force_llm=force_llm, force_refresh=force_refresh)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+    
+    def iter_convert(self, pdf_paths: Iterable[str], force_llm: bool = False,
+                     output_folder: Optional[str] = None) -> Iterator[Tuple[str, Optional[str], bool, Optional[str]]]:
+        """流式批量转换，参数与产出同 PDFToMarkdownConverter.iter_convert；每个文件经单飞保护转换"""
+        return self.converter.iter_convert(pdf_paths, force_llm=force_llm, output_folder=output_folder,
+                                           convert=self.convert)
+
+
+_converter_service: Optional[ConverterService] = None
+_converter_service_lock = threading.Lock()
+
+
+def get_converter_service() -> ConverterService:
+    """获取进程级共享的转换服务（首次调用时创建）"""
+    global _converter_service
+    if _converter_service is None:
+        with _converter_service_lock:
+            if _converter_service is None:
+                _converter_service = ConverterService()
+    return _converter_service
+
+
 # 便捷函数
 def convert_pdf_to_markdown(pdf_path: str, 
                            output_path: Optional[str] = None,
@@ -283,8 +526,13 @@ def convert_pdf_to_markdown(pdf_path: str,
     Returns:
         str: Markdown文本
     """
-    converter = PDFToMarkdownConverter(llm_client=llm_client)
-    markdown_text, method = converter.convert(pdf_path, force_llm=force_llm)
+    if llm_client is None:
+        # 默认配置下复用进程级转换服务
+        converter = get_converter_service().converter
+        markdown_text, method = get_converter_service().convert(pdf_path, force_llm=force_llm)
+    else:
+        converter = PDFToMarkdownConverter(llm_client=llm_client)
+        markdown_text, method = converter.convert(pdf_path, force_llm=force_llm)
     
     if output_path:
         converter.save_markdown(markdown_text, output_path)
@@ -299,6 +547,9 @@ def convert_pdfs_in_folder(pdf_folder: str,
     """
     便捷函数：转换文件夹中的所有PDF
     
+    使用流式转换，转换结果直接写入输出文件夹，内存占用与文献数量无关；
+    返回值只包含统计信息，不再包含各文档的全文（需要全文时读取输出文件夹或使用 iter_convert）
+    
     Args:
         pdf_folder: PDF文件夹路径
         output_folder: 输出文件夹路径
@@ -306,39 +557,39 @@ def convert_pdfs_in_folder(pdf_folder: str,
         llm_client: 自定义LLM客户端（可选）
         
     Returns:
-        dict: 转换结果统计
+        dict: 转换结果统计（没有 PDF 时各项计数为 0）
+            - total: PDF 总数
+            - success: 转换成功数
+            - failed: 转换失败数
+            - failed_files: 转换失败的 PDF 路径列表
+            - output_folder: 输出文件夹路径
     """
-    from pdf_processor import get_pdf_files
+    from .pdf_processor import get_pdf_files
     
     pdf_files = get_pdf_files(pdf_folder)
+    stats = {"total": len(pdf_files), "success": 0, "failed": 0, "failed_files": [], "output_folder": output_folder}
     
     if not pdf_files:
         logger.warning(f"未找到PDF文件: {pdf_folder}")
-        return {}
+        return stats
     
     logger.info(f"找到 {len(pdf_files)} 个PDF文件")
     
-    converter = PDFToMarkdownConverter(llm_client=llm_client)
-    results = converter.convert_batch(pdf_files, force_llm=force_llm)
+    # 默认配置下经由进程级转换服务，与按需转换同一文件时只转换一次
+    converter = get_converter_service() if llm_client is None else PDFToMarkdownConverter(llm_client=llm_client)
     
-    # 保存结果
-    os.makedirs(output_folder, exist_ok=True)
-    success_count = 0
-    
-    for pdf_path, (content, method, success) in results.items():
+    for pdf_path, method, success, output_path in converter.iter_convert(
+            pdf_files, force_llm=force_llm, output_folder=output_folder):
         if success:
-            base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-            output_path = os.path.join(output_folder, f"{base_name}.md")
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            success_count += 1
+            stats["success"] += 1
+        else:
+            stats["failed_files"].append(pdf_path)
+    stats["failed"] = len(stats["failed_files"])
     
     # 打印统计
-    logger.info(f"转换完成. 成功: {success_count}/{len(pdf_files)}, 失败: {len(pdf_files) - success_count}, 输出: {output_folder}")
+    logger.info(f"转换完成. 成功: {stats['success']}/{stats['total']}, 失败: {stats['failed']}, 输出: {output_folder}")
     
-    return results
+    return stats
 
 
 # 测试代码
@@ -372,8 +623,9 @@ if __name__ == "__main__":
     # 测试2: 批量转换（如果需要）
     # print("\n【测试2】批量转换PDF文件夹")
     # print("-" * 60)
-    # results = convert_pdfs_in_folder(
+    # stats = convert_pdfs_in_folder(
     #     pdf_folder="new_workflow/pdfs",
     #     output_folder="new_workflow/txts/markdown_outputs",
     #     force_llm=False  # 设为True可强制使用LLM处理所有文件
-    # )
\ No newline at end of file
+    # )
+    # print(f"成功 {stats['success']}/{stats['total']}，失败文件: {stats['failed_files']}")
\ No newline at end of file
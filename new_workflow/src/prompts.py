@@ -1,6 +1,19 @@
 # new_workflow/src/prompts.py
 """提示词模板模块"""
 
+def wrap_document_text(file_name: str, text: str) -> str:
+    """
+    将文档文本包装为附加在提示词后的内容块
+    
+    Args:
+        file_name: 文档文件名
+        text: 文档文本（通常为 Markdown）
+        
+    Returns:
+        带起止标记的文本块
+    """
+    return f"\n\n--- [File: {file_name} 内容开始] ---\n{text}\n--- [内容结束] ---"
+
 def get_summary_prompt(research_topic: str) -> str:
     """
     获取文献总结提示词模板
@@ -77,4 +90,64 @@ def get_summary_prompt(research_topic: str) -> str:
 本总结将用于系统构建我的研究脉络，因此请勿遗漏任何与研究主题密切相关的信息。若文献中并未直接涉及部分要点，请简洁说明“文中未涉及”或“未明确提及”。
 
 请严格按照上述结构和要求直接输出总结内容。
-"""
\ No newline at end of file
+"""
+
+def get_window_prompt(summary_prompt: str, window_text: str, index: int, total: int) -> str:
+    """
+    获取长文献分段（Map 阶段）的要点提取提示词
+    
+    Args:
+        summary_prompt: 完整的文献总结提示词（由 get_summary_prompt 生成）
+        window_text: 当前片段的 Markdown 文本
+        index: 当前片段序号（从 1 开始）
+        total: 片段总数
+        
+    Returns:
+        格式化的提示词文本
+    """
+    return f"""
+**任务指令：**
+
+下面是一篇长篇文献的第 {index}/{total} 个片段（相邻片段之间有少量重叠）。最终需要完成的总结任务如下，请先**仅针对本片段**提取与该任务相关的要点，供后续合并为完整总结。
+
+--- [总结任务开始] ---
+{summary_prompt}
+--- [总结任务结束] ---
+
+**本片段的输出要求：**
+*   按“研究问题/目的、研究方法、核心发现、理论基础、研究主题关联性、研究局限性”六个方面提取要点，仅保留本片段中出现的信息；
+*   保留关键数据、变量、样本、模型名称等具体证据，不要推测片段以外的内容；
+*   使用简洁的分点形式，不超过 400 字；
+*   若本片段与研究主题无关，仅输出“本片段无相关内容”。
+
+--- [片段 {index}/{total} 内容开始] ---
+{window_text}
+--- [片段内容结束] ---
+"""
+
+
+def get_reduce_prompt(summary_prompt: str, window_notes: list) -> str:
+    """
+    获取长文献合并（Reduce 阶段）的最终总结提示词
+    
+    Args:
+        summary_prompt: 完整的文献总结提示词（由 get_summary_prompt 生成）
+        window_notes: 按顺序排列的各片段要点文本列表
+        
+    Returns:
+        格式化的提示词文本
+    """
+    total = len(window_notes)
+    notes_text = "\n\n".join(
+        f"### 片段 {i}/{total} 要点\n{note}" for i, note in enumerate(window_notes, 1)
+    )
+    return f"""{summary_prompt}
+
+---
+
+**补充说明：** 由于该文献篇幅较长，已按顺序分段提取了各片段的要点（见下文）。请将这些要点视为文献全文，去除重复信息、合并相同论点，严格按照上述结构和要求输出最终总结。
+
+--- [分段要点开始] ---
+{notes_text}
+--- [分段要点结束] ---
+"""
@@ -0,0 +1,94 @@
+# new_workflow/src/reference_index.py
+"""
+参考文献索引模块
+将参考文献列表解析一次，建立归一化哈希表和字符 n-gram 倒排索引，
+用于 O(1) 精确校验和带相似度得分的容错匹配
+"""
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .fuzzy_matcher import char_ngrams, reference_key, split_references
+
+# 容错匹配时精确计算相似度的候选数量
+_RESCORE_CANDIDATES = 5
+# 出现在超过该比例参考文献中的 n-gram 视为高频，不参与候选召回
+_STOP_GRAM_RATIO = 0.2
+
+
+class ReferenceIndex:
+    """
+    参考文献索引
+
+    - 精确查找：归一化键（忽略空白、标点、全半角、大小写）哈希表
+    - 容错查找：字符 n-gram 倒排索引召回候选，再按 Dice 系数打分
+    """
+
+    def __init__(self, references: List[str], n: int = 3):
+        """
+        Args:
+            references: 参考文献列表（已去除编号）
+            n: n-gram 长度
+        """
+        self.n = n
+        self.references = references
+        self._exact: Dict[str, int] = {}
+        self._grams: List[Set[str]] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+        for i, ref in enumerate(references):
+            key = reference_key(ref)
+            self._exact.setdefault(key, i)
+            grams = char_ngrams(key, n)
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings[gram].append(i)
+
+        max_postings = max(50, int(len(references) * _STOP_GRAM_RATIO))
+        self._stop_grams = {gram for gram, ids in self._postings.items() if len(ids) > max_postings}
+
+    @classmethod
+    def from_text(cls, references_text: str) -> "ReferenceIndex":
+        """从参考文献列表文本构建索引"""
+        return cls(split_references(references_text))
+
+    def __len__(self) -> int:
+        return len(self.references)
+
+    def __contains__(self, reference: str) -> bool:
+        return reference_key(reference) in self._exact
+
+    def lookup(self, reference: str, threshold: float = 0.9) -> Optional[Tuple[str, float]]:
+        """
+        查找参考文献对应的规范字符串
+
+        Args:
+            reference: 待查找的参考文献（如LLM返回的字符串，可含编号或格式差异）
+            threshold: 容错匹配的最低相似度
+
+        Returns:
+            (规范参考文献字符串, 相似度得分)，未找到时返回 None
+        """
+        if not reference:
+            return None
+        # 去除可能带有的编号后再查找
+        stripped = split_references(reference)
+        key = reference_key(stripped[0] if stripped else reference)
+        if key in self._exact:
+            return self.references[self._exact[key]], 1.0
+
+        grams = char_ngrams(key, self.n)
+        if not grams:
+            return None
+        counts = Counter()
+        for gram in grams:
+            if gram not in self._stop_grams:
+                counts.update(self._postings.get(gram, ()))
+
+        best = None
+        for i, _ in counts.most_common(_RESCORE_CANDIDATES):
+            score = 2 * len(grams & self._grams[i]) / (len(grams) + len(self._grams[i]))
+            if best is None or score > best[1]:
+                best = (i, score)
+        if best is None or best[1] < threshold:
+            return None
+        return self.references[best[0]], round(best[1], 4)
@@ -2,19 +2,98 @@
 """参考文献匹配模块"""
 import json
 import os
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
 from .llm_client import LLMClient
 from .config_loader import get_config
 from .logger import logger
-from .utils import extract_json_from_text
+from .utils import extract_json_from_text, DiskCache, file_sha1, atomic_write_json
+from .fuzzy_matcher import (FileQuery, ReferenceCandidates, author_surname, parse_pdf_filename, prematch,
+                            split_references, reference_hash)
+from .pdf_metadata import PdfMetadata, load_pdf_metadata
+from .reference_parser import parse_reference, parse_references
+from .reference_index import ReferenceIndex
+from .lsh_index import load_or_update_lsh_index, query_shingles
+from .alignment_decisions import AlignmentDecisionCache
 
-def align_pdfs_with_references(pdf_files: List[str], references_text: str) -> Dict[str, str]:
+# 对齐结果的结构化输出约束（支持结构化输出的提供商据此直接生成合法 JSON）
+ALIGNMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "matches": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "file_name": {"type": "string"},
+                    "reference": {"type": "string", "nullable": True},
+                },
+                "required": ["file_name", "reference"],
+            },
+        },
+    },
+    "required": ["matches"],
+}
+
+def _is_alignment_response(data) -> bool:
+    """是否为 {"matches": [...]} 结构的对齐结果"""
+    return isinstance(data, dict) and isinstance(data.get("matches"), list)
+
+def _parse_alignment_response(data) -> Optional[Dict[str, Optional[str]]]:
+    """
+    将对齐结果转换为 {文件名: 参考文献} 映射
+
+    Args:
+        data: 解析出的 JSON，{"matches": [...]} 结构或旧的 {文件名: 参考文献} 字典
+
+    Returns:
+        映射字典；结构无法识别时返回 None
+    """
+    if not isinstance(data, dict):
+        return None
+    matches = data.get("matches")
+    if not isinstance(matches, list):
+        return data
+    mapping = {}
+    for item in matches:
+        if isinstance(item, dict) and isinstance(item.get("file_name"), str):
+            reference = item.get("reference")
+            mapping[item["file_name"]] = reference if isinstance(reference, str) and reference else None
+    return mapping
+
+def _build_candidates_prompt(candidates: Dict[str, List[str]],
+                             hints: Optional[Dict[str, str]] = None) -> str:
+    """构建带候选清单的对齐提示词：每个文件只在其候选参考文献中选择"""
+    blocks = []
+    for file_name, refs in candidates.items():
+        lines = "\n".join(f"      - {ref}" for ref in refs) or "      （无候选）"
+        hint = f"\n    PDF首页信息：{hints[file_name]}" if hints and hints.get(file_name) else ""
+        blocks.append(f"    文件：{file_name}{hint}\n    候选参考文献：\n{lines}")
+    items = "\n\n".join(blocks)
+    return f"""
+    任务：为下列每个 PDF 文件从其候选参考文献中选出对应的一条。
+    
+{items}
+    
+    要求：
+    1. 分析文件名（及PDF首页信息）和候选参考文献的标题、作者、年份等信息，选出与文件对应的那一条。
+    2. 返回 JSON 对象 {{"matches": [{{"file_name": PDF 文件名, "reference": 所选参考文献}}, ...]}}，每个文件一项，reference 必须与候选项原文完全一致。
+    3. 如果候选中没有对应的参考文献，或无法确定匹配关系，reference 设为 null。
+    4. 仅返回 JSON 格式结果，不要包含 Markdown 代码块标记或其他文字。
+    5. 确保每个参考文献只被分配给一个文件，避免一对多映射关系。
+    """
+
+def align_pdfs_with_references(pdf_files: List[str], references_text: str,
+                               candidates: Optional[Dict[str, List[str]]] = None,
+                               hints: Optional[Dict[str, str]] = None) -> Dict[str, str]:
     """
     使用LLM将PDF文件名与参考文献列表进行对齐
     
     Args:
         pdf_files: PDF文件路径列表
         references_text: 参考文献列表文本
+        candidates: 每个文件的候选参考文献（可选）；提供时只让LLM在候选中选择，不再发送完整列表
+        hints: 每个文件从PDF中提取的标题、作者等信息（可选，仅在提供 candidates 时使用）
         
     Returns:
         文件名到参考文献的映射字典
@@ -26,7 +105,10 @@ def align_pdfs_with_references(pdf_files: List[str], references_text: str) -> Di
     # 提取文件名用于Prompt，减少Token消耗
     file_names = [os.path.basename(f) for f in pdf_files]
     
-    prompt = f"""
+    if candidates is not None:
+        prompt = _build_candidates_prompt({name: candidates.get(name, []) for name in file_names}, hints)
+    else:
+        prompt = f"""
     任务：将以下 PDF 文件名与提供的参考文献列表进行一一对应匹配。
     
     PDF 文件名列表：
@@ -37,23 +119,27 @@ def align_pdfs_with_references(pdf_files: List[str], references_text: str) -> Di
     
     要求：
     1. 分析文件名和参考文献的标题、作者等信息，找到最匹配的对应关系。
-    2. 返回一个 JSON 对象，键是 PDF 文件名，值是对应的完整参考文献字符串。
-    3. 如果某个文件没有找到对应的参考文献，对应的值设为 null。
+    2. 返回一个 JSON 对象，其中 matches 数组为每个 PDF 文件给出一项：file_name 是 PDF 文件名，reference 是对应的完整参考文献字符串。
+    3. 如果某个文件没有找到对应的参考文献，reference 设为 null。
     4. 仅返回 JSON 格式结果，不要包含 Markdown 代码块标记或其他文字。
     5. 确保每个参考文献只被分配给一个文件，避免一对多映射关系。
-    6. 如果无法确定匹配关系，请将该文件的值设为 null。
-    7. 值不要包含参考文献的编号。
+    6. 如果无法确定匹配关系，请将该文件的 reference 设为 null。
+    7. reference 不要包含参考文献的编号。
     8. 示例输出格式：
     {{
-        "知情交易、信息不确定性与股票风险溢价.pdf": "陈国进, 张润泽, 谢沛霖, 等. 知情交易、信息不确定性与股票风险溢价[J]. 管理科学学报, 2019, 22(4): 53-74.",
-        "paper2.pdf": null,
-        ...
+        "matches": [
+            {{"file_name": "知情交易、信息不确定性与股票风险溢价.pdf", "reference": "陈国进, 张润泽, 谢沛霖, 等. 知情交易、信息不确定性与股票风险溢价[J]. 管理科学学报, 2019, 22(4): 53-74."}},
+            {{"file_name": "paper2.pdf", "reference": null}},
+            ...
+        ]
     }}
-    """    
-    logger.info("正在调用大模型进行文献对齐...")
+    """
+    logger.info(f"正在调用大模型进行文献对齐 ({len(file_names)} 个文件)...")
     try:
-        response = llm.generate(prompt=prompt)
-        mapping = extract_json_from_text(response)
+        response = llm.generate(prompt=prompt, response_schema=ALIGNMENT_SCHEMA)
+        # 回复中可能夹杂引文编号等其他 JSON 片段，优先取包含 matches 的对象
+        data = extract_json_from_text(response, accept=_is_alignment_response) or extract_json_from_text(response)
+        mapping = _parse_alignment_response(data)
         
         if mapping is None:
             logger.error(f"无法解析 LLM 返回的 JSON: {response[:100]}...")
@@ -64,51 +150,382 @@ def align_pdfs_with_references(pdf_files: List[str], references_text: str) -> Di
         logger.error(f"对齐参考文献时发生错误: {e}")
         return {}
 
-def validate_reference_mapping(mapping: Dict[str, str], references_text: str) -> Dict[str, str]:
+def _alignment_model_id() -> str:
+    """对齐所用模型的标识，参与分块缓存键计算"""
+    return f"{get_config('model.reference_extraction.provider')}/{get_config('model.reference_extraction.model_name')}"
+
+def align_in_chunks(file_names: List[str], candidates: Dict[str, List[str]],
+                    references_text: str, hints: Optional[Dict[str, str]] = None) -> Dict[str, Optional[str]]:
+    """
+    分块并发对齐：每块包含有限数量的文件及其候选参考文献，块之间并发调用LLM
+    
+    成功的块按内容缓存；失败块中的文件不出现在结果中，由调用方记录并在下次运行时重试
+    
+    Args:
+        file_names: 待对齐的文件名列表
+        candidates: 每个文件的候选参考文献
+        references_text: 参考文献列表文本
+        hints: 每个文件从PDF中提取的标题、作者等信息（可选）
+        
+    Returns:
+        合并后的文件名到参考文献的映射（不包含失败块中的文件）
+    """
+    chunk_size = max(1, get_config("matching.chunk_size", 20))
+    chunk_retries = max(1, get_config("matching.chunk_retries", 2))
+    max_workers = max(1, get_config("matching.max_workers", get_config("concurrency.max_workers", 3)))
+    cache = DiskCache(get_config("paths.alignment_cache", "new_workflow/cache/alignment"))
+    model_id = _alignment_model_id()
+    
+    chunks = [file_names[i:i + chunk_size] for i in range(0, len(file_names), chunk_size)]
+    logger.info(f"分块对齐: {len(file_names)} 个文件分为 {len(chunks)} 块, 并发数 {max_workers}")
+    
+    def _align_chunk(chunk: List[str]) -> Optional[Dict[str, Optional[str]]]:
+        chunk_candidates = {name: candidates.get(name, []) for name in chunk}
+        chunk_hints = {name: hints[name] for name in chunk if hints and hints.get(name)}
+        key = cache.make_key("alignment", model_id, json.dumps(chunk_candidates, ensure_ascii=False, sort_keys=True),
+                             *([json.dumps(chunk_hints, ensure_ascii=False, sort_keys=True)] if chunk_hints else []))
+        cached = cache.get(key)
+        if isinstance(cached, dict):
+            return cached
+        
+        for attempt in range(chunk_retries):
+            mapping = align_pdfs_with_references(chunk, references_text, candidates=chunk_candidates,
+                                                 hints=chunk_hints)
+            if mapping and isinstance(mapping, dict):
+                result = {name: mapping.get(name) for name in chunk}
+                try:
+                    cache.set(key, result)
+                except Exception as e:
+                    logger.warning(f"写入对齐缓存失败: {e}")
+                return result
+            logger.warning(f"分块对齐失败 (尝试 {attempt + 1}/{chunk_retries}): {chunk[0]} 等 {len(chunk)} 个文件")
+        return None
+    
+    merged: Dict[str, Optional[str]] = {}
+    failed_chunks, failed_files = 0, 0
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks)) or 1) as executor:
+        futures = {executor.submit(_align_chunk, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"分块对齐异常: {e}")
+                result = None
+            if result is None:
+                failed_chunks += 1
+                failed_files += len(futures[future])
+                continue
+            merged.update(result)
+    
+    if failed_chunks:
+        logger.warning(f"{failed_chunks}/{len(chunks)} 个分块对齐失败，其中 {failed_files} 个文件暂不匹配，"
+                       f"下次运行时会重试这些文件")
+    return merged
+
+def validate_reference_mapping(mapping: Dict[str, str], references_text: str,
+                               index: Optional[ReferenceIndex] = None) -> Dict[str, str]:
     """
     验证参考文献映射的有效性，确保一对一映射关系
     
+    参考文献列表只解析一次并建立索引，每条映射 O(1) 校验；对空白、标点等细微差异
+    容错匹配，并将值统一替换为参考文献列表中的规范字符串。多个文件对应同一参考文献时，
+    保留与该参考文献相似度最高的文件
+    
     Args:
         mapping: 文件名到参考文献的映射字典
         references_text: 参考文献列表文本
+        index: 已构建的参考文献索引（可选，未提供时从 references_text 构建）
         
     Returns:
         验证后的映射字典，确保一对一映射关系
     """
+    index = index or ReferenceIndex.from_text(references_text)
+    threshold = get_config("matching.validation_threshold", 0.9)
     valid_mapping = {}
-    
-    # 记录已被映射的参考文献，防止一对多映射
-    used_references = set()
+    claims: Dict[str, List[str]] = {}
     
     for file_name, reference in mapping.items():
-        # 检查参考文献是否有效且未被其他文件使用
-        if reference and reference in references_text and reference not in used_references:
-            valid_mapping[file_name] = reference
-            used_references.add(reference)
-        else:
-            valid_mapping[file_name] = None
-            
-    # 检查是否有重复映射到相同参考文献的情况
-    reference_count = {}
-    for ref in valid_mapping.values():
-        if ref:
-            reference_count[ref] = reference_count.get(ref, 0) + 1
-    
-    # 将重复映射的项设为None（保留第一个）
-    reference_first_file = {}
-    for file_name, reference in valid_mapping.items():
-        if reference and reference_count[reference] > 1:
-            if reference not in reference_first_file:
-                reference_first_file[reference] = file_name
-            elif reference_first_file[reference] != file_name:
-                valid_mapping[file_name] = None
+        valid_mapping[file_name] = None
+        hit = index.lookup(reference, threshold) if isinstance(reference, str) else None
+        if hit is None:
+            if reference:
+                logger.debug(f"参考文献不在列表中，已忽略: {file_name} -> {str(reference)[:60]}")
+            continue
+        
+        canonical, score = hit
+        if score < 1.0:
+            logger.debug(f"容错匹配 ({score:.2f}): {file_name} -> {canonical[:60]}")
+        claims.setdefault(canonical, []).append(file_name)
+    
+    # 一对多冲突：按文件名与参考文献的相似度保留最匹配的文件（同分时保留先出现的）
+    contested = [ref for ref, files in claims.items() if len(files) > 1]
+    if contested:
+        candidates = ReferenceCandidates(contested, [parse_reference(ref) for ref in contested])
+        claimants = [name for ref in contested for name in claims[ref]]
+        scores = candidates.score_matrix([parse_pdf_filename(name) for name in claimants])
+        row = 0
+        for col, ref in enumerate(contested):
+            files = claims[ref]
+            best = max(range(len(files)), key=lambda k: (scores[row + k][col], -k))
+            logger.debug(f"参考文献被 {len(files)} 个文件同时匹配，保留: {files[best]}")
+            claims[ref] = [files[best]]
+            row += len(files)
+    
+    for canonical, files in claims.items():
+        valid_mapping[files[0]] = canonical
                 
     return valid_mapping
 
+def shortlist_references(pdf_files: List[str], references: List[str], records: List,
+                         queries: Optional[Dict[str, FileQuery]] = None) -> tuple:
+    """
+    参考文献数量很大时，用 MinHash/LSH 索引为每个文件召回 top-k 候选，
+    本地预匹配只在候选并集上进行，且每个文件只为自己的候选计算得分
+    
+    Args:
+        pdf_files: PDF文件路径列表
+        references: 参考文献列表（已去除编号）
+        records: 与 references 一一对应的结构化记录
+        queries: 文件名到检索信息的映射（可选，未提供的文件从文件名解析）
+        
+    Returns:
+        (参考文献子集, 对应的记录子集, 文件名到候选在子集中序号的映射)；
+        参考文献较少或索引不可用时原样返回，映射为 None
+    """
+    if len(references) < get_config("matching.lsh_min_references", 2000):
+        return references, records, None
+    index = load_or_update_lsh_index(references, records,
+                                     get_config("paths.lsh_index", "new_workflow/cache/lsh"))
+    if index is None:
+        return references, records, None
+    
+    top_k = get_config("matching.lsh_top_k", 20)
+    recalled = {}
+    for pdf_file in pdf_files:
+        name = os.path.basename(pdf_file)
+        query = (queries or {}).get(name) or parse_pdf_filename(name)
+        recalled[name] = index.query(query_shingles(query.title, query.authors), top_k)
+    selected = sorted({i for ids in recalled.values() for i in ids})
+    position = {i: k for k, i in enumerate(selected)}
+    shortlists = {name: [position[i] for i in ids] for name, ids in recalled.items()}
+    logger.info(f"LSH 候选召回: 从 {len(references)} 条参考文献中召回 {len(selected)} 条")
+    return [references[i] for i in selected], [records[i] for i in selected], shortlists
+
+def _metadata_queries(metadata: Dict[str, PdfMetadata]) -> Dict[str, FileQuery]:
+    """文件名不含作者、年份信息时，改用从PDF中提取的标题、作者和年份作为检索信息"""
+    queries = {}
+    for name, meta in metadata.items():
+        query = parse_pdf_filename(name)
+        if not query.authors and not query.year and meta.title:
+            query = FileQuery(file_name=name, title=meta.title,
+                              authors=[author_surname(a) for a in meta.authors[:5]], year=meta.year)
+        queries[name] = query
+    return queries
+
+def _metadata_hint(meta: PdfMetadata) -> str:
+    """提供给大模型的PDF元数据摘要"""
+    parts = []
+    if meta.title:
+        parts.append(f"标题: {meta.title}")
+    if meta.authors:
+        parts.append(f"作者: {', '.join(meta.authors[:5])}")
+    if meta.year:
+        parts.append(f"年份: {meta.year}")
+    if meta.doi:
+        parts.append(f"DOI: {meta.doi}")
+    return "; ".join(parts)
+
+def _apply_decisions(unresolved: List[str], candidates: Dict[str, List[str]], references: List[str],
+                     hashes: Dict[str, str], decisions: AlignmentDecisionCache,
+                     mapping: Dict[str, Optional[str]]) -> tuple:
+    """
+    用已缓存的大模型判断处理未确定的文件：已判定匹配的直接采用，已判定不匹配的候选从清单中移除，
+    候选全部被否决的文件直接视为未匹配
+    
+    Returns:
+        (仍需调用大模型的文件名列表, 过滤后的候选清单)；已决定的文件写入 mapping
+    """
+    used = {ref for ref in mapping.values() if ref}
+    available = {reference_hash(ref): ref for ref in references if ref not in used}
+    remaining, filtered = [], {}
+    reused = 0
+    for name in unresolved:
+        sha1 = hashes.get(name)
+        if not sha1:
+            remaining.append(name)
+            filtered[name] = candidates.get(name, [])
+            continue
+        matched = decisions.matched_reference(sha1, available)
+        if matched is not None:
+            mapping[name] = matched
+            available.pop(reference_hash(matched))
+            reused += 1
+            continue
+        rejected = decisions.rejected(sha1)
+        refs = candidates.get(name, [])
+        kept = [ref for ref in refs if reference_hash(ref) not in rejected]
+        if refs and not kept:
+            mapping[name] = None
+            reused += 1
+            continue
+        remaining.append(name)
+        filtered[name] = kept
+    if reused:
+        logger.info(f"复用已缓存的对齐判断: {reused} 个文件无需调用大模型")
+    return remaining, filtered
+
+def build_reference_mapping(pdf_files: List[str], references_text: str,
+                            hashes: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    建立PDF文件到参考文献的映射：先按 DOI 精确匹配，再本地预匹配，然后由LLM对齐剩余文件，最后统一验证
+    
+    Args:
+        pdf_files: PDF文件路径列表
+        references_text: 参考文献列表文本
+        hashes: 已知的 文件名 -> SHA-1（可选，用于查询PDF元数据索引）
+        
+    Returns:
+        验证后的文件名到参考文献的映射字典；LLM 对齐失败的文件不包含在结果中
+    """
+    if not get_config("matching.local_prematch", True):
+        mapping = align_pdfs_with_references(pdf_files, references_text)
+        if mapping:
+            mapping = {name: mapping.get(name) for name in map(os.path.basename, pdf_files)}
+        return validate_reference_mapping(mapping, references_text)
+    
+    references = all_references = split_references(references_text)
+    records = parse_references(references)
+    
+    mapping: Dict[str, Optional[str]] = {}
+    metadata: Dict[str, PdfMetadata] = {}
+    if get_config("matching.use_pdf_metadata", True):
+        metadata = load_pdf_metadata(pdf_files, hashes)
+        # DOI 精确匹配
+        by_doi = {record.doi: record.raw for record in records if record.doi}
+        for name, meta in metadata.items():
+            reference = by_doi.pop(meta.doi, None) if meta.doi else None
+            if reference:
+                mapping[name] = reference
+        if mapping:
+            logger.info(f"DOI 精确匹配: {len(mapping)} 个文件")
+            matched_refs = set(mapping.values())
+            keep = [i for i, ref in enumerate(references) if ref not in matched_refs]
+            references, records = [references[i] for i in keep], [records[i] for i in keep]
+            pdf_files = [f for f in pdf_files if os.path.basename(f) not in mapping]
+    
+    queries = _metadata_queries(metadata)
+    references, records, shortlists = shortlist_references(pdf_files, references, records, queries)
+    result = prematch(pdf_files, references, records, queries, shortlists)
+    logger.info(f"本地预匹配: {len(result.matched)} 个文件已确定, {len(result.unresolved)} 个文件交给大模型"
+                f"（其中 {len(result.flagged)} 个为低置信度分配）")
+    
+    mapping.update(result.matched)
+    unresolved, candidates = result.unresolved, result.candidates
+    decisions = None
+    if unresolved and hashes and get_config("matching.decision_cache", True):
+        decisions = AlignmentDecisionCache(get_config("paths.alignment_decisions",
+                                                      "new_workflow/cache/alignment_decisions.json"))
+        unresolved, candidates = _apply_decisions(unresolved, candidates, all_references, hashes, decisions, mapping)
+    
+    if unresolved:
+        hints = {name: _metadata_hint(metadata[name]) for name in unresolved if name in metadata}
+        llm_mapping = align_in_chunks(unresolved, candidates, references_text, hints)
+        for file_name in unresolved:
+            if file_name in llm_mapping:
+                mapping[file_name] = llm_mapping[file_name]
+        if decisions is not None:
+            model_id = _alignment_model_id()
+            for file_name, chosen in llm_mapping.items():
+                if hashes.get(file_name):
+                    decisions.record(hashes[file_name], candidates.get(file_name, []), chosen, model_id)
+            decisions.save()
+    
+    # 各分块独立作答，合并后需全局去重以保证一对一
+    return validate_reference_mapping(mapping, references_text)
+
+def _mapping_state_path(reference_mapping_path: str) -> str:
+    """映射状态文件（PDF 与参考文献指纹）路径，与映射文件放在同一目录"""
+    return get_config("paths.reference_mapping_state",
+                      os.path.splitext(reference_mapping_path)[0] + ".state.json")
+
+def _load_json_file(path: str) -> Optional[dict]:
+    """读取 JSON 字典文件，不存在、为空或损坏时返回 None"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except Exception as e:
+        logger.warning(f"读取 {path} 失败: {e}")
+        return None
+
+def fingerprint_pdfs(pdf_files: List[str], previous: Dict[str, dict]) -> Dict[str, dict]:
+    """
+    计算PDF清单指纹：文件大小与修改时间未变时复用上次的内容哈希，避免重复读取整个文件
+    
+    Args:
+        pdf_files: PDF文件路径列表
+        previous: 上次保存的指纹 {文件名: {"size", "mtime", "sha1"}}
+        
+    Returns:
+        当前指纹 {文件名: {"size", "mtime", "sha1"}}
+    """
+    inventory = {}
+    for path in pdf_files:
+        name = os.path.basename(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        old = previous.get(name)
+        if old and old.get("size") == stat.st_size and old.get("mtime") == stat.st_mtime:
+            sha1 = old.get("sha1")
+        else:
+            sha1 = file_sha1(path)
+        inventory[name] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha1": sha1}
+    return inventory
+
+def compute_mapping_delta(mapping: Dict[str, Optional[str]], state: dict,
+                          inventory: Dict[str, dict], references: List[str]) -> Dict[str, List[str]]:
+    """
+    比较已保存的映射与当前 PDF 清单、参考文献列表，计算需要重新对齐的增量
+    
+    Args:
+        mapping: 已保存的映射
+        state: 已保存的指纹状态 {"files": {...}, "references": [...], "pending": [...]}
+        inventory: 当前PDF指纹
+        references: 当前参考文献列表（已去除编号）
+        
+    Returns:
+        dict: {"added": 新增或内容变化的文件, "removed": 已删除的文件,
+               "stale": 对应参考文献已被删除或修改的文件,
+               "retry": 上次对齐失败或因新增参考文献需要重试的未匹配文件}
+    """
+    old_files = state.get("files", {})
+    current_refs = {reference_hash(ref) for ref in references}
+    new_refs = current_refs - set(state.get("references", current_refs))
+    pending = set(state.get("pending", []))
+    
+    added, stale, retry = [], [], []
+    for name, info in inventory.items():
+        if name not in mapping or (name in old_files and old_files[name].get("sha1") != info["sha1"]):
+            added.append(name)
+        elif mapping[name] is not None and reference_hash(mapping[name]) not in current_refs:
+            stale.append(name)
+        elif mapping[name] is None and (new_refs or name in pending):
+            retry.append(name)
+    removed = [name for name in mapping if name not in inventory]
+    return {"added": added, "removed": removed, "stale": stale, "retry": retry}
+
 def load_or_create_mapping(reference_mapping_path: str, pdf_files: List[str], 
                           reference_file_path: str) -> Dict[str, str]:
     """
-    加载或创建参考文献映射
+    加载或增量更新参考文献映射
+    
+    已有映射时只对增量部分（新增/内容变化的文件、对应参考文献被修改的文件、
+    上次对齐失败或因新增参考文献可能匹配上的未匹配文件）重新对齐，并原子地合并回映射文件；
+    本次对齐失败的文件在映射中记为未匹配，并写入状态文件的 pending 列表，下次运行时重试
     
     Args:
         reference_mapping_path: 映射文件保存路径
@@ -118,18 +535,13 @@ def load_or_create_mapping(reference_mapping_path: str, pdf_files: List[str],
     Returns:
         文件名到参考文献的映射字典
     """
-    # 如果映射文件存在，直接加载
-    if os.path.exists(reference_mapping_path):
-        with open(reference_mapping_path, "r", encoding="utf-8") as f:
-            if os.path.getsize(reference_mapping_path) == 0:
-                logger.warning("参考文献映射文件为空，重新创建映射")
-                return {}
-            return json.load(f)
+    existing = _load_json_file(reference_mapping_path)
+    if existing is None and os.path.exists(reference_mapping_path):
+        logger.warning("参考文献映射文件为空或已损坏，重新创建映射")
     
-    # 否则创建新的映射
     if not os.path.exists(reference_file_path):
         logger.error(f"未找到参考文献文件: {reference_file_path}")
-        return {}
+        return existing or {}
     
     try:
         with open(reference_file_path, "r", encoding="utf-8") as f:
@@ -137,15 +549,50 @@ def load_or_create_mapping(reference_mapping_path: str, pdf_files: List[str],
         
         if not references_text.strip():
             logger.warning("参考文献文件为空")
-            return {}
+            return existing or {}
         
-        # 进行对齐并验证
-        reference_mapping = align_pdfs_with_references(pdf_files, references_text)
-        reference_mapping = validate_reference_mapping(reference_mapping, references_text)
+        references = split_references(references_text)
+        state_path = _mapping_state_path(reference_mapping_path)
+        state = _load_json_file(state_path) or {}
+        inventory = fingerprint_pdfs(pdf_files, state.get("files", {}))
+        new_state = {"files": inventory, "references": sorted({reference_hash(ref) for ref in references}),
+                     "pending": []}
         
-        # 保存映射
-        with open(reference_mapping_path, "w", encoding="utf-8") as f:
-            json.dump(reference_mapping, f, ensure_ascii=False, indent=4)
+        hashes = {name: info["sha1"] for name, info in inventory.items()}
+        if existing is None:
+            reference_mapping = build_reference_mapping(pdf_files, references_text, hashes)
+        else:
+            delta = compute_mapping_delta(existing, state, inventory, references)
+            to_align = delta["added"] + delta["stale"] + delta["retry"]
+            if not to_align and not delta["removed"]:
+                if state != new_state:
+                    atomic_write_json(state_path, new_state)
+                return existing
+            
+            logger.info(f"映射增量: 新增/变化 {len(delta['added'])} 个, 删除 {len(delta['removed'])} 个, "
+                        f"参考文献变化 {len(delta['stale'])} 个, 重试未匹配 {len(delta['retry'])} 个")
+            
+            reference_mapping = {name: ref for name, ref in existing.items()
+                                 if name in inventory and name not in to_align}
+            if to_align:
+                # 仅在尚未被其他文件占用的参考文献中对齐增量文件
+                used = {reference_hash(ref) for ref in reference_mapping.values() if ref}
+                available_text = "\n".join(ref for ref in references if reference_hash(ref) not in used)
+                paths = [p for p in pdf_files if os.path.basename(p) in set(to_align)]
+                if available_text.strip():
+                    reference_mapping.update(build_reference_mapping(paths, available_text, hashes))
+                else:
+                    reference_mapping.update({name: None for name in to_align})
+        
+        # 对齐失败的文件暂记为未匹配，并记录到状态中以便下次重试
+        new_state["pending"] = sorted(name for name in inventory if name not in reference_mapping)
+        if new_state["pending"]:
+            reference_mapping.update({name: None for name in new_state["pending"]})
+            logger.warning(f"{len(new_state['pending'])} 个文件对齐失败，已记录，下次运行时重试")
+        
+        # 保存映射与指纹状态（原子写入）
+        atomic_write_json(reference_mapping_path, reference_mapping)
+        atomic_write_json(state_path, new_state)
         
         matched_count = sum(1 for ref in reference_mapping.values() if ref is not None)
         total_count = len(reference_mapping)
@@ -154,5 +601,4 @@ def load_or_create_mapping(reference_mapping_path: str, pdf_files: List[str],
         return reference_mapping
     except Exception as e:
         logger.error(f"创建参考文献映射失败: {e}")
-        return {}
-    
\ No newline at end of file
+        return existing or {}
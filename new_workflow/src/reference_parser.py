@@ -0,0 +1,214 @@
+# new_workflow/src/reference_parser.py
+"""
+参考文献解析模块
+将 GB/T 7714、APA 等格式的参考文献解析为结构化记录（作者、年份、标题、出处、卷期、页码、DOI），
+并按参考文献文本的哈希缓存解析结果，供匹配、排序和导出复用
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Tuple
+
+from .config_loader import get_config
+from .fuzzy_matcher import split_references
+from .logger import logger
+from .utils import DiskCache, contains_cjk, to_pinyin
+
+# 解析规则变化时递增，使旧缓存失效
+PARSER_VERSION = "1"
+
+_DOI = re.compile(r'\b(10\.\d{4,9}/[^\s,;，；]+)', re.IGNORECASE)
+_YEAR = re.compile(r'(?<!\d)((?:19|20)\d{2})[a-z]?(?!\d)')
+# GB/T 7714：作者. 标题[J]. 出处, 年, 卷(期): 页码.
+_GBT = re.compile(r'^(?P<authors>.+?)[.．]\s*(?P<title>.+?)\s*\[(?P<type>[A-Za-z]{1,2}(?:/OL)?)\]\s*[.．]?\s*(?P<rest>.*)$')
+# APA：作者 (年). 标题. 出处, 卷(期), 页码. DOI
+_APA = re.compile(r'^(?P<authors>.+?)\s*[(（](?P<year>(?:19|20)\d{2})[a-z]?(?:,[^)）]*)?[)）]\s*[.．]\s*'
+                  r'(?P<title>.+?[.?!？。])\s+(?P<rest>.*)$')
+_VOLUME_ISSUE = re.compile(r'^\s*[,，]?\s*(?P<volume>\d+)?\s*(?:[(（](?P<issue>[^)）]+)[)）])?')
+_PAGES = re.compile(r'(?:[:：]|,\s*(?:pp?\.\s*)?)\s*(?P<pages>[A-Za-z]?\d+(?:\s*[-–—~]\s*[A-Za-z]?\d+)?(?:\s*[,，]\s*\d+(?:\s*[-–—]\s*\d+)?)*)')
+_APA_AUTHOR = re.compile(r"([^,&]+?),\s*((?:[A-Z][a-z]?\.\s*-?\s*)+)")
+_AUTHOR_SPLIT = re.compile(r'\s*(?:,|，|、|;|；|&|\band\b)\s*', re.IGNORECASE)
+_ET_AL = {'等', 'et al', 'et al.', 'etc', 'etc.'}
+
+
+@dataclass
+class ReferenceRecord:
+    """结构化的参考文献记录"""
+    raw: str                                    # 去除编号后的原始字符串（规范参考文献）
+    authors: List[str] = field(default_factory=list)
+    year: Optional[str] = None
+    title: str = ""
+    venue: str = ""
+    volume: Optional[str] = None
+    issue: Optional[str] = None
+    pages: Optional[str] = None
+    doi: Optional[str] = None
+    doc_type: Optional[str] = None              # GB/T 7714 文献类型标识，如 J、M、D
+    style: str = "other"                        # gbt7714 / apa / other
+    sort_key: Tuple[int, str] = (1, "")         # 导出排序键（中文在前按拼音，英文在后）
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReferenceRecord":
+        data = dict(data)
+        data["sort_key"] = tuple(data.get("sort_key") or (1, ""))
+        return cls(**data)
+
+
+def _english_key(text: str) -> str:
+    s = text.strip()
+    s = re.sub(r'[^0-9A-Za-z]+', ' ', s)
+    s = re.sub(r'\s+', ' ', s)
+    return s.lower()
+
+
+def _chinese_key(text: str) -> str:
+    return ''.join(to_pinyin(text.strip())).lower()
+
+
+def reference_sort_key(reference: str) -> Tuple[int, str]:
+    """参考文献排序键：中文文献在前按拼音排序，英文文献在后按字母排序"""
+    if contains_cjk(reference):
+        return (0, _chinese_key(reference))
+    return (1, _english_key(reference))
+
+
+def _split_authors(text: str) -> List[str]:
+    authors = []
+    for author in _AUTHOR_SPLIT.split(text.strip().rstrip('.．')):
+        author = author.strip().rstrip('.．')
+        if author and author.lower() not in _ET_AL:
+            authors.append(author)
+    return authors
+
+
+def _parse_venue_details(rest: str, record: ReferenceRecord, year_known: bool):
+    """解析出处部分：出处名称、年份、卷、期、页码"""
+    rest = _DOI.sub('', rest)
+    rest = re.sub(r'(https?://\S+|doi:\s*)', '', rest, flags=re.IGNORECASE).strip(' .．')
+
+    if not year_known:
+        year_match = _YEAR.search(rest)
+        if year_match:
+            record.year = year_match.group(1)
+            record.venue = rest[:year_match.start()].strip(' ,，.．:：')
+            rest = rest[year_match.end():]
+        else:
+            record.venue = rest
+            return
+    else:
+        venue_match = re.match(r'^(?P<venue>[^,，\d]+?)\s*[,，]', rest)
+        if venue_match:
+            record.venue = venue_match.group('venue').strip(' .．')
+            rest = rest[venue_match.end():]
+        else:
+            record.venue = rest
+            return
+
+    volume_match = _VOLUME_ISSUE.match(rest)
+    if volume_match:
+        record.volume = volume_match.group('volume')
+        record.issue = volume_match.group('issue')
+        rest = rest[volume_match.end():]
+    pages_match = _PAGES.search(rest)
+    if pages_match:
+        record.pages = re.sub(r'\s+', '', pages_match.group('pages'))
+
+
+def parse_reference(reference: str) -> ReferenceRecord:
+    """
+    解析单条参考文献
+
+    Args:
+        reference: 参考文献字符串（可带编号）
+
+    Returns:
+        ReferenceRecord: 结构化记录；无法识别格式时仅提取年份、DOI，标题为整条文本
+    """
+    stripped = split_references(reference)
+    raw = stripped[0] if stripped else reference.strip()
+    record = ReferenceRecord(raw=raw, sort_key=reference_sort_key(raw))
+
+    doi_match = _DOI.search(raw)
+    if doi_match:
+        record.doi = doi_match.group(1).rstrip('.．').lower()
+
+    gbt = _GBT.match(raw)
+    if gbt:
+        record.style = "gbt7714"
+        record.authors = _split_authors(gbt.group('authors'))
+        record.title = gbt.group('title').strip()
+        record.doc_type = gbt.group('type').upper()
+        _parse_venue_details(gbt.group('rest'), record, year_known=False)
+        return record
+
+    apa = _APA.match(raw)
+    if apa:
+        record.style = "apa"
+        author_text = apa.group('authors')
+        surnames = [m.group(1).strip(' &') for m in _APA_AUTHOR.finditer(author_text)]
+        record.authors = surnames or _split_authors(author_text)
+        record.year = apa.group('year')
+        record.title = apa.group('title').strip().rstrip('.．。')
+        _parse_venue_details(apa.group('rest'), record, year_known=True)
+        return record
+
+    year_match = _YEAR.search(raw)
+    record.year = year_match.group(1) if year_match else None
+    record.title = raw
+    return record
+
+
+# 进程内缓存最近使用的参考文献列表解析结果（每项是一整份列表，按最近使用淘汰）
+_MEMORY_CACHE_SIZE = 8
+_memory_cache: "OrderedDict[str, List[ReferenceRecord]]" = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def parse_references(references: List[str]) -> List[ReferenceRecord]:
+    """
+    批量解析参考文献，结果按内容哈希缓存（进程内存中保留最近 _MEMORY_CACHE_SIZE 份 + 磁盘）
+
+    Args:
+        references: 参考文献列表（已去除编号）
+
+    Returns:
+        与输入顺序一致的记录列表
+    """
+    content = "\n".join(references)
+    key = hashlib.sha1(f"{PARSER_VERSION}\n{content}".encode("utf-8")).hexdigest()
+
+    with _memory_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+
+    cache = DiskCache(get_config("paths.reference_cache", "new_workflow/cache/references"))
+    cached = cache.get(key)
+    records = None
+    if isinstance(cached, list) and len(cached) == len(references):
+        try:
+            records = [ReferenceRecord.from_dict(item) for item in cached]
+        except Exception as e:
+            logger.warning(f"参考文献解析缓存无效，将重新解析: {e}")
+
+    if records is None:
+        records = [parse_reference(ref) for ref in references]
+        try:
+            cache.set(key, [asdict(r) for r in records])
+        except Exception as e:
+            logger.warning(f"写入参考文献解析缓存失败: {e}")
+
+    with _memory_lock:
+        _memory_cache[key] = records
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > _MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+    return records
+
+
+def load_reference_records(reference_file_path: str) -> List[ReferenceRecord]:
+    """读取参考文献文件并返回结构化记录（文件内容不变时直接使用缓存）"""
+    with open(reference_file_path, "r", encoding="utf-8") as f:
+        return parse_references(split_references(f.read()))
@@ -1,73 +1,243 @@
 # new_workflow/src/results_exporter.py
 """
 文献综述助手 - 结果导出器
-负责将总结结果排序并导出为CSV文件
+负责将总结结果排序并导出为CSV文件（以及 XLSX、Parquet、Markdown，见 export_formats）
+
+总结结果逐条流式读取（JSON 数组或 JSONL），排序键每条只计算一次；
+超过 export.run_size 条时将已排序的分段写入临时文件，最后多路归并后逐条交给导出器，内存占用与结果总数无关
 """
-import csv
+import heapq
 import json
 import os
-import re
-from typing import Any, Dict, List, Tuple
-
-try:
-    from pypinyin import lazy_pinyin  # optional
-    _HAS_PYPINYIN = True
-except Exception:
-    _HAS_PYPINYIN = False
-
-def _contains_cjk(text: str) -> bool:
-    for ch in text:
-        if '\u4e00' <= ch <= '\u9fff':
-            return True
-    return False
-
-def _english_key(text: str) -> str:
-    s = text.strip()
-    s = re.sub(r'[^0-9A-Za-z]+', ' ', s)
-    s = re.sub(r'\s+', ' ', s)
-    return s.lower()
-
-def _chinese_key(text: str) -> str:
-    s = text.strip()
-    if _HAS_PYPINYIN:
-        try:
-            return ''.join(lazy_pinyin(s)).lower()
-        except Exception:
-            pass
-    return s.lower()
-
-def _ref_sort_key(reference: str) -> Tuple[int, str]:
-    if _contains_cjk(reference):
-        return (0, _chinese_key(reference))
-    return (1, _english_key(reference))
-
-def _sorted_results(summary_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    items = [r for r in summary_results if isinstance(r, dict)]
-    items = [r for r in items if 'reference' in r]
-    return sorted(items, key=lambda r: _ref_sort_key(str(r.get('reference', ''))))
-
-def sort_and_export(summary_results: List[Dict[str, Any]], output_csv_path: str) -> int:
-    sorted_items = _sorted_results(summary_results)
-    os.makedirs(os.path.dirname(output_csv_path) or '.', exist_ok=True)
-    with open(output_csv_path, 'w', newline='', encoding='utf-8-sig') as f:
-        writer = csv.writer(f)
-        writer.writerow(['reference', 'summary'])
-        for r in sorted_items:
-            ref = str(r.get('reference', '')).strip()
-            summ = '' if r.get('summary') is None else str(r.get('summary'))
-            writer.writerow([ref, summ])
-    return len(sorted_items)
-
-def export_from_json(input_json_path: str, output_csv_path: str) -> int:
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config_loader import get_config
+from .export_formats import get_exporter
+from .export_index import SortedExportIndex
+from .logger import logger
+from .reference_parser import load_reference_records, reference_sort_key
+
+# 流式读取 JSON 时每次读入的字符数
+_READ_SIZE = 1 << 20
+_JSON_DECODER = json.JSONDecoder()
+
+# 排序条目：(排序键类别, 排序键文本, 输入序号, 记录)；输入序号保证相同排序键时保持原有顺序，也避免比较到记录本身
+_SortItem = Tuple[int, str, int, Dict[str, Any]]
+
+
+def _ref_sort_key(reference: str, record_keys: Optional[Dict[str, Tuple[int, str]]] = None) -> Tuple[int, str]:
+    if record_keys:
+        key = record_keys.get(reference)
+        if key is not None:
+            return key
+    return reference_sort_key(reference)
+
+def _record_sort_keys(reference_file_path: Optional[str]) -> Dict[str, Tuple[int, str]]:
+    """读取参考文献解析缓存中预先计算好的排序键（参考文献 -> 排序键）"""
+    if not reference_file_path or not os.path.exists(reference_file_path):
+        return {}
+    return {record.raw: tuple(record.sort_key) for record in load_reference_records(reference_file_path)}
+
+def iter_summary_records(input_json_path: str) -> Iterator[Any]:
+    """
+    流式读取总结结果文件，逐条返回记录
+
+    支持 JSON 数组（[{...}, {...}]）和 JSONL（每行一个对象），不会一次性载入整个文件
+
+    Args:
+        input_json_path: 总结结果文件路径
+
+    Returns:
+        记录迭代器
+    """
     with open(input_json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    if not isinstance(data, list):
-        raise ValueError('Input JSON must be a list of objects.')
-    return sort_and_export(data, output_csv_path)
+        buffer = f.read(_READ_SIZE)
+        eof = not buffer
+        pos = 0
+        in_array = None
+        while True:
+            # 跳过空白和数组分隔符
+            while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    break
+                buffer, pos = f.read(_READ_SIZE), 0
+                eof = not buffer
+                continue
+            if in_array is None:
+                in_array = buffer[pos] == '['
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buffer[pos] == ']':
+                break
+            try:
+                value, end = _JSON_DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 记录跨越了读取边界：补充读入后重试
+                chunk = '' if eof else f.read(_READ_SIZE)
+                if not chunk:
+                    raise
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            if end == len(buffer) and not eof and not isinstance(value, (dict, list, str)):
+                # 数字等标量可能在读取边界处被截断
+                chunk = f.read(_READ_SIZE)
+                if chunk:
+                    buffer, pos = buffer[pos:] + chunk, 0
+                    continue
+                eof = True
+            if not in_array and not isinstance(value, dict):
+                raise ValueError('Input JSON must be a list of objects.')
+            yield value
+            pos = end
+
+def _sort_items(records: Iterable[Any],
+                record_keys: Optional[Dict[str, Tuple[int, str]]] = None) -> Iterator[_SortItem]:
+    """为每条有效记录计算一次排序键"""
+    for seq, r in enumerate(records):
+        if not isinstance(r, dict) or 'reference' not in r:
+            continue
+        ref = str(r.get('reference', ''))
+        category, text = _ref_sort_key(ref, record_keys)
+        yield (category, text, seq, r)
+
+def _spill_run(items: List[_SortItem], temp_dir: str, index: int) -> str:
+    """将一个已排序的分段写入临时文件（每行一个 JSON 数组）"""
+    path = os.path.join(temp_dir, f"run_{index:05d}.jsonl")
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write('\n')
+    return path
+
+def _read_run(path: str) -> Iterator[_SortItem]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield tuple(json.loads(line))
+
+def _item_key(item: _SortItem) -> Tuple[int, str, int]:
+    return item[0], item[1], item[2]
+
+def _iter_sorted_items(records: Iterable[Any], reference_file_path: Optional[str] = None,
+                       run_size: Optional[int] = None) -> Iterator[_SortItem]:
+    if run_size is None:
+        run_size = get_config("export.run_size", 10000)
+    run_size = max(1, int(run_size))
+    record_keys = _record_sort_keys(reference_file_path)
+
+    with tempfile.TemporaryDirectory(prefix="export_", dir=get_config("export.temp_dir") or None) as temp_dir:
+        run_paths: List[str] = []
+        run: List[_SortItem] = []
+        for item in _sort_items(records, record_keys):
+            run.append(item)
+            if len(run) >= run_size:
+                run.sort(key=_item_key)
+                run_paths.append(_spill_run(run, temp_dir, len(run_paths)))
+                run = []
+        run.sort(key=_item_key)
+        # 多路归并：每个分段各保留一条在内存中
+        merged = heapq.merge(run, *(_read_run(path) for path in run_paths), key=_item_key) if run_paths else run
+        yield from merged
+
+def iter_sorted_records(records: Iterable[Any], reference_file_path: Optional[str] = None,
+                        run_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    外部排序：按参考文献（中文按拼音在前，英文在后）逐条返回排序后的记录
+
+    Args:
+        records: 总结结果记录（可以是生成器），不含 reference 字段的记录会被跳过
+        reference_file_path: 参考文献列表文件（可选），用于复用解析缓存中的排序键
+        run_size: 每个内存排序分段的记录数，超过后写入临时文件（默认取 export.run_size）
+
+    Returns:
+        排序后的记录迭代器；临时文件在迭代结束后删除
+    """
+    for item in _iter_sorted_items(records, reference_file_path, run_size):
+        yield item[3]
+
+def export_records(records: Iterable[Any], output_path: str,
+                   reference_file_path: Optional[str] = None,
+                   run_size: Optional[int] = None, fmt: str = "csv") -> int:
+    """
+    按参考文献排序后导出为指定格式
+
+    先写入临时文件再原子替换，导出过程中下载到的始终是完整的旧文件
+
+    Args:
+        records: 总结结果记录（可以是生成器）
+        output_path: 输出文件路径
+        reference_file_path: 参考文献列表文件（可选），用于复用解析缓存中的排序键
+        run_size: 每个内存排序分段的记录数（默认取 export.run_size）
+        fmt: 导出格式（csv、xlsx、parquet、markdown）
+
+    Returns:
+        导出的记录数
+    """
+    exporter = get_exporter(fmt)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        count = exporter.write(iter_sorted_records(records, reference_file_path, run_size), tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+def sort_and_export(summary_results: List[Dict[str, Any]], output_csv_path: str,
+                    reference_file_path: Optional[str] = None) -> int:
+    return export_records(summary_results, output_csv_path, reference_file_path)
+
+def export_from_json(input_json_path: str, output_path: str,
+                     reference_file_path: Optional[str] = None,
+                     run_size: Optional[int] = None, fmt: str = "csv") -> int:
+    return export_records(iter_summary_records(input_json_path), output_path,
+                          reference_file_path, run_size, fmt)
+
+def update_sorted_csv(input_json_path: str, output_csv_path: str, index_path: str,
+                      reference_file_path: Optional[str] = None) -> int:
+    """
+    增量更新排序 CSV：只对新增、修改、删除的总结调整索引，并从第一处变化的位置重写 CSV
+
+    索引缺失、与 CSV 不一致或变化超过一半时退回完整导出
+
+    Args:
+        input_json_path: 总结结果文件路径
+        output_csv_path: 输出 CSV 路径
+        index_path: 导出索引路径
+        reference_file_path: 参考文献列表文件（可选），用于复用解析缓存中的排序键
+
+    Returns:
+        CSV 中的记录数
+    """
+    index = SortedExportIndex(index_path)
+    if index.matches(output_csv_path):
+        try:
+            changed, removed, positions = index.diff(iter_summary_records(input_json_path))
+            count = len(positions)
+            if not changed and not removed:
+                return count
+            if len(changed) + len(removed) <= max(1, count // 2):
+                record_keys = _record_sort_keys(reference_file_path)
+                sort_keys = {record_id: _ref_sort_key(str(record.get('reference', '')), record_keys)
+                             for record_id, record in changed.items()}
+                rewritten = index.apply(changed, removed, sort_keys, positions, output_csv_path)
+                logger.info(f"增量更新导出结果: 新增/修改 {len(changed)} 条, 移除 {len(removed)} 条, "
+                            f"重写 {rewritten}/{count} 行")
+                return count
+        except ValueError as e:
+            logger.warning(f"无法增量更新导出结果，将完整导出: {e}")
+
+    items = _iter_sorted_items(iter_summary_records(input_json_path), reference_file_path)
+    return index.rebuild(items, output_csv_path)
 
 if __name__ == "__main__":
     # 测试代码
     test_json_path = 'new_workflow/txts_zsk/literature_summary.json'
     test_csv_path = 'new_workflow/txts_zsk/summary_sorted.csv'
     count = export_from_json(test_json_path, test_csv_path)
-    print(f"导出完成，共 {count} 条记录到 {test_csv_path}")
\ No newline at end of file
+    print(f"导出完成，共 {count} 条记录到 {test_csv_path}")
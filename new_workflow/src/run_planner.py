@@ -0,0 +1,193 @@
+# new_workflow/src/run_planner.py
+"""
+运行规划模块
+在执行文献总结前估算待处理文献的 Token 用量、耗时与费用，并给出建议并发数
+"""
+import math
+import os
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+from .config_loader import get_config
+from .logger import logger
+from .pdf_processor import count_pdf_pages
+from .pdf_to_markdown import load_cached_markdown
+from .summary_generator import load_existing_results, get_hybrid_markdown
+
+# 各提供商分词器的近似比例：每个 CJK 字符的 Token 数、每个 Token 对应的非 CJK 字符数
+_TOKENIZER_RATIOS = {
+    "gemini": {"cjk_tokens_per_char": 0.8, "chars_per_token": 4.0},
+    "gemini_web": {"cjk_tokens_per_char": 0.8, "chars_per_token": 4.0},
+    "openai": {"cjk_tokens_per_char": 1.0, "chars_per_token": 4.0},
+    "zhipu": {"cjk_tokens_per_char": 0.7, "chars_per_token": 4.0},
+}
+
+# Gemini 以 PDF 原文件输入时，每页按固定 Token 计费
+_GEMINI_TOKENS_PER_PDF_PAGE = 258
+# 无 Markdown 缓存时，按每页平均字符数估算文本长度
+_EST_CHARS_PER_PAGE = 3000
+# 每篇总结的输出 Token 估计值（约 1000 字中文）
+_EST_OUTPUT_TOKENS = 1200
+# 无历史记录时每篇文献的默认耗时（秒）
+_DEFAULT_SECONDS_PER_FILE = 60.0
+
+
+def estimate_text_tokens(text_or_length, provider: str, cjk_ratio: Optional[float] = None) -> int:
+    """
+    按提供商分词器的近似比例估算文本 Token 数
+
+    Args:
+        text_or_length: 文本内容，或仅知道长度时传入字符数
+        provider: 提供商名称
+        cjk_ratio: 仅传入长度时使用的 CJK 字符占比（默认 0.5）
+
+    Returns:
+        估算的 Token 数
+    """
+    ratios = _TOKENIZER_RATIOS.get(provider, _TOKENIZER_RATIOS["openai"])
+    if isinstance(text_or_length, str):
+        if provider == "openai":
+            try:
+                import tiktoken
+                return len(tiktoken.get_encoding("o200k_base").encode(text_or_length))
+            except Exception:
+                pass
+        length = len(text_or_length)
+        cjk_count = sum(1 for ch in text_or_length if '\u4e00' <= ch <= '\u9fff')
+    else:
+        length = int(text_or_length)
+        cjk_count = int(length * (0.5 if cjk_ratio is None else cjk_ratio))
+    other_count = length - cjk_count
+    return int(cjk_count * ratios["cjk_tokens_per_char"] + other_count / ratios["chars_per_token"])
+
+
+def _historical_seconds_per_file(valid_results: List[Dict]) -> Tuple[float, int]:
+    """从已有总结结果中统计每篇文献的耗时（取中位数，降低异常值影响）"""
+    samples = [r["elapsed_time"] for r in valid_results
+               if isinstance(r.get("elapsed_time"), (int, float)) and r["elapsed_time"] > 0]
+    if not samples:
+        return _DEFAULT_SECONDS_PER_FILE, 0
+    return float(statistics.median(samples)), len(samples)
+
+
+def _estimate_file(pdf_path: str, provider: str) -> Dict:
+    """估算单个PDF的输入规模"""
+    pages = count_pdf_pages(pdf_path)
+    try:
+        markdown_text = load_cached_markdown(pdf_path)
+    except Exception:
+        markdown_text = None
+
+    if markdown_text is not None:
+        text_chars = len(markdown_text)
+        text_tokens = estimate_text_tokens(markdown_text, provider)
+    else:
+        text_chars = pages * _EST_CHARS_PER_PAGE
+        text_tokens = estimate_text_tokens(text_chars, provider)
+
+    hybrid_markdown = get_hybrid_markdown(pdf_path, provider, markdown_text, pages) \
+        if markdown_text is not None else None
+    if hybrid_markdown is not None:
+        # 混合输入模式：以压缩后的 Markdown 文本代替 PDF
+        input_tokens = estimate_text_tokens(hybrid_markdown, provider)
+    elif provider in ("gemini", "gemini_web"):
+        # 原始 PDF 上传：按页计费
+        input_tokens = pages * _GEMINI_TOKENS_PER_PDF_PAGE
+    else:
+        # 其他提供商先转换为 Markdown 文本再发送
+        input_tokens = text_tokens
+
+    requests = 1
+    if get_config("summary.long_document.enabled", False) and \
+            text_chars > get_config("summary.long_document.threshold_chars", 120000):
+        # 长文献模式：每个片段一次请求 + 一次合并请求，输入改为片段文本
+        window_chars = get_config("summary.long_document.window_chars", 40000)
+        requests = math.ceil(text_chars / window_chars) + 1
+        input_tokens = text_tokens + requests * _EST_OUTPUT_TOKENS
+
+    return {
+        "file_name": os.path.basename(pdf_path),
+        "pages": pages,
+        "markdown_cached": markdown_text is not None,
+        "input_mode": "markdown" if hybrid_markdown is not None else "pdf",
+        "text_chars": text_chars,
+        "input_tokens": input_tokens,
+        "output_tokens": _EST_OUTPUT_TOKENS * requests,
+        "requests": requests,
+    }
+
+
+def plan_summary_run(pdf_files: List[str], reference_mapping: Optional[Dict[str, str]],
+                     summary_save_path: str) -> Dict:
+    """
+    为待处理的文献生成运行计划
+
+    Args:
+        pdf_files: PDF文件路径列表
+        reference_mapping: 文件名到参考文献的映射（为空时视为所有文件都待处理）
+        summary_save_path: 已有总结结果的JSON路径（用于排除已完成文件和统计历史耗时）
+
+    Returns:
+        dict: 包含待处理文件数、Token 估算、预计耗时、费用与建议并发数的计划
+    """
+    provider = (get_config("model.literature_summary.provider") or "zhipu").lower()
+    processed_files, valid_results = load_existing_results(summary_save_path)
+
+    if reference_mapping:
+        candidates = [f for f in pdf_files if reference_mapping.get(os.path.basename(f)) is not None]
+    else:
+        candidates = list(pdf_files)
+    pending = [f for f in candidates if os.path.basename(f) not in processed_files]
+
+    files = [_estimate_file(f, provider) for f in pending]
+    input_tokens = sum(f["input_tokens"] for f in files)
+    output_tokens = sum(f["output_tokens"] for f in files)
+    total_requests = sum(f["requests"] for f in files)
+
+    seconds_per_file, history_samples = _historical_seconds_per_file(valid_results)
+    configured_workers = max(1, int(get_config("concurrency.max_workers", 3)))
+    rpm = get_config("api.requests_per_minute", 0) or 0
+    max_suggested = max(1, int(get_config("planner.max_suggested_workers", 8)))
+
+    # 建议并发数：在不超过每分钟请求上限的前提下尽量提高并发
+    if rpm > 0:
+        suggested_workers = max(1, int(rpm * seconds_per_file / 60))
+    else:
+        suggested_workers = max_suggested
+    suggested_workers = max(1, min(suggested_workers, max_suggested, len(pending) or 1))
+
+    def _eta(workers: int) -> float:
+        if not pending:
+            return 0.0
+        eta = len(pending) * seconds_per_file / workers
+        if rpm > 0:
+            eta = max(eta, total_requests / rpm * 60)
+        return round(eta, 1)
+
+    input_price = get_config("planner.price_per_million_input_tokens", 0) or 0
+    output_price = get_config("planner.price_per_million_output_tokens", 0) or 0
+    estimated_cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    plan = {
+        "provider": provider,
+        "mapping_available": bool(reference_mapping),
+        "pending_count": len(pending),
+        "already_processed": len(processed_files),
+        "total_pages": sum(f["pages"] for f in files),
+        "total_requests": total_requests,
+        "estimated_input_tokens": input_tokens,
+        "estimated_output_tokens": output_tokens,
+        "estimated_total_tokens": input_tokens + output_tokens,
+        "estimated_cost": round(estimated_cost, 4),
+        "seconds_per_file": round(seconds_per_file, 1),
+        "history_samples": history_samples,
+        "requests_per_minute": rpm,
+        "configured_workers": configured_workers,
+        "suggested_workers": suggested_workers,
+        "eta_seconds": _eta(configured_workers),
+        "eta_seconds_suggested": _eta(suggested_workers),
+        "files": files,
+    }
+    logger.info(f"运行计划: 待处理 {plan['pending_count']} 篇, 约 {plan['estimated_total_tokens']} Tokens, "
+                f"预计耗时 {plan['eta_seconds']:.0f}s (并发 {configured_workers}), 建议并发 {suggested_workers}")
+    return plan
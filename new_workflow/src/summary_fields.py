@@ -0,0 +1,269 @@
+# new_workflow/src/summary_fields.py
+"""
+总结结构化字段与列式存储
+按总结提示词规定的六个部分（研究问题、研究方法、核心发现、理论基础、关联性、局限性）
+将 Markdown 总结解析为字段，并识别研究类型；解析结果按列分别存储，
+按研究类型筛选或只导出某一列时只需读取相应的列，无需重新解析全部总结
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .logger import logger
+from .utils import atomic_write_json
+
+# 解析规则变化时递增，使已有列存储重新解析
+PARSER_VERSION = 1
+
+# (字段名, 小节标题关键词)；与 prompts.get_summary_prompt 中的六个部分一一对应
+SUMMARY_SECTIONS = (
+    ("research_question", ("文献核心信息", "核心信息", "研究问题", "研究目的")),
+    ("method", ("研究方法", "研究设计")),
+    ("findings", ("核心发现", "主要发现", "主要论点", "研究发现")),
+    ("theory", ("理论基础", "理论框架", "理论视角")),
+    ("relevance", ("关联性", "应用价值")),
+    ("limitations", ("局限", "启发")),
+)
+SECTION_FIELDS = tuple(name for name, _ in SUMMARY_SECTIONS)
+STORE_COLUMNS = ("file_name", "reference", "method_type") + SECTION_FIELDS
+
+# (研究类型, 关键词)，按顺序匹配，混合方法优先
+_METHOD_TYPES = (
+    ("混合方法", ("混合",)),
+    ("文献分析", ("文献分析", "文献综述", "综述", "元分析", "meta")),
+    ("个案研究", ("个案", "案例")),
+    ("定量", ("定量", "量化", "实证", "问卷", "回归", "计量", "实验")),
+    ("定性", ("定性", "质性", "访谈", "扎根", "民族志")),
+)
+# 带编号或 Markdown 标题标记的行才可能是小节标题（排除以 * / - 开头的列表项）
+_HEADING = re.compile(r'^\s*(?:#{1,6}\s*)?(?:\*\*|__)?\s*(?:\d{1,2}|[一二三四五六])\s*[.、．)）]|^\s*#{1,6}\s')
+_MARKUP = re.compile(r'[#*_`>]|^\s*(?:\d{1,2}|[一二三四五六])\s*[.、．)）]')
+_METHOD_TYPE_LINE = re.compile(r'研究类型\s*[:：]?\s*(?:\*\*|__)?\s*[:：]?\s*(.+)')
+_RULE = re.compile(r'^\s*(?:-{3,}|\*{3,}|_{3,})\s*$')
+# 小节标题去除标记后的最大长度（更长的行视为正文）
+_MAX_HEADING_LENGTH = 30
+
+
+def _section_of(line: str) -> Optional[str]:
+    """判断一行是否为小节标题，是则返回对应的字段名"""
+    if not _HEADING.match(line):
+        return None
+    text = _MARKUP.sub('', line).strip().rstrip(':：')
+    if not text or len(text) > _MAX_HEADING_LENGTH:
+        return None
+    for name, keywords in SUMMARY_SECTIONS:
+        if any(keyword in text for keyword in keywords):
+            return name
+    return None
+
+
+def classify_method_type(method_text: str) -> Optional[str]:
+    """
+    从研究方法部分识别研究类型
+
+    Args:
+        method_text: 研究方法部分的文本
+
+    Returns:
+        定性、定量、混合方法、文献分析、个案研究之一；无法识别时返回“其他”，没有内容时返回 None
+    """
+    if not method_text:
+        return None
+    match = _METHOD_TYPE_LINE.search(method_text)
+    text = (match.group(1) if match else method_text).lower()
+    for method_type, keywords in _METHOD_TYPES:
+        if any(keyword in text for keyword in keywords):
+            return method_type
+    return "其他"
+
+
+def parse_summary(summary: str) -> Dict[str, Optional[str]]:
+    """
+    将 Markdown 总结解析为结构化字段
+
+    Args:
+        summary: 大模型生成的总结文本
+
+    Returns:
+        {字段名: 内容}，包含 SECTION_FIELDS 中的六个字段（未出现的部分为空字符串）和 method_type
+    """
+    sections: Dict[str, List[str]] = {name: [] for name in SECTION_FIELDS}
+    current = None
+    for line in (summary or "").splitlines():
+        section = _section_of(line)
+        if section is not None:
+            current = section
+            continue
+        if current is not None and not _RULE.match(line):
+            sections[current].append(line)
+    fields: Dict[str, Optional[str]] = {name: "\n".join(lines).strip() for name, lines in sections.items()}
+    fields["method_type"] = classify_method_type(fields["method"])
+    return fields
+
+
+def _digest(record: Dict[str, Any]) -> str:
+    text = json.dumps([record.get("reference"), record.get("summary")], ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class SummaryColumnStore:
+    """
+    总结字段的列式存储
+
+    目录结构：meta.json 保存行标识（文件名）、内容指纹和写入版本号，每个字段一个 JSON 文件，
+    行顺序与总结结果文件一致；读取某一列只加载该列的文件
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.ids: List[str] = []
+        self.digests: List[str] = []
+        self.generation = 0
+        self._columns: Dict[str, List[Any]] = {}
+        self._corrupt = False
+        self._load_meta()
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.store_dir, f"{name}.json")
+
+    def _load_meta(self):
+        meta_path = os.path.join(self.store_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") == PARSER_VERSION:
+                self.ids, self.digests = meta["ids"], meta["digests"]
+                self.generation = meta.get("generation", 0)
+        except Exception as e:
+            logger.warning(f"读取总结列存储失败，将重新解析: {e}")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def column(self, name: str) -> List[Any]:
+        """
+        读取一列
+
+        Args:
+            name: 列名（见 STORE_COLUMNS）
+
+        Returns:
+            与行顺序一致的值列表
+        """
+        if name not in STORE_COLUMNS:
+            raise ValueError(f"未知的列: {name}（可选: {', '.join(STORE_COLUMNS)}）")
+        if name not in self._columns:
+            values: List[Any] = []
+            if self.ids:
+                try:
+                    with open(self._column_path(name), "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    if data.get("generation") == self.generation:
+                        values = data["values"]
+                except Exception as e:
+                    logger.warning(f"读取总结列 {name} 失败: {e}")
+            if len(values) != len(self.ids):
+                self._corrupt = True
+                values = [None] * len(self.ids)
+            self._columns[name] = values
+        return self._columns[name]
+
+    def update(self, records: Iterable[Any]) -> int:
+        """
+        按总结结果更新列存储：内容未变化的行复用已有字段，只解析新增或修改的总结
+
+        Args:
+            records: 总结结果记录（可以是生成器）
+
+        Returns:
+            本次解析的总结数
+        """
+        existing = {(record_id, digest): i for i, (record_id, digest) in enumerate(zip(self.ids, self.digests))}
+        old_columns = {name: self.column(name) for name in STORE_COLUMNS} if existing else {}
+        if self._corrupt:
+            # 列文件损坏或与元数据不一致时全部重新解析
+            existing, self._corrupt = {}, False
+        columns: Dict[str, List[Any]] = {name: [] for name in STORE_COLUMNS}
+        ids: List[str] = []
+        digests: List[str] = []
+        parsed = 0
+        for record in records:
+            if not isinstance(record, dict) or not record.get("summary"):
+                continue
+            record_id = str(record.get("file_name") or record.get("reference"))
+            digest = _digest(record)
+            old = existing.get((record_id, digest))
+            if old is not None:
+                for name in STORE_COLUMNS:
+                    columns[name].append(old_columns[name][old])
+            else:
+                fields = parse_summary(str(record["summary"]))
+                fields["file_name"] = record.get("file_name")
+                fields["reference"] = None if record.get("reference") is None else str(record["reference"]).strip()
+                for name in STORE_COLUMNS:
+                    columns[name].append(fields.get(name))
+                parsed += 1
+            ids.append(record_id)
+            digests.append(digest)
+
+        if parsed == 0 and ids == self.ids:
+            return 0
+        generation = self.generation + 1
+        for name, values in columns.items():
+            atomic_write_json(self._column_path(name), {"generation": generation, "values": values}, indent=None)
+        # 元数据最后写入：中途失败时列文件与元数据的版本号不一致，读取时会被视为无效
+        atomic_write_json(os.path.join(self.store_dir, "meta.json"),
+                          {"version": PARSER_VERSION, "generation": generation, "ids": ids, "digests": digests},
+                          indent=None)
+        self.ids, self.digests, self._columns, self.generation = ids, digests, columns, generation
+        return parsed
+
+    def filter_rows(self, method_type: Optional[str] = None, keyword: Optional[str] = None,
+                    keyword_column: str = "findings") -> List[int]:
+        """
+        按列条件筛选行
+
+        Args:
+            method_type: 研究类型（精确匹配）
+            keyword: 关键词（在 keyword_column 列中包含匹配，不区分大小写）
+            keyword_column: 关键词检索的列
+
+        Returns:
+            符合条件的行号列表
+        """
+        rows = range(len(self.ids))
+        if method_type:
+            types = self.column("method_type")
+            rows = [i for i in rows if types[i] == method_type]
+        if keyword:
+            keyword = keyword.lower()
+            texts = self.column(keyword_column)
+            rows = [i for i in rows if texts[i] and keyword in texts[i].lower()]
+        return list(rows)
+
+    def select(self, columns: Sequence[str], rows: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """
+        读取指定列的若干行
+
+        Args:
+            columns: 列名列表
+            rows: 行号列表（默认全部行）
+
+        Returns:
+            每行一个 {列名: 值} 字典
+        """
+        data = {name: self.column(name) for name in columns}
+        rows = range(len(self.ids)) if rows is None else rows
+        return [{name: data[name][i] for name in columns} for i in rows]
+
+    def method_type_counts(self) -> Dict[str, int]:
+        """各研究类型的文献数"""
+        counts: Dict[str, int] = {}
+        for method_type in self.column("method_type"):
+            key = method_type or "未识别"
+            counts[key] = counts.get(key, 0) + 1
+        return counts
@@ -2,6 +2,7 @@
 """文献摘要生成模块"""
 import json
 import os
+import re
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Set, Tuple
@@ -9,10 +10,18 @@ from tqdm import tqdm
 from .llm_client import LLMClient
 from .config_loader import get_config
 from .logger import logger
+from .long_document import (ERROR_PREFIXES, is_long_document_enabled, may_need_map_reduce,
+                            needs_map_reduce, summarize_long_document)
+from .prompts import wrap_document_text
 
 # 用于保护文件写入的锁
 file_lock = threading.Lock()
 
+# 支持以 Markdown 文本代替 PDF 原文件输入的提供商
+HYBRID_PROVIDERS = {"gemini", "gemini_web"}
+# 图表标题行（用于识别图表密集型文献）
+_FIGURE_CAPTION = re.compile(r'^\s*(\*\*)?\s*(fig\.?|figure|图)\s*\d+', re.IGNORECASE | re.MULTILINE)
+
 def load_existing_results(output_file_path: str) -> Tuple[Set[str], List[Dict]]:
     """
     加载已有的JSON结果文件，返回已处理成功的文献文件名集合和有效结果列表
@@ -44,6 +53,81 @@ def load_existing_results(output_file_path: str) -> Tuple[Set[str], List[Dict]]:
     
     return processed_files, valid_results
 
+def _create_summary_client() -> LLMClient:
+    """按 model.literature_summary 配置创建总结用的 LLMClient"""
+    return LLMClient(provider=get_config("model.literature_summary.provider"), 
+                     model=get_config("model.literature_summary.model_name"),
+                     temperature=get_config("model.literature_summary.temperature"))
+
+def _load_long_markdown(pdf_file_path: str) -> Optional[str]:
+    """
+    长文献模式下获取文档 Markdown，仅当长度超过阈值时返回
+
+    优先使用 Markdown 缓存；没有缓存时先按页数预判，只转换页数足以超过阈值的文献
+    """
+    from .pdf_processor import count_pdf_pages
+    from .pdf_to_markdown import convert_pdf_to_markdown, load_cached_markdown
+    try:
+        markdown_text = load_cached_markdown(pdf_file_path)
+    except Exception:
+        markdown_text = None
+    if markdown_text is not None:
+        return markdown_text if needs_map_reduce(markdown_text) else None
+    if not may_need_map_reduce(count_pdf_pages(pdf_file_path)):
+        return None
+    try:
+        markdown_text = convert_pdf_to_markdown(pdf_file_path)
+    except Exception as e:
+        logger.warning(f"长文献检测时转换 Markdown 失败，按普通模式处理 ({os.path.basename(pdf_file_path)}): {e}")
+        return None
+    return markdown_text if needs_map_reduce(markdown_text) else None
+
+def get_hybrid_markdown(pdf_file_path: str, provider: str, markdown_text: Optional[str] = None,
+                        pages: Optional[int] = None) -> Optional[str]:
+    """
+    混合输入模式：当缓存中已有高质量 Markdown 时，返回用于代替 PDF 原文件的文本
+    
+    扫描件、文本密度过低或图表密集的文献返回 None，仍按 PDF 原文件上传
+    
+    Args:
+        pdf_file_path: PDF文件路径
+        provider: 当前总结使用的提供商
+        markdown_text: 调用方已读取的 Markdown 缓存（省略时读取缓存）
+        pages: 调用方已统计的页数（省略时统计）
+        
+    Returns:
+        可直接发送的 Markdown 文本（按配置压缩），不满足条件时返回 None
+    """
+    if get_config("summary.input_mode", "pdf") != "hybrid" or provider not in HYBRID_PROVIDERS:
+        return None
+    
+    from .pdf_processor import count_pdf_pages
+    from .pdf_to_markdown import load_cached_markdown, compact_markdown
+    if markdown_text is None:
+        try:
+            markdown_text = load_cached_markdown(pdf_file_path)
+        except Exception as e:
+            logger.warning(f"读取 Markdown 缓存失败 ({os.path.basename(pdf_file_path)}): {e}")
+            return None
+    if not markdown_text:
+        return None
+    
+    if pages is None:
+        pages = count_pdf_pages(pdf_file_path)
+    min_chars_per_page = get_config("summary.hybrid.min_chars_per_page", 1200)
+    max_figures_per_page = get_config("summary.hybrid.max_figures_per_page", 0.5)
+    
+    if len(markdown_text) / pages < min_chars_per_page:
+        logger.debug(f"{os.path.basename(pdf_file_path)} 文本密度过低，可能是扫描件，使用 PDF 输入")
+        return None
+    if len(_FIGURE_CAPTION.findall(markdown_text)) / pages > max_figures_per_page:
+        logger.debug(f"{os.path.basename(pdf_file_path)} 图表较多，使用 PDF 输入")
+        return None
+    
+    if get_config("summary.hybrid.compact", True):
+        markdown_text = compact_markdown(markdown_text)
+    return markdown_text
+
 def process_single_pdf(pdf_file_path: str, prompt_text: str, 
                       reference_mapping: Dict[str, str]) -> Optional[Dict]:
     """
@@ -63,9 +147,7 @@ def process_single_pdf(pdf_file_path: str, prompt_text: str,
     # 每个线程需要独立的 LLMClient 实例（如果是基于 requests 的可能是线程安全的，但为了安全起见）
     # 大多数 HTTP 客户端实现都是线程安全的，这里假设 LLMClient 是安全的。
     # 实际上，requests Session 是线程安全的。
-    llm = LLMClient(provider=get_config("model.literature_summary.provider"), 
-                    model=get_config("model.literature_summary.model_name"),
-                    temperature=get_config("model.literature_summary.temperature"))
+    llm = _create_summary_client()
     file_name = os.path.basename(pdf_file_path)
     
     # 检查是否有对应的参考文献
@@ -81,12 +163,31 @@ def process_single_pdf(pdf_file_path: str, prompt_text: str,
     
     # 生成摘要
     try:
-        summary_text = llm.generate(prompt=prompt_text, file_path=pdf_file_path)
+        long_markdown = _load_long_markdown(pdf_file_path) if is_long_document_enabled() else None
+        if long_markdown is not None:
+            # 长文献：分段并发提取要点后合并
+            outcome = summarize_long_document(
+                long_markdown, prompt_text, file_name,
+                client_factory=_create_summary_client,
+                model_id=f"{llm.provider}/{llm.model}"
+            )
+            summary_text = outcome["summary"]
+            result_entry["input_mode"] = "map_reduce"
+            result_entry["window_count"] = outcome["window_count"]
+        else:
+            hybrid_markdown = get_hybrid_markdown(pdf_file_path, llm.provider)
+            if hybrid_markdown is not None:
+                # 混合输入：以缓存的 Markdown 文本代替 PDF 原文件
+                summary_text = llm.generate(prompt=prompt_text + wrap_document_text(file_name, hybrid_markdown))
+                result_entry["input_mode"] = "markdown"
+            else:
+                summary_text = llm.generate(prompt=prompt_text, file_path=pdf_file_path)
+                result_entry["input_mode"] = "pdf"
         result_entry["summary"] = summary_text
         
         # 错误检查
-        if summary_text.startswith("Error") or summary_text.startswith("LLM Generation Error"):
-            result_entry["error"] = summary_text
+        if not summary_text or summary_text.startswith(ERROR_PREFIXES):
+            result_entry["error"] = summary_text or "空响应"
             
     except Exception as e:
         result_entry["error"] = str(e)
@@ -1,33 +1,313 @@
+# new_workflow/src/task_manager.py
+"""
+任务管理器
+管理后台作业（文献映射、总结、导出等）的注册、状态与进度，并通过 SSE 广播消息；
+每个作业有独立的 ID、状态机和进度，监听者可只订阅某个作业的事件，完成的作业记录持久化到磁盘
+"""
+import asyncio
+import itertools
 import threading
-import queue
 import json
+import os
 import time
-from typing import Dict, Any, Generator
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Generator, List, Optional
+
+from .config_loader import get_config
+from .logger import logger
+from .utils import atomic_write_json
+
+# 作业状态机：pending -> running -> succeeded / failed
+JOB_TRANSITIONS = {
+    "pending": {"running", "failed"},
+    "running": {"succeeded", "failed"},
+    "succeeded": set(),
+    "failed": set(),
+}
+ACTIVE_STATES = {"pending", "running"}
+
+
+class JobConflictError(RuntimeError):
+    """同类作业正在运行"""
+
+    def __init__(self, job: "Job"):
+        super().__init__(f"已有{job.kind}作业正在运行: {job.id}")
+        self.job = job
+
+
+@dataclass
+class Job:
+    """后台作业"""
+    id: str
+    kind: str
+    state: str = "pending"
+    current: int = 0
+    total: int = 0
+    message: str = ""
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class Event:
+    """一条 SSE 事件；编码后的文本在创建时生成一次，所有监听者共用"""
+    id: int
+    event: Optional[str]
+    data: str
+    job_id: Optional[str] = None
+    epoch: str = ""
+    sse: str = ""
+
+    def __post_init__(self):
+        if not self.sse:
+            msg = f"data: {self.data}\n\n"
+            if self.event:
+                msg = f"event: {self.event}\n{msg}"
+            self.sse = f"id: {self.epoch}-{self.id}\n{msg}"
+
+
+class Listener:
+    """
+    单个 SSE 连接的待发送事件
+
+    进度事件按作业合并，只保留最新一条；其他事件按顺序排队。
+    排队事件超过上限时标记为溢出，由连接端结束响应，客户端带 Last-Event-ID 重连后从回放缓冲补齐
+    """
+
+    def __init__(self, job_id: Optional[str] = None, backlog: int = 1000,
+                 on_put: Optional[Callable[[], None]] = None):
+        self.job_id = job_id
+        self.backlog = backlog
+        self.overflowed = False
+        self._events: deque = deque()
+        self._progress: Dict[Optional[str], Event] = {}
+        self._cond = threading.Condition()
+        # 有新事件时的额外通知（异步连接用来唤醒事件循环中的协程）
+        self._on_put = on_put
+
+    def wants(self, event: Event) -> bool:
+        return self.job_id is None or event.job_id is None or event.job_id == self.job_id
+
+    def put(self, event: Event):
+        with self._cond:
+            if event.event == 'progress':
+                # 慢速连接只需要最新进度
+                self._progress[event.job_id] = event
+            elif len(self._events) >= self.backlog:
+                self.overflowed = True
+            else:
+                self._events.append(event)
+            self._cond.notify()
+        if self._on_put is not None:
+            self._on_put()
+
+    def _pop(self) -> Optional[Event]:
+        if self.overflowed:
+            return None
+        progress = min(self._progress.values(), key=lambda e: e.id, default=None)
+        if self._events and (progress is None or self._events[0].id < progress.id):
+            return self._events.popleft()
+        if progress is None:
+            return None
+        del self._progress[progress.job_id]
+        return progress
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """
+        取出下一条事件（按事件 ID 顺序）
+
+        Returns:
+            事件；超时或已溢出时返回 None
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._events or self._progress or self.overflowed, timeout):
+                return None
+            return self._pop()
+
+    def get_nowait(self) -> Optional[Event]:
+        """不等待地取出下一条事件；没有事件或已溢出时返回 None"""
+        with self._cond:
+            return self._pop()
+
+
+class ListenerLimitError(RuntimeError):
+    """SSE 连接数已达上限"""
+
 
 class MessageAnnouncer:
     """SSE 消息广播器"""
-    def __init__(self):
-        self.listeners = []
+    def __init__(self, backlog: int = 1000, max_listeners: int = 0):
+        # 按注册顺序保存；用字典使注销为 O(1)（异步模式下可能有数千个连接）
+        self.listeners: Dict[Listener, None] = {}
+        self.backlog = backlog
+        self.max_listeners = max_listeners
         self.lock = threading.Lock()
+        self._counters = {"opened": 0, "closed": 0, "overflowed": 0, "rejected": 0, "peak": 0}
+
+    def listen(self, job_id: Optional[str] = None, on_put: Optional[Callable[[], None]] = None) -> Listener:
+        """
+        注册监听者；指定 job_id 时只接收该作业的事件（以及不属于任何作业的全局事件）
 
-    def listen(self):
-        q = queue.Queue(maxsize=10)
+        Raises:
+            ListenerLimitError: 监听者数量已达 max_listeners
+        """
+        listener = Listener(job_id, self.backlog, on_put)
         with self.lock:
-            self.listeners.append(q)
-        return q
+            if self.max_listeners and len(self.listeners) >= self.max_listeners:
+                self._counters["rejected"] += 1
+                raise ListenerLimitError(f"SSE 连接数已达上限 {self.max_listeners}")
+            self.listeners[listener] = None
+            self._counters["opened"] += 1
+            self._counters["peak"] = max(self._counters["peak"], len(self.listeners))
+        return listener
 
-    def announce(self, msg: str):
+    def remove(self, listener: Listener):
+        """注销监听者（重复调用无影响）"""
         with self.lock:
-            for i in reversed(range(len(self.listeners))):
+            if self.listeners.pop(listener, False) is None:
+                self._counters["closed"] += 1
+                if listener.overflowed:
+                    self._counters["overflowed"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        监听者统计
+
+        Returns:
+            当前连接数、按作业统计的连接数（全部作业记为 "*"）、峰值，
+            以及累计建立、关闭、因积压断开和因达到上限被拒绝的连接数
+        """
+        with self.lock:
+            by_job: Dict[str, int] = {}
+            for listener in self.listeners:
+                key = listener.job_id or "*"
+                by_job[key] = by_job.get(key, 0) + 1
+            return {"listeners": len(self.listeners), "max_listeners": self.max_listeners,
+                    "by_job": by_job, **self._counters}
+
+    def announce(self, event: Event):
+        with self.lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            if listener.wants(event):
+                listener.put(event)
+
+
+class EventStream:
+    """
+    SSE 响应体
+
+    先发送回放事件，再推送实时事件，空闲超过 heartbeat 秒时发送心跳注释。
+    心跳使断开的连接在下一次写入时被服务器发现；WSGI 服务器结束响应（包括客户端断开）时调用 close，
+    监听者随之注销，即使响应从未开始迭代也不会泄漏
+    """
+
+    def __init__(self, announcer: MessageAnnouncer, listener: Listener, replay: List[Event], heartbeat: float):
+        self._announcer = announcer
+        self._listener = listener
+        self._gen = self._generate(replay, heartbeat)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._gen)
+
+    def close(self):
+        self._gen.close()
+        self._announcer.remove(self._listener)
+
+    def _generate(self, replay: List[Event], heartbeat: float) -> Generator[str, None, None]:
+        try:
+            sent = 0
+            for event in replay:
+                sent = event.id
+                yield event.sse
+            while True:
+                event = self._listener.get(timeout=heartbeat or None)
+                if event is None:
+                    if self._listener.overflowed:
+                        logger.info("SSE 连接积压过多事件，结束响应等待客户端重连")
+                        return
+                    yield ": keep-alive\n\n"
+                elif event.id > sent:
+                    # 先注册再读取回放缓冲，两者之间发布的事件按 ID 去重
+                    sent = event.id
+                    yield event.sse
+        finally:
+            self._announcer.remove(self._listener)
+
+
+class AsyncEventStream:
+    """
+    异步 SSE 响应体（ASGI 模式）
+
+    与 EventStream 行为相同，但等待事件时不占用线程：发布线程通过 call_soon_threadsafe 唤醒事件循环中的协程，
+    空闲连接只是一个挂起的协程。必须在事件循环中创建；响应结束时由调用方调用 close 注销监听者
+    """
+
+    def __init__(self, announcer: MessageAnnouncer, job_id: Optional[str],
+                 replay: Callable[[], List[Event]], heartbeat: float):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._announcer = announcer
+        self._heartbeat = heartbeat
+        # 先注册再读取回放缓冲，两者之间发布的事件按 ID 去重
+        self._listener = announcer.listen(job_id, on_put=self._notify)
+        self._replay = replay()
+
+    def _notify(self):
+        # 在发布线程中调用
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def __aiter__(self):
+        return self._generate()
+
+    def close(self):
+        self._announcer.remove(self._listener)
+
+    async def _generate(self):
+        try:
+            sent = 0
+            for event in self._replay:
+                sent = event.id
+                yield event.sse
+            while True:
+                # 先清除唤醒标记再取事件，取空后再发布的事件一定会重新唤醒
+                self._wakeup.clear()
+                event = self._listener.get_nowait()
+                while event is not None:
+                    if event.id > sent:
+                        sent = event.id
+                        yield event.sse
+                    event = self._listener.get_nowait()
+                if self._listener.overflowed:
+                    logger.info("SSE 连接积压过多事件，结束响应等待客户端重连")
+                    return
                 try:
-                    self.listeners[i].put_nowait(msg)
-                except queue.Full:
-                    del self.listeners[i]
+                    await asyncio.wait_for(self._wakeup.wait(), self._heartbeat or None)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.close()
+
 
 class TaskManager:
     """
     任务管理器
-    负责管理全局进度状态和通过 SSE 广播消息
+    负责管理作业注册表、每个作业的进度状态，并通过 SSE 广播消息
     """
     _instance = None
     _lock = threading.Lock()
@@ -43,14 +323,43 @@ class TaskManager:
     def __init__(self):
         if getattr(self, "_initialized", False):
             return
-            
-        self.announcer = MessageAnnouncer()
+
+        self.announcer = MessageAnnouncer(backlog=get_config("tasks.listener_backlog", 1000),
+                                          max_listeners=get_config("tasks.max_listeners", 100))
+        self.heartbeat_interval = get_config("tasks.heartbeat_interval", 15)
+        # 事件 ID 为 "{进程纪元}-{序号}"；服务重启后纪元变化，客户端带旧 ID 重连时回放全部缓冲事件
+        self.epoch = uuid.uuid4().hex[:8]
+        self._event_ids = itertools.count(1)
+        self._replay_lock = threading.Lock()
+        self.replay_size = get_config("tasks.replay_size", 200)
+        self.replay_jobs = get_config("tasks.replay_jobs", 50)
+        # 每个作业一个环形缓冲（按最近使用淘汰），不属于作业的事件共用一个；
+        # 进度事件不进入环形缓冲，每个作业只保留最新一条，避免频繁的进度挤掉状态事件
+        self._replay: "OrderedDict[str, deque]" = OrderedDict()
+        self._replay_global: deque = deque(maxlen=self.replay_size)
+        self._replay_progress: Dict[Optional[str], Event] = {}
+        # 后台发布线程：工作线程只登记事件，JSON 编码与分发都在发布线程中完成；
+        # 进度按作业合并，每个作业每秒最多发布 progress_rate 条
+        rate = get_config("tasks.progress_rate", 5)
+        self.progress_interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._publish_cond = threading.Condition()
+        self._outbox: deque = deque()
+        self._pending_progress: Dict[Optional[str], Dict[str, Any]] = {}
+        self._progress_sent_at: Dict[Optional[str], float] = {}
+        self._publishing = False
+        self._publisher: Optional[threading.Thread] = None
+        # 最近一次进度（兼容不区分作业的 /get-progress）
         self.progress = {
             "current": 0,
             "total": 0,
             "last_item": "等待中..."
         }
         self.lock = threading.Lock()
+        self.jobs: Dict[str, Job] = {}
+        self.history_path = get_config("paths.job_history", "new_workflow/cache/job_history.json")
+        self.history_size = get_config("tasks.history_size", 200)
+        self.history: List[Dict[str, Any]] = self._load_history()
+        self._history_lock = threading.Lock()
         self._initialized = True
 
     def format_sse(self, data: str, event=None) -> str:
@@ -59,36 +368,338 @@ class TaskManager:
             msg = f"event: {event}\n{msg}"
         return msg
 
+    # ---------- 事件发布与回放 ----------
+
+    def _publish(self, event_name: str, data: str, job_id: Optional[str] = None) -> Event:
+        """分配事件 ID、写入回放缓冲并广播"""
+        with self._replay_lock:
+            event = Event(next(self._event_ids), event_name, data, job_id, self.epoch)
+            if job_id is None:
+                buffer = self._replay_global
+            else:
+                buffer = self._replay.get(job_id)
+                if buffer is None:
+                    buffer = self._replay[job_id] = deque(maxlen=self.replay_size)
+                    while len(self._replay) > self.replay_jobs:
+                        evicted, _ = self._replay.popitem(last=False)
+                        self._replay_progress.pop(evicted, None)
+                else:
+                    self._replay.move_to_end(job_id)
+            if event_name == 'progress':
+                self._replay_progress[job_id] = event
+            else:
+                buffer.append(event)
+        self.announcer.announce(event)
+        return event
+
+    def _enqueue(self, event_name: str, data: Dict[str, Any], job_id: Optional[str] = None):
+        """登记待发布的事件，立即返回；进度事件只保留每个作业最新的一条"""
+        with self._publish_cond:
+            if event_name == 'progress':
+                self._pending_progress[job_id] = data
+            else:
+                # 先发出该作业尚未发布的进度，保证最终进度在完成等事件之前
+                pending = self._pending_progress.pop(job_id, None)
+                if pending is not None:
+                    self._outbox.append(('progress', pending, job_id))
+                if event_name == 'job' and data.get('state') not in ACTIVE_STATES:
+                    self._progress_sent_at.pop(job_id, None)
+                self._outbox.append((event_name, data, job_id))
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._publish_loop, name="sse-publisher", daemon=True)
+                self._publisher.start()
+            self._publish_cond.notify_all()
+
+    def _take_batch(self) -> List[tuple]:
+        """在 _publish_cond 下等待并取出可发布的事件（到期的进度与其他事件）"""
+        while True:
+            now = time.monotonic()
+            for job_id in list(self._pending_progress):
+                if now - self._progress_sent_at.get(job_id, float("-inf")) >= self.progress_interval:
+                    self._outbox.append(('progress', self._pending_progress.pop(job_id), job_id))
+                    self._progress_sent_at[job_id] = now
+            if self._outbox:
+                batch = list(self._outbox)
+                self._outbox.clear()
+                return batch
+            timeout = None
+            if self._pending_progress:
+                timeout = min(self._progress_sent_at[job_id] + self.progress_interval
+                              for job_id in self._pending_progress) - now
+            self._publish_cond.wait(timeout)
+
+    def _publish_loop(self):
+        while True:
+            with self._publish_cond:
+                batch = self._take_batch()
+                self._publishing = True
+            for event_name, data, job_id in batch:
+                try:
+                    self._publish(event_name, json.dumps(data), job_id)
+                except Exception as e:
+                    logger.error(f"发布 SSE 事件 {event_name} 失败: {e}", exc_info=True)
+            with self._publish_cond:
+                self._publishing = False
+                self._publish_cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已登记的事件全部发布（包括尚未到期的进度）
+
+        Returns:
+            超时前全部发布完成时返回 True
+        """
+        with self._publish_cond:
+            for job_id, data in self._pending_progress.items():
+                self._outbox.append(('progress', data, job_id))
+            self._pending_progress.clear()
+            self._publish_cond.notify_all()
+            return self._publish_cond.wait_for(
+                lambda: not self._outbox and not self._publishing, timeout)
+
+    def _parse_event_id(self, last_event_id: Optional[str]) -> int:
+        """将 Last-Event-ID 转为本进程的事件序号；无法识别或来自之前的进程时返回 0（回放全部）"""
+        if not last_event_id:
+            return 0
+        epoch, _, seq = last_event_id.strip().rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return 0
+        return int(seq)
+
+    def replay(self, last_event_id: Optional[str] = None, job_id: Optional[str] = None) -> List[Event]:
+        """
+        返回回放缓冲中晚于 last_event_id 的事件
+
+        Args:
+            last_event_id: 客户端最后收到的事件 ID（SSE 的 Last-Event-ID）
+            job_id: 只回放该作业的事件（以及全局事件）；为 None 时回放全部
+
+        Returns:
+            按事件 ID 排序的事件；每个作业的进度只包含最新一条
+        """
+        after = self._parse_event_id(last_event_id)
+        with self._replay_lock:
+            if job_id is None:
+                buffers = [self._replay_global, *self._replay.values(), self._replay_progress.values()]
+            else:
+                progress = [e for key, e in self._replay_progress.items() if key in (None, job_id)]
+                buffers = [self._replay_global, self._replay.get(job_id, ()), progress]
+            events = [event for buffer in buffers for event in buffer if event.id > after]
+        events.sort(key=lambda e: e.id)
+        return events
+
+    # ---------- 作业注册表 ----------
+
+    def _load_history(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.history_path):
+            return []
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+            return history if isinstance(history, list) else []
+        except Exception as e:
+            logger.warning(f"读取作业历史失败: {e}")
+            return []
+
+    def _save_history(self):
+        with self.lock:
+            history = list(self.history)
+        with self._history_lock:
+            try:
+                atomic_write_json(self.history_path, history, indent=None)
+            except Exception as e:
+                logger.warning(f"保存作业历史失败: {e}")
+
+    def _announce_job(self, job: Job):
+        data = {"job_id": job.id, "kind": job.kind, "state": job.state,
+                "result": job.result, "error": job.error}
+        self._enqueue('job', data, job.id)
+
+    def _transition(self, job_id: str, state: str) -> Job:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise KeyError(f"作业不存在或已结束: {job_id}")
+            if state not in JOB_TRANSITIONS[job.state]:
+                raise ValueError(f"作业 {job_id} 不能从 {job.state} 转为 {state}")
+            job.state = state
+            now = time.time()
+            if state == "running":
+                job.started_at = now
+            elif state not in ACTIVE_STATES:
+                job.finished_at = now
+                del self.jobs[job_id]
+                self.history.append(job.to_dict())
+                del self.history[:-self.history_size]
+        if state not in ACTIVE_STATES:
+            self._save_history()
+        self._announce_job(job)
+        return job
+
+    def _is_active(self, job_id: str) -> bool:
+        """作业是否尚未结束"""
+        with self.lock:
+            return job_id in self.jobs
+
+    def create_job(self, kind: str, exclusive: bool = True) -> Job:
+        """
+        注册新作业
+
+        Args:
+            kind: 作业类型（mapping、summary、export 等）
+            exclusive: 同类作业是否互斥（同类作业通常读写同一批文件）
+
+        Returns:
+            处于 pending 状态的作业
+
+        Raises:
+            JobConflictError: exclusive 为 True 且已有同类作业未结束
+        """
+        with self.lock:
+            if exclusive:
+                for job in self.jobs.values():
+                    if job.kind == kind:
+                        raise JobConflictError(job)
+            job = Job(id=uuid.uuid4().hex[:12], kind=kind)
+            self.jobs[job.id] = job
+        self._announce_job(job)
+        return job
+
+    def start_job(self, job_id: str) -> Job:
+        return self._transition(job_id, "running")
+
+    def finish_job(self, job_id: str, result: Optional[Dict[str, Any]] = None) -> Job:
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].result = result
+        return self._transition(job_id, "succeeded")
+
+    def fail_job(self, job_id: str, error: str) -> Job:
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].error = error
+        return self._transition(job_id, "failed")
+
+    def run_job(self, kind: str, target: Callable[[Job], Optional[Dict[str, Any]]],
+                exclusive: bool = True) -> Job:
+        """
+        注册作业并在后台线程中执行
+
+        target 接收作业对象，返回值作为作业结果；抛出异常时作业失败。
+        target 也可以自行调用 fail_job 结束作业
+
+        Returns:
+            新建的作业
+        """
+        job = self.create_job(kind, exclusive=exclusive)
+
+        def _run():
+            self.start_job(job.id)
+            try:
+                result = target(job)
+            except Exception as e:
+                logger.error(f"作业 {job.id} ({kind}) 失败: {e}", exc_info=True)
+                # target 可能已自行调用 fail_job 后再抛出异常，已结束的作业不能再次转换状态
+                if self._is_active(job.id):
+                    self.fail_job(job.id, str(e))
+                return
+            if self._is_active(job.id):
+                self.finish_job(job.id, result)
+
+        thread = threading.Thread(target=_run, name=f"job-{kind}-{job.id}")
+        thread.daemon = True
+        thread.start()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """按 ID 查询作业（包括已结束的历史作业）"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return job.to_dict()
+            for entry in reversed(self.history):
+                if entry.get("id") == job_id:
+                    return dict(entry)
+        return None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """进行中的作业在前，其后为最近结束的作业"""
+        with self.lock:
+            active = sorted((job.to_dict() for job in self.jobs.values()), key=lambda j: -j["created_at"])
+            finished = [dict(entry) for entry in reversed(self.history[-limit:])]
+        return (active + finished)[:limit]
+
+    # ---------- 进度与事件 ----------
+
+    def update_job_progress(self, job_id: str, current: int, total: int, message: str):
+        """更新指定作业的进度；SSE 事件（带 job_id）由发布线程按限速合并后广播"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.current, job.total, job.message = current, total, message
+            self.progress["current"] = current
+            self.progress["total"] = total
+            self.progress["last_item"] = message
+
+        self._enqueue('progress', {'job_id': job_id, 'current': current, 'total': total, 'message': message}, job_id)
+
+    def progress_callback(self, job_id: str) -> Callable[[int, int, str], None]:
+        """返回绑定到作业的进度回调，签名与 update_progress 相同"""
+        return lambda current, total, message: self.update_job_progress(job_id, current, total, message)
+
     def update_progress(self, current: int, total: int, message: str):
-        """更新进度并通过 SSE 广播"""
+        """更新进度（不属于任何作业）；SSE 事件由发布线程按限速合并后广播"""
         with self.lock:
             self.progress["current"] = current
             self.progress["total"] = total
             self.progress["last_item"] = message
-        
-        data = json.dumps({'current': current, 'total': total, 'message': message})
-        self.announcer.announce(self.format_sse(data, event='progress'))
 
-    def get_progress(self) -> Dict[str, Any]:
+        self._enqueue('progress', {'current': current, 'total': total, 'message': message})
+
+    def get_progress(self, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """获取进度；指定 job_id 时返回该作业的进度，作业不存在时返回 None"""
+        if job_id:
+            job = self.get_job(job_id)
+            if job is None:
+                return None
+            return {"current": job["current"], "total": job["total"], "last_item": job["message"],
+                    "state": job["state"], "job_id": job_id}
         with self.lock:
             return self.progress.copy()
 
-    def listen(self) -> Generator[str, None, None]:
-        """Generator for Flask Response"""
-        messages = self.announcer.listen()
-        while True:
-            msg = messages.get()
-            yield msg
+    def listen(self, job_id: Optional[str] = None, last_event_id: Optional[str] = None) -> EventStream:
+        """
+        打开 SSE 事件流（用作 Flask Response 的响应体）
+
+        先回放 last_event_id 之后的缓冲事件，再推送实时事件。连接积压的事件过多时结束响应，
+        浏览器的 EventSource 会自动带 Last-Event-ID 重连并从回放缓冲补齐，不会丢失事件
+
+        Raises:
+            ListenerLimitError: SSE 连接数已达 tasks.max_listeners
+        """
+        listener = self.announcer.listen(job_id)
+        return EventStream(self.announcer, listener, self.replay(last_event_id, job_id), self.heartbeat_interval)
+
+    def listen_async(self, job_id: Optional[str] = None, last_event_id: Optional[str] = None) -> AsyncEventStream:
+        """
+        打开异步 SSE 事件流（ASGI 模式），须在事件循环中调用；参数与回放行为同 listen
+
+        Raises:
+            ListenerLimitError: SSE 连接数已达上限
+        """
+        return AsyncEventStream(self.announcer, job_id, lambda: self.replay(last_event_id, job_id),
+                                self.heartbeat_interval)
 
-    def announce_event(self, event_name: str, data: Dict[str, Any]):
-        """广播自定义事件"""
-        msg = self.format_sse(json.dumps(data), event=event_name)
-        self.announcer.announce(msg)
+    def announce_event(self, event_name: str, data: Dict[str, Any], job_id: Optional[str] = None):
+        """广播自定义事件（指定 job_id 时事件数据中附带 job_id）"""
+        if job_id:
+            data = {**data, "job_id": job_id}
+        self._enqueue(event_name, data, job_id)
 
-    def announce_error(self, event_name: str, error_message: str):
+    def announce_error(self, event_name: str, error_message: str, job_id: Optional[str] = None):
         """广播错误信息"""
         data = {"status": "error", "message": error_message}
-        self.announce_event(event_name, data)
+        self.announce_event(event_name, data, job_id)
 
 # 全局单例
 task_manager = TaskManager()
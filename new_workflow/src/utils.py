@@ -1,56 +1,203 @@
 # new_workflow/src/utils.py
 import re
+import os
 import json
-from typing import Any, Optional, Dict, List, Union
+import hashlib
+import threading
+from typing import Any, Callable, Optional, Dict, Iterator, List, Union
 
-def extract_json_from_text(text: str) -> Optional[Union[Dict, List]]:
+_JSON_DECODER = json.JSONDecoder()
+_JSON_START = re.compile(r'[\[{]')
+
+
+def iter_json_values(text: str) -> Iterator[Union[Dict, List]]:
+    """
+    增量扫描文本中的 JSON 对象或数组（基于 JSONDecoder.raw_decode）
+
+    从每个 `{` / `[` 处尝试解码：成功则产出该值并跳到其结尾继续扫描；失败则从下一个字符
+    继续寻找（前文中的引文编号、未闭合的引号等不会吞掉后面完整的 JSON）；遇到在文本末尾
+    截断的 JSON 时立即停止
+
+    Args:
+        text: 包含 JSON 的字符串
+
+    Yields:
+        依次出现的顶层 JSON 对象或数组
+    """
+    pos = 0
+    length = len(text)
+    while True:
+        match = _JSON_START.search(text, pos)
+        if not match:
+            return
+        start = match.start()
+        try:
+            value, end = _JSON_DECODER.raw_decode(text, start)
+        except json.JSONDecodeError as e:
+            if e.pos >= length:
+                return
+            pos = start + 1
+            continue
+        yield value
+        pos = end
+
+
+def _is_dict(value: Any) -> bool:
+    return isinstance(value, dict)
+
+
+def _is_list(value: Any) -> bool:
+    return isinstance(value, list)
+
+
+def _never(value: Any) -> bool:
+    return False
+
+
+def extract_json_from_text(text: str,
+                           accept: Optional[Callable[[Any], bool]] = None) -> Optional[Union[Dict, List]]:
     """
     从文本中健壮地提取 JSON 对象或数组。
     支持处理 Markdown 代码块 (```json ... ```) 和非标准的前后缀。
     
+    先整体解析一次（结构化输出的常见情况），失败时用 iter_json_values 扫描：
+    未指定 accept 时优先返回第一个 JSON 对象，文本中没有对象时才返回第一个数组
+    （避免把正文中的引文编号 "[1]" 当作结果）
+    
     Args:
         text: 包含 JSON 的字符串
+        accept: 判断解析出的值是否可用的函数（可选）；提供时返回第一个满足条件的值
         
     Returns:
         解析后的 Python 对象 (Dict 或 List)，如果失败返回 None
     """
     if not text:
         return None
+    if accept is None:
+        accept, fallback = _is_dict, _is_list
+    else:
+        fallback = _never
         
     # 1. 尝试直接解析
     try:
-        return json.loads(text)
+        value = json.loads(text)
+        if accept(value) or fallback(value):
+            return value
     except json.JSONDecodeError:
         pass
-        
-    # 2. 清理 Markdown 代码块常用的标记
-    cleaned_text = text.replace("```json", "").replace("```", "").strip()
-    try:
-        return json.loads(cleaned_text)
-    except json.JSONDecodeError:
-        pass
-
-    # 3. 使用正则寻找最外层的 {} 或 []
-    # 寻找可能是 JSON 对象的模式
-    # dotall=True (re.S) 让 . 匹配换行符
     
-    # 尝试匹配 { ... }
-    match_dict = re.search(r'(\{.*\})', text, re.S)
-    if match_dict:
+    # 2. 扫描文本，跳过 Markdown 代码块标记、前后说明文字等
+    first_fallback = None
+    for value in iter_json_values(text):
+        if accept(value):
+            return value
+        if first_fallback is None and fallback(value):
+            first_fallback = value
+    return first_fallback
+
+try:
+    from pypinyin import lazy_pinyin  # optional
+    _HAS_PYPINYIN = True
+except Exception:
+    _HAS_PYPINYIN = False
+
+def contains_cjk(text: str) -> bool:
+    """判断文本中是否包含中文字符"""
+    for ch in text:
+        if '\u4e00' <= ch <= '\u9fff':
+            return True
+    return False
+
+def to_pinyin(text: str) -> List[str]:
+    """
+    将文本中的中文转换为拼音音节列表，非中文部分原样保留
+    未安装 pypinyin 时按字符返回
+    """
+    if _HAS_PYPINYIN:
         try:
-            return json.loads(match_dict.group(1))
-        except json.JSONDecodeError:
+            return lazy_pinyin(text)
+        except Exception:
             pass
-            
-    # 尝试匹配 [ ... ]
-    match_list = re.search(r'(\[.*\])', text, re.S)
-    if match_list:
+    return list(text)
+
+
+def file_sha1(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """分块读取文件并计算 SHA-1（适用于大文件）"""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def atomic_write_json(file_path: str, data: Any, indent: Optional[int] = 4):
+    """先写入临时文件再原子替换，避免写入中断导致 JSON 文件损坏"""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, file_path)
+
+
+class DiskCache:
+    """
+    基于文件的键值缓存：值为可 JSON 序列化的对象，键通常由 make_key 对输入内容求哈希得到
+    写入采用临时文件 + 原子替换，多线程并发写入安全
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """对多个字符串片段求 SHA-256，作为缓存键"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，不存在或损坏时返回 None"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("value")
+        except Exception:
+            return None
+
+    def set(self, key: str, value: Any):
+        """写入缓存"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"value": value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def raise_open_file_limit() -> Optional[int]:
+    """
+    将进程可打开文件数的软限制提高到硬限制（每个网络连接占用一个文件描述符）
+
+    Returns:
+        调整后的软限制；平台不支持时返回 None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
         try:
-            return json.loads(match_list.group(1))
-        except json.JSONDecodeError:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
             pass
-            
-    # 4. 如果还是失败，可能是 JSON 不完整或者格式极其混乱
-    # 这里可以添加更复杂的修复逻辑（如修复未闭合的引号），但通常用正则提取就够了
-    
-    return None
+    return soft
@@ -0,0 +1,183 @@
+# new_workflow/sse_load_test.py
+"""
+SSE 连接容量压测
+建立大量并发的 /events 长连接并保持一段时间，统计建连成功率与耗时、服务端的连接数（/health）、
+收到的心跳与事件；可选触发一次导出作业，测量作业事件广播到全部连接的延迟。
+
+用法（先启动 python asgi_app.py 或 python app.py）：
+    python sse_load_test.py --clients 2000 --hold 30 --trigger-export
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import urllib.request
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from src.utils import raise_open_file_limit
+
+
+class ClientStats:
+    """单个连接的统计"""
+
+    def __init__(self):
+        self.status: Optional[int] = None
+        self.connect_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self.events = 0
+        self.heartbeats = 0
+        self.closed_early = False
+        # 每个作业第一条 job 事件的到达时间
+        self.job_events: Dict[str, float] = {}
+
+
+async def _run_client(host: str, port: int, path: str, stats: ClientStats,
+                      connect_slots: asyncio.Semaphore, stop: asyncio.Event, connected: asyncio.Event):
+    start = time.perf_counter()
+    try:
+        async with connect_slots:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                         f"Accept: text/event-stream\r\nCache-Control: no-cache\r\n\r\n".encode())
+            await writer.drain()
+            status_line = await reader.readline()
+            stats.status = int(status_line.split()[1])
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            stats.connect_time = time.perf_counter() - start
+    except Exception as e:
+        stats.error = f"{type(e).__name__}: {e}"
+        return
+    finally:
+        connected.set()
+
+    try:
+        if stats.status != 200:
+            return
+        event_name = None
+        while not stop.is_set():
+            line_task = asyncio.ensure_future(reader.readline())
+            stop_task = asyncio.ensure_future(stop.wait())
+            done, _ = await asyncio.wait({line_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            if stop_task not in done:
+                stop_task.cancel()
+            if line_task not in done:
+                line_task.cancel()
+                break
+            line = line_task.result()
+            if not line:
+                stats.closed_early = True
+                break
+            text = line.decode("utf-8", "replace").strip()
+            if text.startswith(":"):
+                stats.heartbeats += 1
+            elif text.startswith("event:"):
+                event_name = text[6:].strip()
+            elif text.startswith("data:"):
+                stats.events += 1
+                if event_name == "job":
+                    try:
+                        stats.job_events.setdefault(json.loads(text[5:]).get("job_id"), time.perf_counter())
+                    except ValueError:
+                        pass
+                event_name = None
+    except Exception as e:
+        stats.error = f"{type(e).__name__}: {e}"
+    finally:
+        writer.close()
+
+
+def _http(method: str, url: str) -> Dict:
+    request = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _percentiles(values: List[float]) -> str:
+    if not values:
+        return "-"
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return (f"p50 {statistics.median(values) * 1000:.1f}ms / p95 {p95 * 1000:.1f}ms / "
+            f"max {values[-1] * 1000:.1f}ms")
+
+
+async def run(url: str, clients: int, concurrency: int, hold: float, job_id: Optional[str],
+              trigger_export: bool):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = "/events" + (f"?job_id={job_id}" if job_id else "")
+    loop = asyncio.get_running_loop()
+
+    stop = asyncio.Event()
+    connect_slots = asyncio.Semaphore(concurrency)
+    stats = [ClientStats() for _ in range(clients)]
+    connected = [asyncio.Event() for _ in range(clients)]
+
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(_run_client(host, port, path, s, connect_slots, stop, c))
+             for s, c in zip(stats, connected)]
+    await asyncio.gather(*(c.wait() for c in connected))
+    ramp_time = time.perf_counter() - started
+    ok = [s for s in stats if s.status == 200]
+    print(f"建连完成：{len(ok)}/{clients} 成功，耗时 {ramp_time:.2f}s")
+
+    try:
+        health = await loop.run_in_executor(None, _http, "GET", f"{url}/health")
+        print(f"服务端连接统计：{json.dumps(health.get('sse'), ensure_ascii=False)}")
+    except Exception as e:
+        print(f"读取 /health 失败: {e}")
+
+    trigger_at, export_job = None, None
+    if trigger_export:
+        try:
+            trigger_at = time.perf_counter()
+            result = await loop.run_in_executor(None, _http, "POST", f"{url}/export")
+            export_job = result.get("job_id")
+            print(f"已触发导出作业 {export_job}")
+        except Exception as e:
+            print(f"触发导出失败: {e}")
+            trigger_at = None
+
+    await asyncio.sleep(hold)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    statuses: Dict[str, int] = {}
+    for s in stats:
+        key = str(s.status) if s.status is not None else "error"
+        statuses[key] = statuses.get(key, 0) + 1
+    errors = [s.error for s in stats if s.error]
+    print(f"响应状态：{statuses}")
+    if errors:
+        print(f"连接错误 {len(errors)} 个，例如：{errors[0]}")
+    print(f"建连耗时：{_percentiles([s.connect_time for s in ok if s.connect_time is not None])}")
+    print(f"保持 {hold:.0f}s 期间提前断开的连接：{sum(s.closed_early for s in ok)}")
+    print(f"收到心跳 {sum(s.heartbeats for s in ok)} 次，事件 {sum(s.events for s in ok)} 条")
+    if trigger_at is not None and export_job:
+        latencies = [s.job_events[export_job] - trigger_at for s in ok if export_job in s.job_events]
+        print(f"作业事件送达 {len(latencies)}/{len(ok)} 个连接，延迟：{_percentiles(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE 连接容量压测")
+    parser.add_argument("--url", default="http://127.0.0.1:18690", help="服务地址")
+    parser.add_argument("--clients", type=int, default=1000, help="并发连接数")
+    parser.add_argument("--concurrency", type=int, default=200, help="同时进行的建连数")
+    parser.add_argument("--hold", type=float, default=30, help="建连完成后保持连接的秒数")
+    parser.add_argument("--job-id", default=None, help="只订阅该作业的事件")
+    parser.add_argument("--trigger-export", action="store_true",
+                        help="建连后触发一次导出作业，测量作业事件的广播延迟")
+    args = parser.parse_args()
+
+    limit = raise_open_file_limit()
+    if limit is not None and limit < args.clients + 64:
+        print(f"警告：可打开文件数上限为 {limit}，可能不足以建立 {args.clients} 个连接")
+    asyncio.run(run(args.url.rstrip("/"), args.clients, args.concurrency, args.hold,
+                    args.job_id, args.trigger_export))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+# new_workflow/tests/conftest.py
+"""
+测试公共配置：把 new_workflow 加入导入路径，并提供指向临时目录的配置
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import config_loader  # noqa: E402
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """以临时目录下的缓存路径替换配置缓存，测试可直接修改返回的字典"""
+    cache_dir = tmp_path / "cache"
+    data = {
+        "matching": {"use_pdf_metadata": False, "decision_cache": False, "chunk_size": 1,
+                     "chunk_retries": 1, "max_workers": 1},
+        "paths": {
+            "alignment_cache": str(cache_dir / "alignment"),
+            "reference_cache": str(cache_dir / "references"),
+            "lsh_index": str(cache_dir / "lsh"),
+        },
+    }
+    monkeypatch.setattr(config_loader, "_config_cache", data)
+    monkeypatch.setattr(config_loader, "_config_path_cache", str(tmp_path / "config.yaml"))
+    return data
@@ -0,0 +1,79 @@
+# new_workflow/tests/pdf_samples.py
+"""测试用的最小 PDF 构造函数"""
+import zlib
+
+
+def _page_object(parent: int) -> bytes:
+    return b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] >>" % parent
+
+
+def classic_pdf(pages: int) -> bytes:
+    """传统交叉引用表的 PDF：1 目录，2 页面树，3.. 页面"""
+    kids = b" ".join(b"%d 0 R" % (3 + i) for i in range(pages))
+    bodies = [b"<< /Type /Catalog /Pages 2 0 R >>",
+              b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages]
+    bodies += [_page_object(2) for _ in range(pages)]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(bodies, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(bodies) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(bodies) + 1, xref)
+    return bytes(out)
+
+
+def xref_stream_pdf(pages: int) -> bytes:
+    """PDF 1.5：页面对象压缩在对象流中，交叉引用为压缩的交叉引用流（扫描找不到页面对象）"""
+    page_numbers = [4 + i for i in range(pages)]
+    kids = b" ".join(b"%d 0 R" % n for n in page_numbers)
+    objects = [_page_object(2) for _ in page_numbers]
+    header, data = bytearray(), bytearray()
+    for number, body in zip(page_numbers, objects):
+        header += b"%d %d " % (number, len(data))
+        data += body + b"\n"
+    packed = zlib.compress(bytes(header) + bytes(data))
+
+    out = bytearray(b"%PDF-1.5\n")
+    offsets = {}
+
+    def add(number, body):
+        offsets[number] = len(out)
+        out.extend(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    add(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    add(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages)
+    add(3, b"<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode /Length %d >>\nstream\n"
+        % (pages, len(header), len(packed)) + packed + b"\nendstream")
+    xref_number = 4 + pages
+    size = xref_number + 1
+    rows = bytearray(b"\x00\x00\x00\xff")
+    for number in range(1, size):
+        if number in offsets:
+            rows += b"\x01" + offsets[number].to_bytes(2, "big") + b"\x00"
+        elif number in page_numbers:
+            rows += b"\x02" + (3).to_bytes(2, "big") + bytes([page_numbers.index(number)])
+        else:
+            rows += b"\x01" + len(out).to_bytes(2, "big") + b"\x00"
+    xref_data = zlib.compress(bytes(rows))
+    xref_offset = len(out)
+    out += (b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 2 1] /Root 1 0 R /Filter /FlateDecode /Length %d >>\n"
+            b"stream\n" % (xref_number, size, len(xref_data)) + xref_data + b"\nendstream\nendobj\n")
+    out += b"startxref\n%d\n%%%%EOF\n" % xref_offset
+    return bytes(out)
+
+
+def self_referencing_length_pdf() -> bytes:
+    """对象流的 /Length 指向该对象流中的对象（解析器若不防护会无限递归）"""
+    out = bytearray(b"%PDF-1.5\n")
+    catalog = len(out)
+    out += b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+    stream = len(out)
+    out += b"3 0 obj\n<< /Type /ObjStm /N 1 /First 4 /Length 2 0 R >>\nstream\n2 0 << /Type /Pages /Count 5 >>\nendstream\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 4\n0000000000 65535 f \n%010d 00000 n \n0000000003 00000 n \n%010d 00000 n \n" % (catalog, stream)
+    out += b"trailer\n<< /Size 4 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % xref
+    return bytes(out)
@@ -0,0 +1,47 @@
+# new_workflow/tests/test_alignment_decisions.py
+"""大模型对齐决策缓存"""
+import json
+
+from src.alignment_decisions import AlignmentDecisionCache
+from src.fuzzy_matcher import reference_hash
+
+REF_A = "Kyle A S. Continuous auctions and insider trading[J]. Econometrica, 1985, 53(6): 1315-1335."
+REF_B = "Glosten L R, Milgrom P R. Bid, ask and transaction prices[J]. Journal of Financial Economics, 1985."
+
+
+def test_record_save_and_reload(tmp_path):
+    path = str(tmp_path / "decisions.json")
+    cache = AlignmentDecisionCache(path)
+    # 大模型返回的结果可能带编号
+    assert cache.record("sha", [REF_A, REF_B], "[2] " + REF_B, "model-x")
+    cache.save()
+
+    reloaded = AlignmentDecisionCache(path)
+    assert len(reloaded) == 1
+    available = {reference_hash(REF_A): REF_A, reference_hash(REF_B): REF_B}
+    assert reloaded.matched_reference("sha", available) == REF_B
+    assert reloaded.rejected("sha") == {reference_hash(REF_A)}
+    # 已判定的参考文献不在当前列表中时不能复用
+    assert reloaded.matched_reference("sha", {reference_hash(REF_A): REF_A}) is None
+
+
+def test_no_match_rejects_every_candidate(tmp_path):
+    cache = AlignmentDecisionCache(str(tmp_path / "decisions.json"))
+    assert cache.record("sha", [REF_A, REF_B], None, "model-x")
+    assert cache.rejected("sha") == {reference_hash(REF_A), reference_hash(REF_B)}
+
+
+def test_choice_outside_candidates_is_not_recorded(tmp_path):
+    path = tmp_path / "decisions.json"
+    cache = AlignmentDecisionCache(str(path))
+    assert not cache.record("sha", [REF_A], REF_B, "model-x")
+    cache.save()
+    assert len(cache) == 0 and not path.exists()
+
+
+def test_outdated_or_corrupt_file_starts_empty(tmp_path):
+    path = tmp_path / "decisions.json"
+    path.write_text(json.dumps({"version": 0, "decisions": {"sha": {}}}), encoding="utf-8")
+    assert len(AlignmentDecisionCache(str(path))) == 0
+    path.write_text("{broken", encoding="utf-8")
+    assert len(AlignmentDecisionCache(str(path))) == 0
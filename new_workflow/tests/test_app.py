@@ -0,0 +1,102 @@
+# new_workflow/tests/test_app.py
+"""Web 接口的参数校验"""
+import pytest
+
+from src.summary_fields import SummaryColumnStore
+
+SUMMARY = "## 1. 文献核心信息\n问题{i}\n## 2. 研究方法\n研究类型：定量，回归分析\n## 3. 核心发现\n发现{i}"
+
+
+@pytest.fixture
+def client(config, tmp_path, monkeypatch):
+    import app as app_module
+    store = SummaryColumnStore(str(tmp_path / "columns"))
+    store.update({"file_name": f"{i}.pdf", "reference": f"Ref {i}", "summary": SUMMARY.format(i=i)}
+                 for i in range(5))
+    monkeypatch.setattr(app_module, "update_summary_columns_step", lambda: store)
+    requested = []
+
+    class _Jobs:
+        def list_jobs(self, limit=50):
+            requested.append(limit)
+            return [{"id": str(i)} for i in range(min(limit, 3))]
+
+    monkeypatch.setattr(app_module, "task_manager", _Jobs())
+    app_module.app.config["TESTING"] = True
+    client = app_module.app.test_client()
+    client.requested_limits = requested
+    return client
+
+
+def test_jobs_limit_is_validated_and_capped(client):
+    assert client.get("/jobs").get_json()["status"] == "success"
+    assert client.get("/jobs?limit=2").status_code == 200
+    assert client.get("/jobs?limit=99999999").status_code == 200
+    assert client.requested_limits == [50, 2, 1000]
+    for bad in ("-1", "0", "abc", "1.5"):
+        response = client.get(f"/jobs?limit={bad}")
+        assert response.status_code == 400
+        assert response.get_json()["status"] == "error"
+
+
+def test_summaries_limit(client):
+    data = client.get("/summaries?columns=file_name,method_type").get_json()
+    assert data["count"] == 5 and data["total"] == 5
+    assert data["rows"][0] == {"file_name": "0.pdf", "method_type": "定量"}
+
+    data = client.get("/summaries?columns=file_name&limit=2&q=发现").get_json()
+    assert data["count"] == 2 and data["total"] == 5
+    assert [row["file_name"] for row in data["rows"]] == ["0.pdf", "1.pdf"]
+
+    assert client.get("/summaries?limit=-3").status_code == 400
+    assert client.get("/summaries?columns=nope").status_code == 400
+
+
+@pytest.fixture
+def export_file(client, config, tmp_path, monkeypatch):
+    import app as app_module
+    path = tmp_path / "result.csv"
+    path.write_text("file_name,summary\n" + "a.pdf,总结\n" * 200, encoding="utf-8")
+    exported = []
+
+    def _ensure_export(fmt):
+        exported.append(fmt)
+        return str(path)
+
+    monkeypatch.setattr(app_module, "result_version", lambda fmt: f"v1{fmt}")
+    monkeypatch.setattr(app_module, "ensure_export", _ensure_export)
+    config["export"] = {"gzip_min_bytes": 1024}
+    return exported
+
+
+def test_download_conditional_request(client, export_file):
+    response = client.get("/download")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"v1csv"'
+    assert response.data.startswith("file_name".encode("utf-8"))
+
+    response = client.get("/download", headers={"If-None-Match": '"v1csv"'})
+    assert response.status_code == 304 and not response.data
+    # 未变化时不再导出
+    assert export_file == ["csv"]
+
+    assert client.get("/download", headers={"If-None-Match": '"v0csv"'}).status_code == 200
+
+
+def test_download_gzip_has_its_own_etag(client, export_file):
+    import gzip
+    response = client.get("/download", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == '"v1csv-gzip"'
+    assert gzip.decompress(response.data).startswith("file_name".encode("utf-8"))
+
+    response = client.get("/download", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1csv-gzip"'})
+    assert response.status_code == 304 and response.headers["ETag"] == '"v1csv-gzip"'
+    # 持有未压缩版本的 ETag 同样有效
+    response = client.get("/download", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1csv"'})
+    assert response.status_code == 304
+
+
+def test_download_unknown_format(client, export_file):
+    assert client.get("/download?format=doc").status_code == 400
+    assert export_file == []
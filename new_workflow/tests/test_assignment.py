@@ -0,0 +1,96 @@
+# new_workflow/tests/test_assignment.py
+"""相似度计算与一对一分配（NumPy 向量化、纯 Python 回退与稀疏候选）"""
+import pytest
+
+from src import assignment
+from src.assignment import SparseScores, optimal_assignment, top_columns
+from src.fuzzy_matcher import ReferenceCandidates, parse_pdf_filename, prematch
+from src.reference_parser import parse_references
+
+REFERENCES = [
+    "Easley D, López de Prado M M, O'Hara M. Flow toxicity and liquidity in a high-frequency world[J]. "
+    "Review of Financial Studies, 2012, 25(5): 1457-1493.",
+    "Kyle A S. Continuous auctions and insider trading[J]. Econometrica, 1985, 53(6): 1315-1335.",
+    "张涛, 邵群. 高频交易对市场质量的影响研究[J]. 金融研究, 2017(3): 1-15.",
+    "Li Y, Wu Z. Order flow and price discovery in Chinese futures markets[J]. Journal of Futures Markets, "
+    "2019, 39(2): 123-140.",
+]
+FILES = [
+    "Kyle - 1985 - Continuous Auctions and Insider Trading.pdf",
+    "张涛 和 邵群 - 2017 - 高频交易对市场质量的影响研究.pdf",
+    "Easley 等 - 2012 - Flow Toxicity and Liquidity in a High-frequency World.pdf",
+    "unrelated notes.pdf",
+]
+EXPECTED = {0: 1, 1: 2, 2: 0}
+
+
+@pytest.fixture(autouse=True)
+def _temporary_caches(config):
+    """参考文献解析缓存写入临时目录"""
+    return config
+
+
+def _scores(columns=None):
+    candidates = ReferenceCandidates(REFERENCES, parse_references(REFERENCES))
+    return candidates.score_matrix([parse_pdf_filename(name) for name in FILES], columns)
+
+
+def _pairs(result):
+    return {a.row: a.col for a in result}
+
+
+def test_vectorized_assignment():
+    result = optimal_assignment(_scores(), min_score=0.3)
+    assert _pairs(result) == EXPECTED
+    assert all(a.score > 0.9 and a.margin > 0.3 for a in result)
+
+
+def test_pure_python_fallback_matches_numpy(monkeypatch):
+    dense = _scores()
+    monkeypatch.setattr(assignment, "_HAS_NUMPY", False)
+    lists = _scores()
+    assert isinstance(lists, list)
+    for row in range(len(FILES)):
+        for col in range(len(REFERENCES)):
+            assert lists[row][col] == pytest.approx(float(dense[row, col]), abs=0.02)
+    result = optimal_assignment(lists, min_score=0.3)
+    assert _pairs(result) == EXPECTED
+    assert top_columns(lists, 0, 1) == [1]
+
+
+@pytest.mark.parametrize("numpy_available", [True, False])
+def test_shortlisted_scores_only_cover_candidates(monkeypatch, numpy_available):
+    dense = _scores()
+    monkeypatch.setattr(assignment, "_HAS_NUMPY", numpy_available and assignment._HAS_NUMPY)
+    columns = [[1, 3], [2], [3, 0, 0], []]
+    sparse = _scores(columns)
+    assert isinstance(sparse, SparseScores)
+    assert sparse.columns == [[1, 3], [2], [0, 3], []]
+    for row, cols in enumerate(sparse.columns):
+        for col, value in zip(cols, sparse.values[row]):
+            assert value == pytest.approx(float(dense[row, col]), abs=0.02)
+    assert _pairs(optimal_assignment(sparse, min_score=0.3)) == EXPECTED
+    assert top_columns(sparse, 2, 5) == [0, 3]
+    assert top_columns(sparse, 2, 5, exclude={0}) == [3]
+
+
+def test_shortlist_limits_assignment_to_candidates():
+    # 文件 0 的候选里没有正确答案时，只能在候选中分配（得分不足则不分配）
+    sparse = _scores([[3], [2], [0], [1]])
+    assert _pairs(optimal_assignment(sparse, min_score=0.3)) == {1: 2, 2: 0}
+
+
+def test_sparse_margin_uses_runner_up_candidate():
+    scores = SparseScores(shape=(2, 3), columns=[[0, 1], [1]], values=[[0.9, 0.85], [0.95]])
+    result = optimal_assignment(scores, min_score=0.3)
+    assert [(a.row, a.col) for a in result] == [(0, 0), (1, 1)]
+    assert result[0].margin == pytest.approx(0.05)
+    assert result[1].margin == pytest.approx(0.95)
+
+
+def test_prematch_with_shortlists(config):
+    result = prematch(FILES, REFERENCES, parse_references(REFERENCES),
+                      shortlists={FILES[0]: [1, 3], FILES[1]: [2], FILES[2]: [0], FILES[3]: [3]})
+    assert result.matched == {name: REFERENCES[EXPECTED[i]] for i, name in enumerate(FILES) if i in EXPECTED}
+    assert result.unresolved == [FILES[3]]
+    assert result.candidates[FILES[3]] == [REFERENCES[3]]
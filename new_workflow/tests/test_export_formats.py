@@ -0,0 +1,83 @@
+# new_workflow/tests/test_export_formats.py
+"""导出格式"""
+import csv
+
+import pytest
+
+from src import export_formats
+from src.export_formats import Exporter, export_output_path, get_exporter, register_exporter
+
+RECORDS = [
+    {"reference": " 张三. 论文一[J]. 2020. ", "summary": "# 背景\n第一段", "file_name": "a.pdf",
+     "elapsed_time": "12.5", "window_count": 2, "file_index": 0},
+    {"reference": "Smith J. Paper two. 2021.", "summary": "line\x0bbreak\x01", "file_name": "b.pdf",
+     "elapsed_time": "n/a"},
+]
+
+
+def test_csv_writes_header_and_rows(tmp_path):
+    path = tmp_path / "out.csv"
+    assert get_exporter("csv").write(iter(RECORDS), str(path)) == 2
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["reference", "summary"]
+    assert rows[1] == ["张三. 论文一[J]. 2020.", "# 背景\n第一段"]
+
+
+def test_markdown_demotes_summary_headings(tmp_path):
+    path = tmp_path / "out.md"
+    assert get_exporter("md").write(RECORDS, str(path)) == 2
+    text = path.read_text(encoding="utf-8")
+    assert "## 1. 张三. 论文一[J]. 2020.\n\n> 文件：a.pdf" in text
+    assert "### 背景" in text and "\n# 背景" not in text
+
+
+@pytest.mark.skipif(not export_formats._HAS_OPENPYXL, reason="openpyxl 未安装")
+def test_xlsx_strips_illegal_control_characters(tmp_path):
+    import openpyxl
+    path = tmp_path / "out.xlsx"
+    assert get_exporter("xlsx").write(RECORDS, str(path)) == 2
+    sheet = openpyxl.load_workbook(path).active
+    assert [c.value for c in sheet[1]] == ["reference", "summary", "file_name"]
+    assert sheet["B3"].value == "linebreak"
+
+
+@pytest.mark.skipif(not export_formats._HAS_PYARROW, reason="pyarrow 未安装")
+def test_parquet_keeps_metadata_and_nulls_bad_numbers(tmp_path):
+    import pyarrow.parquet as pq
+    path = tmp_path / "out.parquet"
+    assert get_exporter("parquet").write(RECORDS, str(path)) == 2
+    table = pq.read_table(path)
+    assert table.column("elapsed_time").to_pylist() == [12.5, None]
+    assert table.column("window_count").to_pylist() == [2, None]
+    assert table.schema.metadata[b"generator"] == b"ScholarFlow"
+
+
+def test_unknown_or_unavailable_format(monkeypatch):
+    with pytest.raises(ValueError):
+        get_exporter("docx")
+    monkeypatch.setattr(export_formats, "_HAS_OPENPYXL", False)
+    with pytest.raises(RuntimeError):
+        get_exporter("xlsx")
+    assert export_output_path("/tmp/r.csv", "csv") == "/tmp/r.csv"
+    assert export_output_path("/tmp/r.csv", "md") == "/tmp/r.md"
+
+
+def test_exporter_requires_write(monkeypatch):
+    class Incomplete(Exporter):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+    class Lines(Exporter):
+        name = "lines"
+        extension = ".txt"
+
+        def write(self, records, output_path):
+            return sum(1 for _ in records)
+
+    monkeypatch.setattr(export_formats, "_EXPORTERS", dict(export_formats._EXPORTERS))
+    register_exporter(Lines())
+    assert get_exporter("lines").write(RECORDS, "unused") == 2
+    assert export_output_path("/tmp/r.csv", "lines") == "/tmp/r.txt"
@@ -0,0 +1,57 @@
+# new_workflow/tests/test_export_index.py
+"""排序导出索引的增量更新应与完整导出结果一致"""
+import json
+
+from src.results_exporter import export_from_json, update_sorted_csv
+
+SAME_REFERENCE = "Fama E F, French K R. Common risk factors in the returns on stocks and bonds[J]. 1993."
+
+
+def _record(name, reference=SAME_REFERENCE, summary="v1"):
+    return {"file_name": name, "reference": reference, "summary": summary}
+
+
+def _write(path, records):
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+
+
+def _assert_matches_full_export(tmp_path, summary_path, csv_path):
+    expected = tmp_path / "expected.csv"
+    export_from_json(str(summary_path), str(expected))
+    assert csv_path.read_bytes() == expected.read_bytes()
+
+
+def test_incremental_update_keeps_input_order_for_equal_keys(tmp_path, config):
+    summary_path, csv_path = tmp_path / "summary.json", tmp_path / "out.csv"
+    index_path = str(tmp_path / "export_index.json")
+    records = [_record(f"{i}.pdf") for i in range(6)] + [_record("z.pdf", "陈国进. 知情交易[J]. 2019.")]
+    _write(summary_path, records)
+    update_sorted_csv(str(summary_path), str(csv_path), index_path)
+    _assert_matches_full_export(tmp_path, summary_path, csv_path)
+
+    # 修改排在最前面的记录：排序键相同，应留在原位置而不是移到同键行的末尾
+    records[0] = _record("0.pdf", summary="v2")
+    _write(summary_path, records)
+    update_sorted_csv(str(summary_path), str(csv_path), index_path)
+    _assert_matches_full_export(tmp_path, summary_path, csv_path)
+
+    # 删除前面的记录后再修改后面的记录，输入序号整体前移
+    del records[1]
+    records[3] = _record("4.pdf", summary="v2")
+    _write(summary_path, records)
+    update_sorted_csv(str(summary_path), str(csv_path), index_path)
+    _assert_matches_full_export(tmp_path, summary_path, csv_path)
+
+
+def test_reordered_results_fall_back_to_full_export(tmp_path, config):
+    summary_path, csv_path = tmp_path / "summary.json", tmp_path / "out.csv"
+    index_path = str(tmp_path / "export_index.json")
+    records = [_record(f"{i}.pdf") for i in range(6)]
+    _write(summary_path, records)
+    update_sorted_csv(str(summary_path), str(csv_path), index_path)
+
+    records[0], records[4] = records[4], records[0]
+    records[2] = _record("2.pdf", summary="v2")
+    _write(summary_path, records)
+    update_sorted_csv(str(summary_path), str(csv_path), index_path)
+    _assert_matches_full_export(tmp_path, summary_path, csv_path)
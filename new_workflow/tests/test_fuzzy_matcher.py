@@ -0,0 +1,32 @@
+# new_workflow/tests/test_fuzzy_matcher.py
+"""参考文献拆分与编号去除"""
+from src.fuzzy_matcher import split_references
+
+
+def test_strips_delimited_numbering():
+    text = "[1] Kyle A S. Continuous auctions[J]. 1985.\n2. 张涛. 高频交易[J]. 2017.\n(3) Li Y. Order flow. 2019.\n" \
+           "4、王五. 论文[D]. 2020.\n（5） Wu Z. Futures. 2018."
+    assert split_references(text) == ["Kyle A S. Continuous auctions[J]. 1985.", "张涛. 高频交易[J]. 2017.",
+                                      "Li Y. Order flow. 2019.", "王五. 论文[D]. 2020.", "Wu Z. Futures. 2018."]
+
+
+def test_keeps_leading_numbers_that_are_part_of_the_reference():
+    text = "2008 年中国经济发展报告[R]. 北京: 中国统计出版社, 2009.\n" \
+           "3 Essays on Market Microstructure[D]. MIT, 2010.\n" \
+           "3.5 亿用户的移动支付行为研究[J]. 2021.\n" \
+           "Kyle A S. Continuous auctions[J]. 1985."
+    assert split_references(text) == text.splitlines()
+
+
+def test_strips_bare_numbers_only_when_list_is_sequentially_numbered():
+    numbered = "1 Kyle A S. Continuous auctions[J]. 1985.\n\n2 2008 年中国经济发展报告[R]. 2009.\n3 Li Y. Order flow. 2019."
+    assert split_references(numbered) == ["Kyle A S. Continuous auctions[J]. 1985.",
+                                          "2008 年中国经济发展报告[R]. 2009.", "Li Y. Order flow. 2019."]
+    # 单条或不连续的数字不是编号
+    assert split_references("3 Essays on Market Microstructure[D]. 2010.") == \
+        ["3 Essays on Market Microstructure[D]. 2010."]
+    assert split_references("1 Kyle. 1985.\n5 Essays. 2010.") == ["1 Kyle. 1985.", "5 Essays. 2010."]
+
+
+def test_deduplicates_after_stripping():
+    assert split_references("[1] Kyle. 1985.\n[2] Kyle. 1985.\n\n") == ["Kyle. 1985."]
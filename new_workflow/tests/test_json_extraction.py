@@ -0,0 +1,41 @@
+# new_workflow/tests/test_json_extraction.py
+"""从大模型回复中提取 JSON"""
+from src.reference_matcher import _is_alignment_response, _parse_alignment_response
+from src.utils import extract_json_from_text, iter_json_values
+
+
+def test_plain_and_fenced_json():
+    assert extract_json_from_text('{"a": 1}') == {"a": 1}
+    assert extract_json_from_text('```json\n{"a": [1, 2]}\n```') == {"a": [1, 2]}
+    assert extract_json_from_text('[1, 2]') == [1, 2]
+    assert extract_json_from_text('结果：\n[{"a": 1}]') == [{"a": 1}]
+
+
+def test_bracketed_citations_before_object_are_skipped():
+    assert extract_json_from_text('See reference [1] below:\n{"matches": []}') == {"matches": []}
+    assert extract_json_from_text('根据文献[2]，结果如下 {"x": null}') == {"x": None}
+
+
+def test_array_returned_only_when_no_object():
+    assert extract_json_from_text('候选见 [1, 2]，没有其他内容') == [1, 2]
+
+
+def test_unbalanced_quote_does_not_swallow_later_json():
+    assert extract_json_from_text('garbage {unbalanced "quote} then {"ok": 1}') == {"ok": 1}
+
+
+def test_truncated_json_returns_none():
+    assert extract_json_from_text('前缀 {"matches": [{"file_name": "a.pdf", "refer') is None
+    assert extract_json_from_text('') is None
+
+
+def test_iter_json_values_yields_in_order():
+    assert list(iter_json_values('x [1] y {"a": 2} z [3]')) == [[1], {"a": 2}, [3]]
+
+
+def test_accept_selects_alignment_object():
+    reply = ('参考文献 [3] 与 {"note": "无关"} 之后给出结果：'
+             '{"matches": [{"file_name": "a.pdf", "reference": "Ref A"}, {"file_name": "b.pdf", "reference": null}]}')
+    data = extract_json_from_text(reply, accept=_is_alignment_response)
+    assert _parse_alignment_response(data) == {"a.pdf": "Ref A", "b.pdf": None}
+    assert extract_json_from_text('[1] {"x": 1}', accept=_is_alignment_response) is None
@@ -0,0 +1,77 @@
+# new_workflow/tests/test_llm_client.py
+"""OpenAI / 智谱接口的 JSON 模式回退与重试"""
+from types import SimpleNamespace
+
+import pytest
+
+from src import llm_client
+from src.llm_client import LLMClient
+
+
+class _FakeCompletions:
+    """按顺序返回预设结果；结果为异常时抛出"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = []
+
+    def create(self, **params):
+        self.calls.append(dict(params))
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _client(provider, results, max_retries):
+    client = LLMClient.__new__(LLMClient)
+    client.provider = provider
+    client.model = "test-model"
+    client.temperature = 0.2
+    client.max_retries = max_retries
+    client.enable_thinking = False
+    completions = _FakeCompletions(results)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client, completions
+
+
+def _openai_reply(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def _zhipu_stream(text):
+    return [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])]
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep(monkeypatch):
+    monkeypatch.setattr(llm_client.time, "sleep", lambda seconds: None)
+
+
+def test_openai_json_mode_rejection_does_not_use_a_retry():
+    client, completions = _client("openai", [ValueError("response_format is not supported"),
+                                             _openai_reply('{"matches": []}')], max_retries=1)
+    assert client.generate_with_openai("prompt", response_schema={"type": "object"}) == '{"matches": []}'
+    assert "response_format" in completions.calls[0]
+    assert "response_format" not in completions.calls[1]
+
+
+def test_openai_returns_error_string_after_retries():
+    client, completions = _client("openai", [RuntimeError("boom")] * 2, max_retries=2)
+    result = client.generate_with_openai("prompt")
+    assert result.startswith("OpenAI Generation Error")
+    assert len(completions.calls) == 2
+
+
+def test_zhipu_json_mode_falls_back_to_text():
+    client, completions = _client("zhipu", [ValueError("unknown field response_format"),
+                                            _zhipu_stream('{"ok": 1}')], max_retries=1)
+    assert client.generate_with_zhipu("prompt", response_schema={"type": "object"}) == '{"ok": 1}'
+    assert "response_format" in completions.calls[0]
+    assert "response_format" not in completions.calls[1]
+
+
+def test_zhipu_other_errors_are_retried_then_reported():
+    client, completions = _client("zhipu", [RuntimeError("timeout"), RuntimeError("timeout")], max_retries=2)
+    assert client.generate_with_zhipu("prompt").startswith("LLM Generation Error")
+    assert len(completions.calls) == 2
@@ -0,0 +1,70 @@
+# new_workflow/tests/test_long_document.py
+"""长文献 Map-Reduce 总结"""
+import threading
+
+import pytest
+
+from src.long_document import split_into_windows, summarize_long_document
+
+TEXT = "\n\n".join(f"第{i}段。" + "内容" * 40 for i in range(12))
+
+
+@pytest.fixture
+def long_config(config, tmp_path):
+    config["paths"]["window_cache"] = str(tmp_path / "windows")
+    config["summary"] = {"long_document": {"window_chars": 300, "overlap_chars": 50, "max_workers": 2}}
+    return config
+
+
+_lock = threading.Lock()
+
+
+class _Client:
+    def __init__(self, calls, fail_on=None):
+        self.calls = calls
+        self.fail_on = fail_on
+
+    def generate(self, prompt):
+        with _lock:
+            self.calls.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            return "LLM Generation Error: timeout"
+        return f"要点{len(prompt)}"
+
+
+def test_split_into_windows_overlaps_at_paragraph_boundaries():
+    windows = split_into_windows(TEXT, 300, 50)
+    assert len(windows) > 1
+    assert all(len(w) <= 300 for w in windows)
+    assert windows[0].endswith("内容")
+    assert windows[-1].endswith(TEXT[-20:])
+    assert TEXT.startswith(windows[0])
+    with pytest.raises(ValueError):
+        split_into_windows(TEXT, 0, 0)
+    assert split_into_windows("", 10, 2) == []
+
+
+def test_summarize_caches_windows_and_reduce(long_config):
+    calls = []
+    result = summarize_long_document(TEXT, "总结提示词", "a.pdf", lambda: _Client(calls), "openai/fake")
+    windows = result["window_count"]
+    assert windows == len(split_into_windows(TEXT, 300, 50))
+    assert len(calls) == windows + 1
+    assert result["cached_windows"] == 0 and result["summary"]
+
+    calls.clear()
+    again = summarize_long_document(TEXT, "总结提示词", "a.pdf", lambda: _Client(calls), "openai/fake")
+    assert calls == []
+    assert again["summary"] == result["summary"] and again["cached_windows"] == windows
+
+
+def test_failed_window_keeps_successful_ones_cached(long_config):
+    calls = []
+    with pytest.raises(RuntimeError, match="片段处理失败"):
+        summarize_long_document(TEXT, "总结提示词", "a.pdf", lambda: _Client(calls, fail_on="第0段"), "m")
+    windows = len(split_into_windows(TEXT, 300, 50))
+
+    calls.clear()
+    result = summarize_long_document(TEXT, "总结提示词", "a.pdf", lambda: _Client(calls), "m")
+    assert result["cached_windows"] == windows - 1
+    assert len(calls) == 2
@@ -0,0 +1,71 @@
+# new_workflow/tests/test_lsh_index.py
+"""MinHash/LSH 候选索引"""
+import pytest
+
+from src import lsh_index
+from src.fuzzy_matcher import split_references
+from src.lsh_index import MinHashLSHIndex, load_or_update_lsh_index, query_shingles
+from src.reference_matcher import shortlist_references
+from src.reference_parser import parse_references
+
+pytestmark = pytest.mark.skipif(not lsh_index.lsh_available(), reason="numpy 未安装")
+
+REFERENCES = [
+    "Kyle A S. Continuous auctions and insider trading[J]. Econometrica, 1985, 53(6): 1315-1335.",
+    "Easley D, O'Hara M. Price, trade size, and information in securities markets[J]. "
+    "Journal of Financial Economics, 1987, 19(1): 69-90.",
+    "Glosten L R, Milgrom P R. Bid, ask and transaction prices in a specialist market with heterogeneously "
+    "informed traders[J]. Journal of Financial Economics, 1985, 14(1): 71-100.",
+    "张涛, 邵群. 高频交易对市场质量的影响研究[J]. 金融研究, 2017(3): 1-15.",
+]
+
+
+@pytest.fixture(autouse=True)
+def _temporary_caches(config):
+    """参考文献解析缓存写入临时目录"""
+    return config
+
+
+def test_query_ranks_the_matching_reference_first():
+    index = MinHashLSHIndex()
+    assert index.update(REFERENCES, parse_references(REFERENCES)) == len(REFERENCES)
+    assert index.query(query_shingles("Continuous Auctions and Insider Trading", ["Kyle"]), k=2)[0] == 0
+    assert index.query(query_shingles("高频交易对市场质量的影响研究", ["张涛"]), k=2)[0] == 3
+    assert index.query(set()) == []
+
+
+def test_index_persists_and_updates_incrementally(tmp_path):
+    first = load_or_update_lsh_index(REFERENCES[:3], parse_references(REFERENCES[:3]), str(tmp_path))
+    reloaded = MinHashLSHIndex.load(str(tmp_path))
+    assert reloaded.hashes == first.hashes
+    assert (reloaded.signatures == first.signatures).all()
+
+    index = MinHashLSHIndex.load(str(tmp_path))
+    assert index.update(REFERENCES, parse_references(REFERENCES)) == 1
+
+
+def test_corrupt_index_is_rebuilt(tmp_path):
+    load_or_update_lsh_index(REFERENCES, parse_references(REFERENCES), str(tmp_path))
+    (tmp_path / "signatures.npz").write_bytes(b"not a zip")
+    assert MinHashLSHIndex.load(str(tmp_path)).references == []
+    assert load_or_update_lsh_index(REFERENCES, parse_references(REFERENCES), str(tmp_path)).references == REFERENCES
+
+
+def test_shortlist_maps_each_file_to_its_own_candidates(config):
+    config["matching"].update({"lsh_min_references": 1, "lsh_top_k": 1})
+    files = ["Kyle - 1985 - Continuous Auctions and Insider Trading.pdf",
+             "张涛 和 邵群 - 2017 - 高频交易对市场质量的影响研究.pdf"]
+    references, records, shortlists = shortlist_references(files, REFERENCES, parse_references(REFERENCES))
+    assert references == [REFERENCES[0], REFERENCES[3]]
+    assert len(records) == 2
+    assert shortlists == {files[0]: [0], files[1]: [1]}
+
+
+def test_small_reference_lists_skip_lsh(config):
+    references, records, shortlists = shortlist_references(["a.pdf"], REFERENCES, parse_references(REFERENCES))
+    assert references is REFERENCES and shortlists is None
+
+
+def test_split_references_feeds_index():
+    text = "\n".join(f"[{i + 1}] {ref}" for i, ref in enumerate(REFERENCES))
+    assert split_references(text) == REFERENCES
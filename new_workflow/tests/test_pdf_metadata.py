@@ -0,0 +1,102 @@
+# new_workflow/tests/test_pdf_metadata.py
+"""PDF 元数据提取"""
+import os
+
+from src import pdf_metadata
+from src.pdf_metadata import PdfMetadata, extract_pdf_metadata, load_pdf_metadata, parse_first_page, \
+    read_document_info
+from pdf_samples import classic_pdf
+
+FIRST_PAGE = """Journal of Finance, Vol. 67, No. 2
+
+# Flow Toxicity and Liquidity in a High-frequency World
+
+David Easley, Marcos López de Prado, Maureen O'Hara
+
+Cornell University, Department of Economics
+
+Abstract
+We study liquidity provision in high-frequency markets, building on Kyle (1985).
+
+Published online 2012. DOI: 10.1093/rfs/hhs053.
+"""
+
+
+def _utf16_hex(text):
+    return b"<FEFF" + text.encode("utf-16-be").hex().upper().encode("ascii") + b">"
+
+
+def _pdf(tmp_path, name, info=b""):
+    path = tmp_path / name
+    path.write_bytes(classic_pdf(1) + info)
+    return str(path)
+
+
+def test_parse_first_page_skips_headers_and_affiliations():
+    meta = parse_first_page(FIRST_PAGE)
+    assert meta.title == "Flow Toxicity and Liquidity in a High-frequency World"
+    assert meta.authors == ["David Easley", "Marcos López de Prado", "Maureen O'Hara"]
+    assert meta.doi == "10.1093/rfs/hhs053"
+    # 正文中被引文献的年份不作为出版年份
+    assert meta.year == "2012"
+
+
+def test_parse_first_page_without_structure():
+    meta = parse_first_page("")
+    assert (meta.title, meta.authors, meta.year, meta.doi) == ("", [], None, None)
+
+
+def test_document_info_and_xmp(tmp_path):
+    info = (b"7 0 obj\n<< /Title " + _utf16_hex("高频交易对市场质量的影响研究") +
+            b" /Author (Zhang Tao; Shao Qun) /CreationDate (D:20170301) /doi (doi:10.1234/ABC.5.) >>\nendobj\n")
+    meta = read_document_info(_pdf(tmp_path, "a.pdf", info))
+    assert meta.title == "高频交易对市场质量的影响研究" and meta.source == "info"
+    assert meta.authors == ["Zhang Tao", "Shao Qun"]
+    assert (meta.year, meta.doi) == ("2017", "10.1234/abc.5")
+
+    xmp = (b"<dc:title><rdf:Alt><rdf:li xml:lang='x-default'>Continuous Auctions &amp; Insider Trading</rdf:li>"
+           b"</rdf:Alt></dc:title><dc:creator><rdf:Seq><rdf:li>Albert S. Kyle</rdf:li></rdf:Seq></dc:creator>"
+           b"<prism:doi>10.2307/1913210</prism:doi>")
+    meta = read_document_info(_pdf(tmp_path, "b.pdf", xmp + b"\n<< /Title (Microsoft Word - draft.docx) >>"))
+    assert meta.title == "Continuous Auctions & Insider Trading" and meta.source == "xmp"
+    assert meta.authors == ["Albert S. Kyle"] and meta.doi == "10.2307/1913210"
+
+
+def test_junk_title_falls_back_to_first_page(tmp_path, config):
+    config["paths"]["markdown_cache"] = str(tmp_path / "markdowns")
+    path = _pdf(tmp_path, "scan.pdf", b"<< /Title (Microsoft Word - draft.docx) /Author (Someone) >>")
+    os.makedirs(config["paths"]["markdown_cache"])
+    cache = tmp_path / "markdowns" / "scan.md"
+    cache.write_text(FIRST_PAGE, encoding="utf-8")
+    os.utime(cache, (os.path.getmtime(path) + 10,) * 2)
+
+    meta = extract_pdf_metadata(path)
+    assert meta.title == "Flow Toxicity and Liquidity in a High-frequency World"
+    assert meta.source == "first_page"
+    assert meta.authors == ["Someone"]
+    assert meta.doi == "10.1093/rfs/hhs053"
+
+
+def test_metadata_index_is_reused_by_content_hash(tmp_path, config, monkeypatch):
+    config["paths"]["pdf_metadata_index"] = str(tmp_path / "pdf_metadata.json")
+    first = _pdf(tmp_path, "a.pdf", b"<< /Title (A Sufficiently Long Title) >>")
+    calls = []
+
+    def _extract(path):
+        calls.append(os.path.basename(path))
+        if path.endswith("broken.pdf"):
+            raise ValueError("bad pdf")
+        return PdfMetadata(title="A Sufficiently Long Title", source="info")
+
+    monkeypatch.setattr(pdf_metadata, "extract_pdf_metadata", _extract)
+    broken = _pdf(tmp_path, "broken.pdf", b"% different content")
+    result = load_pdf_metadata([first, broken, str(tmp_path / "missing.pdf")])
+    assert result["a.pdf"].title == "A Sufficiently Long Title"
+    assert result["broken.pdf"] == PdfMetadata()
+    assert sorted(calls) == ["a.pdf", "broken.pdf"]
+
+    # 改名后内容相同的文件命中索引，不再提取
+    renamed = tmp_path / "renamed.pdf"
+    os.rename(first, renamed)
+    assert load_pdf_metadata([str(renamed)])["renamed.pdf"].title == "A Sufficiently Long Title"
+    assert len(calls) == 2
@@ -0,0 +1,80 @@
+# new_workflow/tests/test_pdf_processor.py
+"""PDF 页数统计与运行规划"""
+import io
+import json
+
+import pytest
+
+from src import pdf_processor
+from src.pdf_processor import _scan_page_objects, count_pdf_pages
+from src.run_planner import plan_summary_run
+from pdf_samples import classic_pdf, self_referencing_length_pdf, xref_stream_pdf
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.skipif(not pdf_processor._HAS_PDFMINER, reason="pdfminer 未安装")
+def test_counts_pages_from_classic_xref(tmp_path):
+    assert count_pdf_pages(_write(tmp_path, "a.pdf", classic_pdf(7))) == 7
+
+
+@pytest.mark.skipif(not pdf_processor._HAS_PDFMINER, reason="pdfminer 未安装")
+def test_counts_pages_compressed_in_xref_stream(tmp_path):
+    path = _write(tmp_path, "a.pdf", xref_stream_pdf(9))
+    assert count_pdf_pages(path) == 9
+
+
+def test_scan_fallback_without_pdfminer(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_processor, "_HAS_PDFMINER", False)
+    assert count_pdf_pages(_write(tmp_path, "a.pdf", classic_pdf(4))) == 4
+    # 页面对象全部压缩时扫描不到，按文件大小估算且至少为 1
+    assert count_pdf_pages(_write(tmp_path, "b.pdf", xref_stream_pdf(3))) == 1
+
+
+def test_corrupt_or_self_referencing_pdf_does_not_raise(tmp_path):
+    assert count_pdf_pages(_write(tmp_path, "a.pdf", self_referencing_length_pdf())) >= 1
+    assert count_pdf_pages(_write(tmp_path, "b.pdf", b"%PDF-1.7\ngarbage" * 50)) == 1
+    assert count_pdf_pages(str(tmp_path / "missing.pdf")) == 1
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 20, 33, 64])
+def test_scan_counts_matches_straddling_chunks(chunk_size):
+    data = classic_pdf(6)
+    assert _scan_page_objects(io.BytesIO(data), chunk_size=chunk_size) == 6
+    # 最后一个匹配位于文件末尾的保留段内
+    assert _scan_page_objects(io.BytesIO(b"x" * 50 + b"/Type /Page"), chunk_size=chunk_size) == 1
+    assert _scan_page_objects(io.BytesIO(b"/Type /Pages /Type/Page>>"), chunk_size=chunk_size) == 1
+
+
+def test_plan_skips_processed_and_unmapped_files(tmp_path, config, monkeypatch):
+    monkeypatch.setattr(pdf_processor, "_HAS_PDFMINER", False)
+    config["paths"]["markdown_cache"] = str(tmp_path / "markdowns")
+    config["model"] = {"literature_summary": {"provider": "gemini"}}
+    config["concurrency"] = {"max_workers": 2}
+    config["api"] = {"requests_per_minute": 0}
+    pdfs = [_write(tmp_path, f"{name}.pdf", classic_pdf(pages))
+            for name, pages in (("done", 2), ("todo", 5), ("unmapped", 3))]
+    summaries = tmp_path / "summaries.json"
+    summaries.write_text(json.dumps([{"file_name": "done.pdf", "summary": "ok", "elapsed_time": 30}]),
+                         encoding="utf-8")
+
+    plan = plan_summary_run(pdfs, {"done.pdf": "A", "todo.pdf": "B"}, str(summaries))
+
+    assert plan["pending_count"] == 1
+    assert [f["file_name"] for f in plan["files"]] == ["todo.pdf"]
+    assert plan["total_pages"] == 5
+    assert plan["estimated_input_tokens"] == 5 * 258
+    assert plan["seconds_per_file"] == 30
+    assert plan["suggested_workers"] == 1
+    assert plan["eta_seconds"] == 15.0
+
+
+def test_plan_with_nothing_pending(tmp_path, config):
+    plan = plan_summary_run([], None, str(tmp_path / "missing.json"))
+    assert plan["pending_count"] == 0
+    assert plan["eta_seconds"] == 0.0
+    assert plan["estimated_total_tokens"] == 0
@@ -0,0 +1,82 @@
+# new_workflow/tests/test_pdf_to_markdown.py
+"""共享转换服务与流式批量转换"""
+import threading
+import time
+
+import pytest
+
+from src.pdf_to_markdown import ConverterService, PDFToMarkdownConverter
+
+
+@pytest.fixture
+def converter_config(config, tmp_path):
+    config["paths"]["markdown_cache"] = str(tmp_path / "markdowns")
+    config["concurrency"] = {"max_workers": 2}
+    return config
+
+
+def test_concurrent_requests_for_one_pdf_convert_once(converter_config):
+    service = ConverterService()
+    calls = []
+    release = threading.Event()
+
+    def _convert(path, force_llm=False, force_refresh=False):
+        calls.append(path)
+        release.wait(5)
+        return f"# {path}", "markitdown"
+
+    service.converter.convert = _convert
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.convert("/x/a.pdf"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert calls == ["/x/a.pdf"]
+    assert results == [("# /x/a.pdf", "markitdown")] * 4
+    # 转换结束后不再共享，下一次请求重新转换（由转换器自身的缓存处理）
+    service.convert("/x/a.pdf")
+    assert len(calls) == 2
+
+
+def test_failed_conversion_is_shared_and_not_remembered(converter_config):
+    service = ConverterService()
+
+    def _broken(path, force_llm=False, force_refresh=False):
+        raise ValueError("broken pdf")
+
+    service.converter.convert = _broken
+    with pytest.raises(ValueError):
+        service.convert("/x/a.pdf")
+    service.converter.convert = lambda path, force_llm=False, force_refresh=False: ("ok", "cache")
+    assert service.convert("/x/a.pdf") == ("ok", "cache")
+
+
+def test_iter_convert_bounds_in_flight_work(converter_config, tmp_path):
+    converter = PDFToMarkdownConverter()
+    consumed = []
+
+    def _paths():
+        for i in range(20):
+            consumed.append(i)
+            yield str(tmp_path / f"{i}.pdf")
+
+    def _convert(path, force_llm=False):
+        if path.endswith("13.pdf"):
+            raise RuntimeError("scan failed")
+        return f"# {path}", "markitdown"
+
+    output = tmp_path / "out"
+    results = converter.iter_convert(_paths(), output_folder=str(output), convert=_convert)
+    first = next(results)
+    # 并发数 2，在途任务不超过 4 个
+    assert len(consumed) <= 4
+    rest = list(results)
+    by_path = {path: (method, ok, md_path) for path, method, ok, md_path in [first, *rest]}
+    assert len(by_path) == 20
+    assert by_path[str(tmp_path / "13.pdf")] == (None, False, None)
+    method, ok, md_path = by_path[str(tmp_path / "0.pdf")]
+    assert (method, ok) == ("markitdown", True)
+    assert open(md_path, encoding="utf-8").read() == f"# {tmp_path / '0.pdf'}"
@@ -0,0 +1,26 @@
+# new_workflow/tests/test_reference_index.py
+"""参考文献索引的精确与容错查找"""
+from src.reference_index import ReferenceIndex
+
+TEXT = """[1] Kyle A S. Continuous auctions and insider trading[J]. Econometrica, 1985, 53(6): 1315-1335.
+[2] 张涛, 邵群. 高频交易对市场质量的影响研究[J]. 金融研究, 2017(3): 1-15.
+[3] Glosten L R, Milgrom P R. Bid, ask and transaction prices in a specialist market[J]. JFE, 1985."""
+
+
+def test_exact_lookup_ignores_numbering_spacing_and_width():
+    index = ReferenceIndex.from_text(TEXT)
+    assert len(index) == 3
+    canonical = index.references[1]
+    assert index.lookup("[2] 张涛，邵群．高频交易对市场质量的影响研究［J］．金融研究，2017（3）：1-15．") == (canonical, 1.0)
+    assert "KYLE A S. CONTINUOUS AUCTIONS AND INSIDER TRADING[J]. ECONOMETRICA, 1985, 53(6): 1315-1335" in index
+
+
+def test_fuzzy_lookup_scores_and_threshold():
+    index = ReferenceIndex.from_text(TEXT)
+    typo = "Kyle A S. Continuous auction and insider trading[J]. Econometrica, 1985, 53(6): 1315-1335."
+    reference, score = index.lookup(typo)
+    assert reference == index.references[0]
+    assert 0.9 <= score < 1.0
+    assert index.lookup("Kyle A S. Continuous auctions", threshold=0.9) is None
+    assert index.lookup("Completely unrelated title about something else") is None
+    assert index.lookup("") is None
@@ -0,0 +1,121 @@
+# new_workflow/tests/test_reference_mapping.py
+"""参考文献映射的增量更新"""
+import json
+
+from src import reference_matcher
+
+REFERENCES = """[1] 陈国进, 张润泽, 谢沛霖. 知情交易、信息不确定性与股票风险溢价[J]. 管理科学学报, 2019, 22(4): 53-74.
+[2] Fama E F, French K R. Common risk factors in the returns on stocks and bonds[J]. Journal of Financial Economics, 1993, 33(1): 3-56."""
+
+
+def _setup(tmp_path):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    pdf_files = []
+    for name in ("download (3).pdf", "scan_0001.pdf"):
+        path = pdf_dir / name
+        path.write_bytes(b"%PDF-1.4 " + name.encode())
+        pdf_files.append(str(path))
+    reference_file = tmp_path / "refs.txt"
+    reference_file.write_text(REFERENCES, encoding="utf-8")
+    return pdf_files, str(reference_file), str(tmp_path / "reference_mapping.json")
+
+
+def test_failed_chunk_is_retried_on_next_run(tmp_path, monkeypatch, config):
+    pdf_files, reference_file, mapping_path = _setup(tmp_path)
+    references = reference_matcher.split_references(REFERENCES)
+    answers = {"download (3).pdf": references[1], "scan_0001.pdf": references[0]}
+    calls = []
+    fail = {"download (3).pdf"}
+
+    def fake_align(chunk, references_text, candidates=None, hints=None):
+        names = list(chunk)
+        calls.append(names)
+        if fail.intersection(names):
+            return {}
+        return {name: answers[name] for name in names}
+
+    monkeypatch.setattr(reference_matcher, "align_pdfs_with_references", fake_align)
+
+    first = reference_matcher.load_or_create_mapping(mapping_path, pdf_files, reference_file)
+    assert first["download (3).pdf"] is None
+    assert first["scan_0001.pdf"] == references[0]
+    with open(reference_matcher._mapping_state_path(mapping_path), encoding="utf-8") as f:
+        assert json.load(f)["pending"] == ["download (3).pdf"]
+
+    # 第二次运行：参考文献与 PDF 均未变化，失败的文件仍应重新对齐
+    fail.clear()
+    calls.clear()
+    second = reference_matcher.load_or_create_mapping(mapping_path, pdf_files, reference_file)
+    assert calls == [["download (3).pdf"]]
+    assert second["download (3).pdf"] == references[1]
+    assert second["scan_0001.pdf"] == references[0]
+    with open(reference_matcher._mapping_state_path(mapping_path), encoding="utf-8") as f:
+        assert json.load(f)["pending"] == []
+
+    # 第三次运行：没有待重试的文件，不再调用大模型
+    calls.clear()
+    reference_matcher.load_or_create_mapping(mapping_path, pdf_files, reference_file)
+    assert calls == []
+
+
+def test_model_answer_without_match_is_not_retried(tmp_path, monkeypatch, config):
+    pdf_files, reference_file, mapping_path = _setup(tmp_path)
+    calls = []
+
+    def fake_align(chunk, references_text, candidates=None, hints=None):
+        calls.append(list(chunk))
+        return {name: None for name in chunk}
+
+    monkeypatch.setattr(reference_matcher, "align_pdfs_with_references", fake_align)
+
+    first = reference_matcher.load_or_create_mapping(mapping_path, pdf_files, reference_file)
+    assert first == {"download (3).pdf": None, "scan_0001.pdf": None}
+    calls.clear()
+    reference_matcher.load_or_create_mapping(mapping_path, pdf_files, reference_file)
+    assert calls == []
+
+
+def test_align_in_chunks_retries_failed_chunks_and_caches_results(monkeypatch, config):
+    config["matching"].update({"chunk_size": 2, "chunk_retries": 2, "max_workers": 2})
+    candidates = {name: [f"ref {name}"] for name in ("a.pdf", "b.pdf", "c.pdf", "d.pdf", "e.pdf")}
+    attempts = {}
+
+    def fake_align(chunk, references_text, candidates=None, hints=None):
+        key = tuple(chunk)
+        attempts[key] = attempts.get(key, 0) + 1
+        # 第一块首次失败后成功，最后一块始终失败
+        if key == ("e.pdf",) or (key == ("a.pdf", "b.pdf") and attempts[key] == 1):
+            return {}
+        return {name: candidates[name][0] for name in chunk}
+
+    monkeypatch.setattr(reference_matcher, "align_pdfs_with_references", fake_align)
+    names = list(candidates)
+    result = reference_matcher.align_in_chunks(names, candidates, "refs")
+    assert result == {name: f"ref {name}" for name in names[:4]}
+    assert attempts == {("a.pdf", "b.pdf"): 2, ("c.pdf", "d.pdf"): 1, ("e.pdf",): 2}
+
+    # 成功的块从缓存读取，只重新请求失败的块
+    attempts.clear()
+    assert reference_matcher.align_in_chunks(names, candidates, "refs") == result
+    assert attempts == {("e.pdf",): 2}
+
+
+def test_compute_mapping_delta():
+    references = reference_matcher.split_references(REFERENCES)
+    mapping = {"same.pdf": references[0], "changed.pdf": references[1], "stale.pdf": "已删除的文献",
+               "unmatched.pdf": None, "pending.pdf": None, "removed.pdf": None}
+    files = {name: {"sha1": name} for name in mapping}
+    state = {"files": files, "references": [reference_matcher.reference_hash(ref) for ref in references],
+             "pending": ["pending.pdf"]}
+    inventory = {name: info for name, info in files.items() if name != "removed.pdf"}
+    inventory["changed.pdf"] = {"sha1": "new content"}
+    inventory["new.pdf"] = {"sha1": "new.pdf"}
+
+    delta = reference_matcher.compute_mapping_delta(mapping, state, inventory, references)
+    assert delta == {"added": ["changed.pdf", "new.pdf"], "removed": ["removed.pdf"],
+                     "stale": ["stale.pdf"], "retry": ["pending.pdf"]}
+
+    # 新增参考文献后，所有未匹配的文件都可能匹配上
+    delta = reference_matcher.compute_mapping_delta(mapping, state, inventory, references + ["新文献[J]. 2024."])
+    assert delta["retry"] == ["unmatched.pdf", "pending.pdf"]
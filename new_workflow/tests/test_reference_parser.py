@@ -0,0 +1,46 @@
+# new_workflow/tests/test_reference_parser.py
+"""参考文献结构化解析与缓存"""
+from src import reference_parser
+from src.reference_parser import parse_reference, parse_references
+
+
+def test_parse_gbt7714():
+    record = parse_reference("[3] 张涛, 邵群, 等. 高频交易对市场质量的影响研究[J]. 金融研究, 2017, 40(3): 1-15.")
+    assert record.style == "gbt7714" and record.doc_type == "J"
+    assert record.raw == "张涛, 邵群, 等. 高频交易对市场质量的影响研究[J]. 金融研究, 2017, 40(3): 1-15."
+    assert record.authors == ["张涛", "邵群"]
+    assert record.title == "高频交易对市场质量的影响研究"
+    assert (record.venue, record.year, record.volume, record.issue, record.pages) == \
+        ("金融研究", "2017", "40", "3", "1-15")
+    assert record.sort_key[0] == 0
+
+
+def test_parse_apa_with_doi():
+    record = parse_reference("Easley, D., López de Prado, M. M., & O'Hara, M. (2012). Flow toxicity and liquidity "
+                             "in a high-frequency world. Review of Financial Studies, 25(5), 1457-1493. "
+                             "https://doi.org/10.1093/rfs/hhs053")
+    assert record.style == "apa"
+    assert record.authors == ["Easley", "López de Prado", "O'Hara"]
+    assert record.year == "2012"
+    assert record.title == "Flow toxicity and liquidity in a high-frequency world"
+    assert (record.volume, record.issue, record.pages) == ("25", "5", "1457-1493")
+    assert record.doi == "10.1093/rfs/hhs053"
+    assert record.sort_key[0] == 1
+
+
+def test_unrecognised_format_keeps_whole_text():
+    record = parse_reference("Some working paper draft circulated in 2019")
+    assert record.style == "other"
+    assert record.title == "Some working paper draft circulated in 2019"
+    assert record.year == "2019" and record.authors == []
+
+
+def test_parse_references_uses_memory_then_disk_cache(config, monkeypatch):
+    references = ["Kyle A S. Continuous auctions and insider trading[J]. Econometrica, 1985, 53(6): 1315-1335."]
+    first = parse_references(references)
+    assert parse_references(references) is first
+
+    monkeypatch.setattr(reference_parser, "_memory_cache", type(reference_parser._memory_cache)())
+    monkeypatch.setattr(reference_parser, "parse_reference", lambda ref: (_ for _ in ()).throw(AssertionError))
+    from_disk = parse_references(references)
+    assert from_disk == first and from_disk is not first
@@ -0,0 +1,46 @@
+# new_workflow/tests/test_results_exporter.py
+"""总结结果的流式读取与外部排序"""
+import json
+
+import pytest
+
+from src import results_exporter
+from src.results_exporter import iter_sorted_records, iter_summary_records
+
+RECORDS = [
+    {"file_name": "1.pdf", "reference": "Kyle A S. Continuous auctions and insider trading[J]. 1985."},
+    {"file_name": "2.pdf", "reference": "张涛. 高频交易[J]. 金融研究, 2017."},
+    {"file_name": "3.pdf", "reference": "Amihud Y. Illiquidity and stock returns[J]. 2002."},
+    {"file_name": "skipped.pdf"},
+    {"file_name": "4.pdf", "reference": "陈国进. 知情交易[J]. 2019."},
+    {"file_name": "5.pdf", "reference": "Amihud Y. Illiquidity and stock returns[J]. 2002."},
+]
+
+
+def test_external_sort_matches_in_memory_sort(tmp_path, config):
+    config["export"] = {"temp_dir": str(tmp_path)}
+    in_memory = [r["file_name"] for r in iter_sorted_records(RECORDS, run_size=100)]
+    # 中文按拼音在前，英文在后；排序键相同的记录保持原有顺序，缺少 reference 的记录被跳过
+    assert in_memory == ["4.pdf", "2.pdf", "3.pdf", "5.pdf", "1.pdf"]
+    assert [r["file_name"] for r in iter_sorted_records(RECORDS, run_size=1)] == in_memory
+    # 分段临时文件在迭代结束后删除
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("layout", ["array", "jsonl"])
+def test_streaming_reader_handles_records_across_read_boundaries(tmp_path, monkeypatch, layout):
+    monkeypatch.setattr(results_exporter, "_READ_SIZE", 7)
+    records = RECORDS + [{"file_name": "6.pdf", "reference": "x", "pages": 12345}]
+    path = tmp_path / "summary.json"
+    if layout == "array":
+        path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+    else:
+        path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n", encoding="utf-8")
+    assert list(iter_summary_records(str(path))) == records
+
+
+def test_streaming_reader_rejects_non_object_lines(tmp_path):
+    path = tmp_path / "summary.jsonl"
+    path.write_text('{"file_name": "a.pdf"}\n42\n', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_summary_records(str(path)))
@@ -0,0 +1,97 @@
+# new_workflow/tests/test_summary_fields.py
+"""总结字段解析与列式存储"""
+import json
+
+import pytest
+
+from src.summary_fields import SummaryColumnStore, classify_method_type, parse_summary
+
+SUMMARY = """# 文献总结
+
+## 1. 文献核心信息
+**研究问题**：高频交易如何影响市场质量？
+
+## 2. 研究方法
+- **研究类型**：定量
+- 使用面板回归
+
+---
+
+## 3. 核心发现
+1. 流动性提升
+2. 波动率下降
+
+### 4、理论基础
+市场微观结构理论
+
+**5. 关联性**
+与本研究高度相关
+
+六、局限与启发
+样本期较短
+"""
+
+
+def test_parse_summary_splits_numbered_sections():
+    fields = parse_summary(SUMMARY)
+    assert fields["research_question"] == "**研究问题**：高频交易如何影响市场质量？"
+    assert fields["method"] == "- **研究类型**：定量\n- 使用面板回归"
+    assert fields["findings"] == "1. 流动性提升\n2. 波动率下降"
+    assert fields["theory"] == "市场微观结构理论"
+    assert fields["relevance"] == "与本研究高度相关"
+    assert fields["limitations"] == "样本期较短"
+    assert fields["method_type"] == "定量"
+
+
+def test_unstructured_summary_yields_empty_fields():
+    fields = parse_summary("这篇文章讨论了研究方法的局限性。")
+    assert set(fields.values()) == {"", None}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("研究类型：混合方法（问卷+访谈）", "混合方法"),
+    ("采用深度访谈与扎根理论", "定性"),
+    ("系统文献综述", "文献分析"),
+    ("思辨", "其他"),
+    ("", None),
+])
+def test_classify_method_type(text, expected):
+    assert classify_method_type(text) == expected
+
+
+def _record(i, summary=SUMMARY):
+    return {"file_name": f"{i}.pdf", "reference": f" Ref {i} ", "summary": summary}
+
+
+def test_store_reparses_only_changed_summaries(tmp_path):
+    store_dir = str(tmp_path / "columns")
+    store = SummaryColumnStore(store_dir)
+    assert store.update([_record(0), _record(1), {"file_name": "x.pdf", "summary": ""}]) == 2
+    assert store.column("reference") == ["Ref 0", "Ref 1"]
+
+    reopened = SummaryColumnStore(store_dir)
+    assert len(reopened) == 2
+    changed = SUMMARY.replace("定量", "定性")
+    assert reopened.update([_record(1), _record(0, changed), _record(2)]) == 2
+    assert reopened.column("file_name") == ["1.pdf", "0.pdf", "2.pdf"]
+    assert reopened.method_type_counts() == {"定量": 2, "定性": 1}
+    assert reopened.update([_record(1), _record(0, changed), _record(2)]) == 0
+
+    rows = reopened.filter_rows(method_type="定量", keyword="波动率")
+    assert reopened.select(["file_name"], rows) == [{"file_name": "1.pdf"}, {"file_name": "2.pdf"}]
+    with pytest.raises(ValueError):
+        reopened.select(["unknown"])
+
+
+def test_store_recovers_from_stale_column_file(tmp_path):
+    store_dir = tmp_path / "columns"
+    SummaryColumnStore(str(store_dir)).update([_record(0), _record(1)])
+    # 列文件与元数据的版本号不一致（写入中途失败）时视为无效并全部重新解析
+    findings = store_dir / "findings.json"
+    data = json.loads(findings.read_text(encoding="utf-8"))
+    findings.write_text(json.dumps({"generation": data["generation"] - 1, "values": data["values"]}),
+                        encoding="utf-8")
+    store = SummaryColumnStore(str(store_dir))
+    assert store.column("findings") == [None, None]
+    assert store.update([_record(0), _record(1)]) == 2
+    assert store.column("findings")[0] == "1. 流动性提升\n2. 波动率下降"
@@ -0,0 +1,103 @@
+# new_workflow/tests/test_summary_generator.py
+"""单篇文献总结的结果判定与混合输入模式"""
+import os
+
+import pytest
+
+from pdf_samples import classic_pdf
+from src import summary_generator
+from src.pdf_to_markdown import compact_markdown
+from src.summary_generator import get_hybrid_markdown, process_single_pdf
+
+
+class _FakeClient:
+    provider = "openai"
+    model = "fake"
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def generate(self, prompt, file_path=None):
+        self.calls.append((prompt, file_path))
+        return self.reply
+
+
+def _run(monkeypatch, config, reply):
+    monkeypatch.setattr(summary_generator, "_create_summary_client", lambda: _FakeClient(reply))
+    monkeypatch.setattr(summary_generator, "get_hybrid_markdown", lambda *args: None)
+    return process_single_pdf("/x/a.pdf", "总结", {"a.pdf": "张三. 论文一[J]. 2020."})
+
+
+def test_successful_summary_has_no_error(monkeypatch, config):
+    entry = _run(monkeypatch, config, "## 研究背景\n内容")
+    assert entry["summary"] == "## 研究背景\n内容"
+    assert entry["input_mode"] == "pdf"
+    assert "error" not in entry
+
+
+@pytest.mark.parametrize("reply", [
+    "Error: File not found: /x/a.pdf",
+    "LLM Generation Error: timeout",
+    "OpenAI Generation Error after 3 attempts: 429",
+    "Warning: API返回空响应。请检查文件URL是否为官方域名(如cdn.bigmodel.cn)",
+    "",
+])
+def test_client_error_texts_mark_entry_failed(monkeypatch, config, reply):
+    entry = _run(monkeypatch, config, reply)
+    assert entry["error"]
+
+
+def test_unmapped_file_is_skipped(monkeypatch, config):
+    monkeypatch.setattr(summary_generator, "_create_summary_client", lambda: _FakeClient("x"))
+    assert process_single_pdf("/x/b.pdf", "总结", {"a.pdf": "A"}) is None
+
+
+PAGE_TEXT = "Liquidity and order flow in limit order markets. " * 30
+
+
+def test_hybrid_sends_cached_markdown_instead_of_pdf(tmp_path, monkeypatch, config):
+    config["summary"] = {"input_mode": "hybrid"}
+    config["paths"]["markdown_cache"] = str(tmp_path / "markdowns")
+    pdf_path = tmp_path / "a.pdf"
+    pdf_path.write_bytes(classic_pdf(2))
+    cache_path = tmp_path / "markdowns" / "a.md"
+    cache_path.parent.mkdir()
+    cache_path.write_text(f"# Title\n\n{PAGE_TEXT}\n\n1\n\n{PAGE_TEXT}\n\n2\n", encoding="utf-8")
+    # 缓存须比 PDF 新才有效
+    os.utime(cache_path, (os.path.getmtime(pdf_path) + 10,) * 2)
+    client = _FakeClient("## 研究背景\n内容")
+    client.provider = "gemini"
+    monkeypatch.setattr(summary_generator, "_create_summary_client", lambda: client)
+
+    entry = process_single_pdf(str(pdf_path), "总结", {"a.pdf": "张三. 论文一[J]. 2020."})
+    assert entry["input_mode"] == "markdown" and "error" not in entry
+    prompt, file_path = client.calls[0]
+    assert file_path is None and prompt.startswith("总结") and "limit order markets" in prompt
+    assert "\n1\n" not in prompt
+
+
+def test_hybrid_falls_back_to_pdf(config):
+    config["summary"] = {"input_mode": "hybrid", "hybrid": {"min_chars_per_page": 1000}}
+    dense = PAGE_TEXT * 2
+    assert get_hybrid_markdown("a.pdf", "gemini", dense, pages=1)
+    # 非 Gemini 提供商、文本密度过低（扫描件）、图表密集时仍上传 PDF
+    assert get_hybrid_markdown("a.pdf", "openai", dense, pages=1) is None
+    assert get_hybrid_markdown("a.pdf", "gemini", dense, pages=10) is None
+    figures = dense + "\nFigure 1. Spread\nFigure 2. Depth\n"
+    assert get_hybrid_markdown("a.pdf", "gemini", figures, pages=2) is None
+    config["summary"]["input_mode"] = "pdf"
+    assert get_hybrid_markdown("a.pdf", "gemini", dense, pages=1) is None
+
+
+def test_compact_markdown_drops_page_furniture_and_references():
+    header = "Journal of Finance"
+    body = [f"{header}\nSection {i}   with   spaces\n  - item {i}\n{i}\n\n\n" for i in range(1, 4)]
+    text = "".join(body) + "Closing remarks\n\n## References\nKyle A S. 1985.\n"
+    compacted = compact_markdown(text)
+    assert header not in compacted and "References" not in compacted and "Kyle" not in compacted
+    assert "Section 1 with spaces\n  - item 1" in compacted and "\n\n\n" not in compacted
+    # 前半部分的同名标题不视为文末参考文献
+    early = "## References\nIntro\n" + "".join(f"正文第{i}段\n" for i in range(5))
+    assert compact_markdown(early) == early.strip()
+    assert "Kyle" in compact_markdown(text, drop_references=False)
@@ -0,0 +1,228 @@
+# new_workflow/tests/test_task_manager.py
+"""后台作业、SSE 事件发布与回放"""
+import json
+import time
+
+import pytest
+
+from src import task_manager as task_manager_module
+from src.task_manager import JobConflictError, ListenerLimitError, TaskManager
+
+
+@pytest.fixture
+def manager(config, tmp_path, monkeypatch):
+    """独立于全局单例的任务管理器，作业历史写入临时目录"""
+    config["paths"]["job_history"] = str(tmp_path / "job_history.json")
+    config["tasks"] = {"max_listeners": 2, "listener_backlog": 3, "progress_rate": 0}
+    monkeypatch.setattr(TaskManager, "_instance", None)
+    return TaskManager()
+
+
+def _wait_finished(manager, job_id, timeout=5.0):
+    """等待作业结束事件发布（状态转换、保存历史之后才登记事件）"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        assert manager.flush(timeout=timeout)
+        if any(name == "job" and data["state"] not in task_manager_module.ACTIVE_STATES
+               for name, data in _events(manager, job_id=job_id)):
+            return manager.get_job(job_id)
+        time.sleep(0.01)
+    raise AssertionError(f"作业 {job_id} 未在 {timeout}s 内结束")
+
+
+def _events(manager, last_event_id=None, job_id=None):
+    return [(e.event, json.loads(e.data)) for e in manager.replay(last_event_id, job_id)]
+
+
+def test_run_job_records_result_and_history(manager, tmp_path):
+    job = manager.run_job("summary", lambda job: {"count": 3})
+    finished = _wait_finished(manager, job.id)
+    assert finished["state"] == "succeeded" and finished["result"] == {"count": 3}
+    history = json.loads((tmp_path / "job_history.json").read_text(encoding="utf-8"))
+    assert [entry["id"] for entry in history] == [job.id]
+    assert manager.list_jobs()[0]["id"] == job.id
+
+
+def test_target_that_fails_job_and_raises(manager):
+    def target(job):
+        manager.fail_job(job.id, "缺少参考文献文件")
+        raise RuntimeError("after fail_job")
+
+    job = manager.run_job("mapping", target)
+    finished = _wait_finished(manager, job.id)
+    assert finished["state"] == "failed"
+    assert finished["error"] == "缺少参考文献文件"
+    states = [data["state"] for name, data in _events(manager, job_id=job.id) if name == "job"]
+    assert states == ["pending", "running", "failed"]
+
+
+def test_exclusive_jobs_conflict(manager):
+    job = manager.create_job("export")
+    with pytest.raises(JobConflictError):
+        manager.create_job("export")
+    manager.create_job("export", exclusive=False)
+    manager.fail_job(job.id, "cancelled")
+    with pytest.raises(KeyError):
+        manager.fail_job(job.id, "again")
+
+
+def test_replay_keeps_latest_progress_after_last_event_id(manager):
+    job = manager.create_job("summary")
+    manager.start_job(job.id)
+    for i in range(1, 6):
+        manager.update_job_progress(job.id, i, 5, f"file {i}")
+    manager.finish_job(job.id, {"ok": True})
+    assert manager.flush(timeout=5)
+
+    events = manager.replay(job_id=job.id)
+    progress = [json.loads(e.data) for e in events if e.event == "progress"]
+    assert [p["current"] for p in progress] == [5]
+    # 最终进度在作业完成事件之前
+    assert [e.event for e in events][-2:] == ["progress", "job"]
+
+    running = next(e for e in events if e.event == "job" and json.loads(e.data)["state"] == "running")
+    after = _events(manager, f"{manager.epoch}-{running.id}", job.id)
+    assert [name for name, _ in after] == ["progress", "job"]
+    # 来自之前进程（纪元不同）的事件 ID 回放全部
+    assert len(manager.replay("deadbeef-999", job.id)) == len(events)
+
+
+def test_listener_limit_and_overflow(manager):
+    first = manager.announcer.listen()
+    manager.announcer.listen(job_id="other")
+    with pytest.raises(ListenerLimitError):
+        manager.announcer.listen()
+    for i in range(5):
+        manager.announce_event("log", {"i": i})
+    assert manager.flush(timeout=5)
+    assert first.overflowed and first.get_nowait() is None
+    manager.announcer.remove(first)
+    metrics = manager.announcer.metrics()
+    assert metrics["rejected"] == 1 and metrics["overflowed"] == 1 and metrics["listeners"] == 1
+
+
+def test_event_stream_replays_then_streams(manager):
+    manager.announce_event("log", {"n": 1})
+    assert manager.flush(timeout=5)
+    stream = manager.listen()
+    try:
+        assert '"n": 1' in next(stream)
+        manager.announce_event("log", {"n": 2})
+        assert '"n": 2' in next(stream)
+    finally:
+        stream.close()
+    assert manager.announcer.metrics()["listeners"] == 0
+
+
+def test_event_stream_heartbeat_and_close_before_iteration(manager):
+    manager.heartbeat_interval = 0.05
+    stream = manager.listen(job_id="job-1")
+    assert next(stream) == ": keep-alive\n\n"
+    stream.close()
+    # 响应从未开始迭代时关闭同样注销监听者
+    unused = manager.listen()
+    assert manager.announcer.metrics()["listeners"] == 1
+    unused.close()
+    unused.close()
+    metrics = manager.announcer.metrics()
+    assert metrics["listeners"] == 0 and metrics["closed"] == 2
+
+
+def test_event_stream_ends_on_overflow(manager):
+    stream = manager.listen()
+    for i in range(5):
+        manager.announce_event("log", {"i": i})
+    assert manager.flush(timeout=5)
+    with pytest.raises(StopIteration):
+        next(stream)
+    metrics = manager.announcer.metrics()
+    assert metrics["listeners"] == 0 and metrics["overflowed"] == 1
+
+
+def test_async_event_stream_wakes_on_publish(manager):
+    import asyncio
+
+    manager.announce_event("log", {"n": 1})
+    assert manager.flush(timeout=5)
+
+    async def _consume():
+        stream = manager.listen_async()
+        events = stream.__aiter__()
+        try:
+            received = [await events.__anext__()]
+            # 发布线程登记的事件唤醒挂起的协程
+            manager.announce_event("log", {"n": 2})
+            received.append(await asyncio.wait_for(events.__anext__(), 5))
+            return received
+        finally:
+            await events.aclose()
+
+    first, second = asyncio.run(_consume())
+    assert '"n": 1' in first and '"n": 2' in second
+    assert manager.announcer.metrics()["listeners"] == 0
+
+
+def test_async_event_stream_heartbeat_and_close(manager):
+    import asyncio
+
+    manager.heartbeat_interval = 0.05
+
+    async def _consume():
+        stream = manager.listen_async(job_id="job-1")
+        events = stream.__aiter__()
+        heartbeat = await asyncio.wait_for(events.__anext__(), 5)
+        # 响应被取消时由调用方关闭
+        stream.close()
+        return heartbeat
+
+    assert asyncio.run(_consume()) == ": keep-alive\n\n"
+    assert manager.announcer.metrics()["listeners"] == 0
+
+
+def test_progress_is_rate_limited_per_job(manager):
+    manager.progress_interval = 0.5
+    listener = manager.announcer.listen()
+
+    def _next_progress(timeout):
+        event = listener.get(timeout=timeout)
+        return None if event is None else (event.job_id, json.loads(event.data)["current"])
+
+    manager.update_job_progress("a", 1, 10, "file 1")
+    assert _next_progress(2) == ("a", 1)
+    started = time.monotonic()
+    for i in range(2, 11):
+        manager.update_job_progress("a", i, 10, f"file {i}")
+    # 间隔内的进度合并，不立即发布；其他作业不受限速影响
+    manager.update_job_progress("b", 1, 2, "other")
+    assert _next_progress(2) == ("b", 1)
+    assert _next_progress(0.1) is None
+    assert _next_progress(2) == ("a", 10)
+    assert time.monotonic() - started >= 0.3
+    manager.announcer.remove(listener)
+
+
+def test_jobs_progress_and_history_survive_restart(manager, monkeypatch):
+    done = manager.create_job("export", exclusive=False)
+    manager.start_job(done.id)
+    manager.finish_job(done.id, {"count": 2})
+    running = manager.create_job("summary")
+    manager.start_job(running.id)
+    manager.progress_callback(running.id)(3, 7, "c.pdf")
+
+    assert manager.get_progress(running.id) == {"current": 3, "total": 7, "last_item": "c.pdf",
+                                                 "state": "running", "job_id": running.id}
+    assert manager.get_progress("missing") is None
+    # 进行中的作业在前
+    assert [job["id"] for job in manager.list_jobs()] == [running.id, done.id]
+    assert [job["id"] for job in manager.list_jobs(limit=1)] == [running.id]
+    # 非法的状态转换与已结束的作业
+    with pytest.raises(ValueError):
+        manager.start_job(running.id)
+    with pytest.raises(KeyError):
+        manager.fail_job(done.id, "late")
+
+    monkeypatch.setattr(TaskManager, "_instance", None)
+    restarted = TaskManager()
+    assert restarted.get_job(done.id)["result"] == {"count": 2}
+    # 只保存已结束的作业
+    assert [job["id"] for job in restarted.list_jobs()] == [done.id]
@@ -0,0 +1,43 @@
+# new_workflow/tests/test_workflow.py
+"""主工作流"""
+import json
+
+import workflow
+
+
+def _prepare(tmp_path, config, monkeypatch):
+    summaries = tmp_path / "summaries.json"
+    summaries.write_text(json.dumps([{"file_name": "a.pdf", "summary": "ok"}]), encoding="utf-8")
+    config["paths"].update({"pdf_folder": str(tmp_path), "summary_save_path": str(summaries),
+                            "research_topic_file": str(tmp_path / "topic.txt"),
+                            "reference_mapping": str(tmp_path / "mapping.json")})
+    monkeypatch.setattr(workflow, "load_text_file", lambda path: "主题")
+    monkeypatch.setattr(workflow, "get_pdf_files", lambda folder: ["/x/a.pdf", "/x/b.pdf"])
+    monkeypatch.setattr(workflow, "batch_process_pdfs", lambda *args, **kwargs: [])
+
+
+def test_summary_step_reports_stats(tmp_path, config, monkeypatch):
+    _prepare(tmp_path, config, monkeypatch)
+    calls = []
+    monkeypatch.setattr(workflow, "export_results_step", lambda: calls.append("export"))
+    monkeypatch.setattr(workflow, "update_summary_columns_step", lambda: calls.append("columns"))
+
+    ok, message, stats = workflow.run_summary_step({"a.pdf": "A", "b.pdf": "B"})
+
+    assert ok and calls == ["export", "columns"]
+    assert stats == {"total_matched": 2, "success_count": 1, "pending_count": 1}
+
+
+def test_summary_step_succeeds_when_export_fails(tmp_path, config, monkeypatch):
+    _prepare(tmp_path, config, monkeypatch)
+
+    def _fail():
+        raise RuntimeError("导出 xlsx 需要安装 openpyxl")
+
+    monkeypatch.setattr(workflow, "export_results_step", _fail)
+    monkeypatch.setattr(workflow, "update_summary_columns_step", _fail)
+
+    ok, _, stats = workflow.run_summary_step({"a.pdf": "A", "b.pdf": "B"})
+
+    assert ok
+    assert stats["success_count"] == 1
@@ -5,14 +5,25 @@
 """
 import os
 import json
+import hashlib
+import argparse
+import threading
 from src.config_loader import get_config, load_text_file
 from src.pdf_processor import get_pdf_files
 from src.reference_matcher import load_or_create_mapping
 from src.summary_generator import batch_process_pdfs, save_summary_results
 from src.prompts import get_summary_prompt
-from src.results_exporter import export_from_json
+from src.results_exporter import export_from_json, update_sorted_csv, iter_summary_records
+from src.export_formats import export_output_path
+from src.summary_fields import SummaryColumnStore
+from src.run_planner import plan_summary_run
 from src.logger import logger
 
+# 导出结果文件的互斥锁：总结完成后的自动导出、后台导出作业与下载时的按需导出不能同时写同一文件
+export_lock = threading.Lock()
+# 各导出文件最近一次导出时的结果版本（输入未变化时增量导出不会改写文件，不能只比较修改时间）
+_exported_versions = {}
+
 
 def get_mapping_step():
     """第一步：获取文献映射关系"""
@@ -82,11 +93,16 @@ def run_summary_step(reference_mapping=None, progress_callback=None):
     # 注意：batch_process_pdfs 只返回本次新处理的结果
     # 如果所有文件都已处理过，summary_results 为空，但我们仍希望告知用户完成
     if summary_results or os.path.exists(summary_save_path):
-        csv_path = get_config("paths.result_csv")
-        if not csv_path:
-            raise ValueError("配置文件中未指定 paths.result_csv")
-        export_from_json(summary_save_path, csv_path)
-        
+        # 总结已写入结果文件，导出或解析失败不影响本次总结的结果
+        try:
+            export_results_step()
+        except Exception as e:
+            logger.warning(f"导出总结结果失败，可稍后重新导出: {e}")
+        try:
+            update_summary_columns_step()
+        except Exception as e:
+            logger.warning(f"更新总结结构化字段失败: {e}")
+
         # 重新读取最终的成功总结数（包括本次新处理的）
         _, final_valid_results = load_existing_results(summary_save_path)
         success_count = len(final_valid_results)
@@ -103,6 +119,119 @@ def run_summary_step(reference_mapping=None, progress_callback=None):
     
     return False, "没有找到需要处理的文件", None
 
+def export_results_step(formats=None):
+    """
+    将总结结果排序导出（CSV 增量维护，其他格式流式外部排序），返回导出的记录数
+    
+    持有 export_lock 期间执行，与其他导出互斥
+    
+    Args:
+        formats: 导出格式列表（默认取 export.formats，未配置时只导出 CSV）
+    """
+    with export_lock:
+        return _export_results(formats)
+
+def _export_results(formats=None):
+    summary_save_path = get_config("paths.summary_save_path")
+    csv_path = get_config("paths.result_csv")
+    if not csv_path:
+        raise ValueError("配置文件中未指定 paths.result_csv")
+    count = 0
+    for fmt in formats or get_config("export.formats", ["csv"]):
+        output_path = export_output_path(csv_path, fmt)
+        version = result_version(fmt)
+        if output_path == csv_path and get_config("export.incremental", True):
+            # CSV 通过排序索引增量维护，只重写变化位置之后的行
+            count = update_sorted_csv(summary_save_path, csv_path,
+                                      get_config("paths.export_index", "new_workflow/cache/export_index.json"),
+                                      get_config("paths.reference_file"))
+        else:
+            count = export_from_json(summary_save_path, output_path, get_config("paths.reference_file"), fmt=fmt)
+        _exported_versions[output_path] = version
+        logger.info(f"已导出 {count} 条总结到 {output_path}")
+    return count
+
+# (总结结果文件状态, 列存储)，避免每次查询都重新比对总结结果
+_summary_columns_cache = None
+
+def update_summary_columns_step():
+    """
+    将总结解析为结构化字段并更新列式存储（只解析新增或修改的总结）
+    
+    Returns:
+        最新的 SummaryColumnStore；尚无总结结果时返回 None
+    """
+    global _summary_columns_cache
+    summary_save_path = get_config("paths.summary_save_path")
+    if not os.path.exists(summary_save_path):
+        return None
+    stat = os.stat(summary_save_path)
+    source = (summary_save_path, stat.st_size, stat.st_mtime_ns)
+    # 总结结果未变化时复用已加载的列存储
+    if _summary_columns_cache and _summary_columns_cache[0] == source:
+        return _summary_columns_cache[1]
+    store = SummaryColumnStore(get_config("paths.summary_columns", "new_workflow/cache/summary_columns"))
+    parsed = store.update(iter_summary_records(summary_save_path))
+    if parsed:
+        logger.info(f"已解析 {parsed} 篇总结的结构化字段，列存储共 {len(store)} 篇")
+    _summary_columns_cache = (source, store)
+    return store
+
+def _export_inputs():
+    """导出结果依赖的输入文件（总结结果与参考文献列表，后者决定排序键）中存在的部分"""
+    paths = (get_config("paths.summary_save_path"), get_config("paths.reference_file"))
+    return [path for path in paths if path and os.path.exists(path)]
+
+def result_version(fmt="csv"):
+    """
+    结果版本标识：由导出输入文件的大小、修改时间及导出格式计算，用作下载的 ETag
+    
+    Returns:
+        版本字符串，尚无总结结果时返回 None
+    """
+    if not os.path.exists(get_config("paths.summary_save_path")):
+        return None
+    parts = [fmt]
+    for path in _export_inputs():
+        stat = os.stat(path)
+        parts.append(f"{stat.st_size}-{stat.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+
+def ensure_export(fmt="csv"):
+    """
+    返回指定格式的导出文件路径；文件不存在，或早于任一导出输入文件（与 result_version 相同）
+    且不是由当前版本导出时先重新导出
+    
+    Returns:
+        导出文件路径，尚无总结结果时返回 None
+    """
+    output_path = export_output_path(get_config("paths.result_csv"), fmt)
+    if not os.path.exists(get_config("paths.summary_save_path")):
+        return output_path if os.path.exists(output_path) else None
+    with export_lock:
+        if not os.path.exists(output_path) or (
+                os.path.getmtime(output_path) < max(os.path.getmtime(path) for path in _export_inputs())
+                and _exported_versions.get(output_path) != result_version(fmt)):
+            _export_results([fmt])
+    return output_path
+
+def plan_summary_step():
+    """预估待总结文献的 Token 用量、耗时与费用（不调用大模型）"""
+    pdf_folder_path = get_config("paths.pdf_folder")
+    summary_save_path = get_config("paths.summary_save_path")
+    reference_mapping_path = get_config("paths.reference_mapping")
+    
+    reference_mapping = None
+    if os.path.exists(reference_mapping_path):
+        try:
+            with open(reference_mapping_path, "r", encoding="utf-8") as f:
+                reference_mapping = json.load(f)
+        except Exception as e:
+            logger.error(f"加载映射文件失败: {e}")
+    
+    pdf_files = get_pdf_files(pdf_folder_path)
+    return plan_summary_run(pdf_files, reference_mapping, summary_save_path)
+
 def run_workflow():
     """保留原有的完整工作流供命令行使用"""
     mapping, err = get_mapping_step()
@@ -118,5 +247,27 @@ def run_workflow():
     if stats:
         logger.info(f"统计信息: 共{stats['total_matched']}篇，成功{stats['success_count']}篇，待处理{stats['pending_count']}篇")
 
+def print_plan(plan):
+    """在命令行输出运行计划"""
+    print(f"提供商: {plan['provider']}")
+    print(f"待处理文献: {plan['pending_count']} 篇 (已完成 {plan['already_processed']} 篇, 共 {plan['total_pages']} 页)")
+    print(f"预计请求数: {plan['total_requests']}")
+    print(f"预计 Token: 输入 {plan['estimated_input_tokens']}, 输出 {plan['estimated_output_tokens']}, "
+          f"合计 {plan['estimated_total_tokens']}")
+    print(f"预计费用: {plan['estimated_cost']}")
+    print(f"单篇耗时: {plan['seconds_per_file']}s (历史样本 {plan['history_samples']} 条)")
+    print(f"预计总耗时: {plan['eta_seconds']:.0f}s (当前并发 {plan['configured_workers']})")
+    print(f"建议并发数: {plan['suggested_workers']} (预计 {plan['eta_seconds_suggested']:.0f}s)")
+    if not plan['mapping_available']:
+        print("提示: 尚未生成文献映射，以上按全部 PDF 估算")
+
 if __name__ == "__main__":
-    run_workflow()
+    parser = argparse.ArgumentParser(description="文献综述助手命令行工作流")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "plan"],
+                        help="run: 执行完整工作流（默认）；plan: 仅预估耗时与 Token 用量")
+    args = parser.parse_args()
+    
+    if args.command == "plan":
+        print_plan(plan_summary_step())
+    else:
+        run_workflow()